@@ -22,10 +22,18 @@ from pullhero.utils.misc import (
     setup_logging,
     clone_repo_with_token,
     ingest_repository,
+    run_concurrently,
+    LLM_CONCURRENCY,
 )
+from pullhero.utils.workspace import Workspace
+from pullhero.utils.graph import ImportGraph
+from pullhero.utils.ingest import get_tree_sha, iter_files, load_import_graph
+from pullhero.utils.retrieval import LexicalIndex, get_lexical_index, rank_chunks
+from pullhero.utils.prompt import PromptBuilder
 import logging
 import sys
 from pathlib import Path
+from typing import Optional
 
 
 setup_logging()
@@ -48,18 +56,21 @@ def action_code(
 ) -> None:
 
     logging.info(f"Starting code action for {vcs_repository} PR/MR {vcs_change_id}")
-    local_repo_path = "/tmp/clone"
     # Validate inputs
     if not vcs_token:
         error_msg = f"{vcs_provider} token required"
         logging.error(error_msg)
         raise ValueError(error_msg)
 
+    workspace = Workspace("code")
     try:
         # Initialize provider
         logging.info(f"Initializing {vcs_provider} provider")
         provider = VCSOperations.from_provider(vcs_provider, vcs_token)
 
+        workspace.create()
+        local_repo_path = workspace.checkout_dir
+
         pr_number = vcs_change_id
         pr_branch = vcs_head_branch
         base_branch = vcs_base_branch
@@ -76,14 +87,18 @@ def action_code(
         )
 
         logging.info(f"Cloning repository from {repo_url}")
-        clone_repo_with_token(repo_url, vcs_token)
+        clone_repo_with_token(
+            repo_url, vcs_token, clone_dir=local_repo_path, refs=[pr_branch]
+        )
 
         logging.info("Analyzing repository content")
         summary, tree, content = ingest_repository(local_repo_path)
         logging.debug(
-            f"Repository analysis complete - {len(content.splitlines())} lines of content"
+            "Repository analysis complete - %d lines of content", content.count("\n")
         )
         context = content  # You might also combine tree/summary if needed.
+        index = get_lexical_index(content, get_tree_sha(local_repo_path))
+        graph = load_import_graph(local_repo_path)
 
         pr_title = f"PullHero Code Improvements for PR #{pr_number}"
         pr_body = f"""# Code Improvements for PR #{pr_number}
@@ -126,32 +141,90 @@ If you approve these changes, you can merge this PR into your original branch.
             pr_number=str(pr_number),  # PR number for GitHub, MR IID for GitLab
         )
 
+        targets = []
         for file in files:
             logging.info(f"Parsing: {file}/")
             filename = file["filename"]
 
             if (Path(filename).suffix.lower() not in extensions) or (filename in skip):
                 continue
+            targets.append(filename)
 
+        def generate(filename: str) -> str:
+            """
+            Fetch a file and generate its improved version.
+            """
             current_file_content, _ = provider.get_current_file(
                 vcs_repository, pr_branch, filename
             )
 
-            if "task" in config and config["task"]:
-                # TODO:FIXME: Key does not exists
-                logging.info("Task found")
-                logging.info("Found local task")
-                prompt_template = config["task"]
+            prompt = get_prompt(
+                context,
+                current_file_content,
+                task=config.get("task"),
+                api_model=llm_api_model,
+                index=index,
+                filename=filename,
+                graph=graph,
+            )
+
+            logging.info(f"Sending prompt to AI API to generate improved {filename}...")
+            return call_ai_api(
+                llm_api_host, llm_api_key, llm_api_model, llm_api_endpoint, prompt
+            )
+
+        # Fetch and generate every file concurrently, publish in PR order
+        logging.info(
+            f"Generating {len(targets)} files with up to {LLM_CONCURRENCY} concurrent calls"
+        )
+        results = run_concurrently(generate, targets)
+
+        failed = []
+        improved = {}
+        for filename, (new_content, error) in zip(targets, results):
+            if error is not None:
+                logging.error("AI API call failed for %s: %s", filename, error)
+                failed.append(filename)
+                continue
+            improved[filename] = new_content
+
+        if improved:
+            # Commit every improved file on the branch in a single commit
+            commit = provider.commit_files(
+                vcs_repository,
+                improvements_branch,
+                improved,
+                f"Update {len(improved)} files via PullHero\n\n"
+                + "\n".join(f"- {filename}" for filename in improved),
+            )
+            logging.info(f"Committed improvements: {commit}")
+
+            # Create or look up the pull request once, after all updates landed
+            pr = provider.create_or_update_pr(
+                vcs_repository, improvements_branch, pr_branch, pr_title, pr_body
+            )
+            logging.info(f"Improvements PR/MR {pr['status']}: {pr['url']}")
 
-                prompt = prompt_template.format(
-                    code_context=context,
-                    current_code=current_file_content,
+            for filename in improved:
+                logging.info(
+                    f"{filename} update process completed successfully ({pr['url']})."
                 )
+        else:
+            logging.info("No file was improved, skipping the PR/MR update")
+        provider.log_handle_stats()
+
+        if failed:
+            logging.error(f"Code generation failed for: {', '.join(failed)}")
+            sys.exit(1)
+
+    except Exception as e:
+        logging.error(f"Failed to complete code action: {str(e)}")
+        raise
+    finally:
+        workspace.cleanup()
+
 
-            else:
-                logging.info("Task not found")
-                # Default prompt
-                prompt = f"""Code Improvement Task:
+CODE_TEMPLATE = """Code Improvement Task:
 You are a specialized code improvement agent. Your sole purpose is to optimize, fix, and enhance code files. Based on the repository context and file provided below, improve the code in the file by:
 - Fixing bugs and potential errors
 - Improving performance and efficiency
@@ -163,11 +236,11 @@ You are a specialized code improvement agent. Your sole purpose is to optimize,
 - Enhancing logic and structure
 
 Context of the repository:
-{context}
+{code_context}
 
 Current in the file:
 ```
-{current_file_content}
+{current_code}
 ```
 
 
@@ -195,27 +268,45 @@ Current in the file:
 
 Your entire response must be ONLY the improved code file, with no preamble, explanations, or formatting.
 """
-            logging.info("Sending prompt to AI API to generate improved code...")
-            try:
-                new_content = call_ai_api(
-                    llm_api_host, llm_api_key, llm_api_model, llm_api_endpoint, prompt
-                )
-            except Exception as e:
-                logging.error("AI API call failed: %s", e)
-                sys.exit(1)
-
-            # Update the file on the branch with the LLM response
-            provider.update_file(
-                vcs_repository, improvements_branch, filename, new_content
-            )
 
-            # Update the current pull request
-            provider.create_or_update_pr(
-                vcs_repository, improvements_branch, pr_branch, pr_title, pr_body
-            )
 
-            logging.info(f"{filename} update process completed successfully.")
+def get_prompt(
+    code_context: str,
+    current_code: str,
+    task: Optional[str] = None,
+    api_model: str = "",
+    index: Optional[LexicalIndex] = None,
+    filename: str = "",
+    graph: Optional[ImportGraph] = None,
+) -> str:
+
+    logging.info("Constructing AI code prompt")
+
+    if task:
+        # TODO:FIXME: Key does not exists
+        logging.info("Found local task")
+        template = task
+    else:
+        logging.info("Task not found")
+        template = CODE_TEMPLATE
+
+    builder = PromptBuilder(api_model)
+    builder.add("current_code", current_code, priority=0, required=True)
+    neighbours = set(graph.related([filename])) if graph and filename else set()
+    if neighbours:
+        # Only the callers and callees of the target file
+        logging.info(f"Context limited to {len(neighbours)} callers and callees")
+        context = (
+            chunk for path, chunk in iter_files(code_context) if path in neighbours
+        )
+    else:
+        # Files most relevant to the target file first, the file itself is
+        # already in current_code
+        context = rank_chunks(
+            code_context, index, f"{filename}\n{current_code}", exclude={filename}
+        )
+    builder.add("code_context", context, priority=1)
+    prompt = builder.build(template)
 
-    except Exception as e:
-        logging.error(f"Failed to complete code action: {str(e)}")
-        raise
+    logging.debug(f"Generated prompt with {len(prompt.splitlines())} lines")
+    return prompt
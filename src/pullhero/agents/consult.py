@@ -20,16 +20,103 @@ from pullhero.vcs.base import VCSOperations
 from pullhero.utils.misc import (
     call_ai_api,
     setup_logging,
+    run_concurrently,
+    LLM_CONCURRENCY,
     clone_repo_with_token,
     ingest_repository,
 )
+from pullhero.utils.cache import VCS_CACHE_BODIES, Cache, vcs_cache
+from pullhero.utils.workspace import Workspace
+from pullhero.utils.ingest import INGEST_BACKEND, TreeFiles, get_tree_sha
+from pullhero.utils.retrieval import LexicalIndex, get_lexical_index, rank_chunks
+from pullhero.utils.prompt import PromptBuilder
+import json
 import logging
 import sys
+from typing import Dict, List, Optional, Union
 
 
 setup_logging()
 
 
+def get_issue_fields(
+    provider: VCSOperations, repo_identifier: str, issue: Dict
+) -> Dict:
+    """
+    Get the number, title and body of a listed issue.
+
+    The payload of get_issues_with_label already holds them (GitHub issues
+    or GitLab issue attributes), the issue is only fetched again through
+    get_issue_details when the listing lacks them.
+
+    Args:
+        provider: VCS provider the issue was listed from
+        repo_identifier: Repository identifier
+        issue: Issue payload as returned by get_issues_with_label
+
+    Returns:
+        Dictionary with number, title, body and the comment count, None
+        when the listing does not tell
+    """
+    number = issue.get("number", issue.get("iid"))
+    fields = {
+        "number": number,
+        "title": issue.get("title"),
+        "body": issue.get("body", issue.get("description")),
+        "comments": issue.get("comments", issue.get("user_notes_count")),
+    }
+    if fields["title"] is None:
+        details = provider.get_issue_details(
+            repo_identifier=repo_identifier, issue_id=number
+        )
+        fields.update(title=details["title"], body=details["body"])
+    return fields
+
+
+def get_issue_comments(
+    provider: VCSOperations, repo_identifier: str, number: str, count: Optional[int]
+) -> List[Dict]:
+    """
+    Get the comments of an issue, skipping the API when they did not change.
+
+    Issues without comments are not queried at all. Reusing comments is
+    opt-in with PULLHERO_VCS_CACHE_BODIES: comments are then kept in the VCS
+    cache and served while their count is the one seen at the last consult.
+    Edits of existing comments do not change the count, they are picked up
+    once a comment is added. Without it the comments are fetched on every
+    consult, the prompt needs their bodies so a count alone would not save
+    the request.
+
+    Args:
+        provider: VCS provider
+        repo_identifier: Repository identifier
+        number: Issue number (GitHub) or IID (GitLab)
+        count: Comment count from the issue listing, None if unknown
+
+    Returns:
+        Comments as returned by get_issue_comments
+    """
+    if count == 0:
+        return []
+    key = Cache.make_key("issue-comments", repo_identifier, number, count)
+    persist = count is not None and VCS_CACHE_BODIES
+    if persist:
+        cached = vcs_cache.get(key)
+        if cached is not None:
+            logging.info(f"Comments of issue #{number} unchanged, served from cache")
+            return json.loads(cached)
+
+    if count is not None and not VCS_CACHE_BODIES:
+        logging.debug(
+            f"Fetching comments of issue #{number}, "
+            "PULLHERO_VCS_CACHE_BODIES is off so they are not reused"
+        )
+    comments = provider.get_issue_comments(repo_identifier, number)
+    if persist:
+        vcs_cache.set(key, json.dumps(comments, default=str))
+    return comments
+
+
 def action_consult(
     vcs_provider: str,
     vcs_token: str,
@@ -55,6 +142,7 @@ def action_consult(
         logging.error(error_msg)
         raise ValueError(error_msg)
 
+    workspace = Workspace("consult")
     try:
         # Initialize provider
         logging.info(f"Initializing {vcs_provider} provider")
@@ -68,61 +156,113 @@ def action_consult(
         )
 
         logging.info(f"Cloning repository from {repo_url}")
-        clone_repo_with_token(repo_url, vcs_token)
+        workspace.create()
+        clone_repo_with_token(
+            repo_url,
+            vcs_token,
+            clone_dir=workspace.checkout_dir,
+            checkout=INGEST_BACKEND != "pygit2",
+        )
 
         logging.info("Analyzing repository content")
-        summary, tree, repo_content = ingest_repository("/tmp/clone")
-        logging.debug(
-            f"Repository analysis complete - {len(repo_content.splitlines())} lines of content"
+        # Files are read lazily, the clone is kept until every issue is answered
+        summary, tree, repo_content = ingest_repository(
+            workspace.checkout_dir, lazy=True
         )
+        index = get_lexical_index(repo_content, get_tree_sha(workspace.checkout_dir))
+        logging.debug("Repository analysis complete:\n%s", summary)
 
         # Generate and submit prompt
         logging.info("Generating consult prompts")
 
-        issues = provider.get_issues_with_label(vcs_repository, label_to_parse)
-        for issue in issues:
-            issue_details = provider.get_issue_details(
-                repo_identifier=vcs_repository,  # GitHub: "owner/repo", GitLab: "namespace/project"
-                issue_id=issue["number"],  # GitHub: issue number, GitLab: issue IID
+        issues = []
+
+        def list_issues():
+            """
+            Yield the labelled issues page by page, recording them.
+            """
+            for issue in provider.get_issues_with_label(vcs_repository, label_to_parse):
+                issues.append(issue)
+                yield issue
+
+        def consult(issue: dict) -> str:
+            """
+            Answer a single issue, returning its number.
+            """
+            fields = get_issue_fields(provider, vcs_repository, issue)
+            number = str(fields["number"])
+            comments = get_issue_comments(
+                provider, vcs_repository, number, fields["comments"]
             )
-            comments = provider.get_issue_comments(vcs_repository, str(issue["number"]))
 
             prompt = get_prompt(
-                repo_content, issue_details["title"], issue_details["body"], comments
+                repo_content,
+                fields["title"],
+                fields["body"],
+                comments,
+                api_model=llm_api_model,
+                index=index,
             )
 
             logging.debug(f"Prompt generated with {len(prompt.splitlines())} lines")
 
-            logging.info(f"Calling AI API ({llm_api_model}) for review generation")
-            try:
-                consult_result = call_ai_api(
-                    llm_api_host, llm_api_key, llm_api_model, llm_api_endpoint, prompt
-                )
-                provider.post_comment(
-                    vcs_repository, str(issue["number"]), consult_result, "issue"
-                )
-                logging.info("Comment posted successfully")
-                provider.remove_label_from_issue(
-                    vcs_repository, str(issue["number"]), label_to_parse
+            logging.info(f"Calling AI API ({llm_api_model}) for issue #{number}")
+            consult_result = call_ai_api(
+                llm_api_host, llm_api_key, llm_api_model, llm_api_endpoint, prompt
+            )
+            provider.post_comment(vcs_repository, number, consult_result, "issue")
+            logging.info(f"Comment posted successfully on issue #{number}")
+            return number
+
+        # Consult every labelled issue concurrently as the listing pages load,
+        # a failing issue keeps its label and does not stop the others
+        logging.info(f"Consulting issues with up to {LLM_CONCURRENCY} concurrent calls")
+        results = run_concurrently(consult, list_issues())
+
+        failed = []
+        answered = []
+        for issue, (number, error) in zip(issues, results):
+            if error is not None:
+                number = issue.get("number", issue.get("iid"))
+                logging.error("Consult failed for issue #%s: %s", number, error)
+                failed.append(f"#{number}")
+            else:
+                answered.append(number)
+
+        # Labels are only dropped once the listing is complete, dropping them
+        # earlier would shift the later pages and skip issues
+        unlabelled = run_concurrently(
+            lambda number: provider.remove_label_from_issue(
+                vcs_repository, number, label_to_parse
+            ),
+            answered,
+        )
+        for number, (_, error) in zip(answered, unlabelled):
+            if error is not None:
+                logging.error(
+                    "Removing the label of issue #%s failed: %s", number, error
                 )
-            except Exception as e:
-                logging.error("AI API call failed: %s", e)
-                sys.exit(1)
+                failed.append(f"#{number}")
+
+        provider.log_handle_stats()
+        logging.info(
+            f"Consult summary: {len(issues) - len(failed)} answered, "
+            f"{len(failed)} failed out of {len(issues)} issues"
+        )
+        if failed:
+            logging.error(f"Consult failed for issues: {', '.join(failed)}")
+            sys.exit(1)
 
         logging.info("Consult updates completed successfully.")
 
     except Exception as e:
         logging.error(f"Failed to complete consult action: {str(e)}")
         raise
+    finally:
+        workspace.cleanup()
 
 
-def get_prompt(
-    repo_content: str, issue_title: str, issue_body: str, issue_comments: str
-) -> str:
-
-    logging.info("Constructing AI review prompt")
-
-    prompt = f"""Consultation Task:
+CONSULT_TEMPLATE = """Consultation Task:
 Content:
 {repo_content}
 
@@ -142,5 +282,30 @@ Instructions:
 4. Use the repository Summary, Tree, and Content as context.
 5. Format the output in Markdown format.
 """
+
+
+def get_prompt(
+    repo_content: Union[str, TreeFiles],
+    issue_title: str,
+    issue_body: str,
+    issue_comments: str,
+    api_model: str = "",
+    index: Optional[LexicalIndex] = None,
+) -> str:
+
+    logging.info("Constructing AI review prompt")
+
+    builder = PromptBuilder(api_model)
+    builder.add("issue_title", issue_title or "", priority=0, required=True)
+    builder.add("issue_body", issue_body or "", priority=0, required=True)
+    builder.add("issue_comments", str(issue_comments), priority=1)
+    builder.add(
+        "repo_content",
+        # Files most relevant to the issue first
+        rank_chunks(repo_content, index, f"{issue_title or ''}\n{issue_body or ''}"),
+        priority=2,
+    )
+    prompt = builder.build(CONSULT_TEMPLATE)
+
     logging.debug(f"Generated prompt with {len(prompt.splitlines())} lines")
     return prompt
@@ -23,10 +23,14 @@ from pullhero.utils.misc import (
     clone_repo_with_token,
     ingest_repository,
 )
+from pullhero.utils.workspace import Workspace
+from pullhero.utils.ingest import INGEST_BACKEND, TreeFiles, iter_files
+from pullhero.utils.prompt import PromptBuilder
 import logging
 import sys
 import random
 import string
+from typing import Union
 
 
 setup_logging()
@@ -56,6 +60,7 @@ def action_document(
         logging.error(error_msg)
         raise ValueError(error_msg)
 
+    workspace = Workspace("document")
     try:
         # Initialize provider
         logging.info(f"Initializing {vcs_provider} provider")
@@ -76,22 +81,31 @@ def action_document(
         )
 
         logging.info(f"Cloning repository from {repo_url}")
-        clone_repo_with_token(repo_url, vcs_token)
+        workspace.create()
+        clone_repo_with_token(
+            repo_url,
+            vcs_token,
+            clone_dir=workspace.checkout_dir,
+            refs=[vcs_base_branch],
+            checkout=INGEST_BACKEND != "pygit2",
+        )
 
         logging.info("Analyzing repository content")
-        summary, tree, content = ingest_repository("/tmp/clone")
-        logging.debug(
-            f"Repository analysis complete - {len(content.splitlines())} lines of content"
-        )
+        # Files are read lazily, the clone is kept until the prompt is built
+        summary, tree, content = ingest_repository(workspace.checkout_dir, lazy=True)
+        logging.debug("Repository analysis complete:\n%s", summary)
 
         # Generate and submit prompt
         logging.info("Generating review prompt")
-        prompt = get_prompt(content, current_readme_content)
+        prompt = get_prompt(content, current_readme_content, api_model=llm_api_model)
+        workspace.cleanup()
         logging.debug(f"Prompt generated with {len(prompt.splitlines())} lines")
 
         logging.info(f"Calling AI API ({llm_api_model}) for review generation")
         try:
-            new_readme = call_ai_api(llm_api_host, llm_api_key, llm_api_model, llm_api_endpoint, prompt)
+            new_readme = call_ai_api(
+                llm_api_host, llm_api_key, llm_api_model, llm_api_endpoint, prompt
+            )
         except Exception as e:
             logging.error("AI API call failed: %s", e)
             sys.exit(1)
@@ -118,25 +132,24 @@ def action_document(
             f"{vcs_repository}", update_branch, vcs_base_branch, pr_title, pr_body
         )
 
+        provider.log_handle_stats()
         logging.info("README update process completed successfully.")
 
     except Exception as e:
         logging.error(f"Failed to complete document action: {str(e)}")
         raise
+    finally:
+        workspace.cleanup()
 
 
-def get_prompt(content: str, current_readme_content: str) -> str:
-
-    logging.info("Constructing AI review prompt")
-
-    prompt = f"""Documentation Update Task:
+DOCUMENT_TEMPLATE = """Documentation Update Task:
 
 Begin Repository Content Section
 {content}
 End Repository Content Section
 
 Begin README.md Content Section
-{current_readme_content if current_readme_content.strip() else '[No existing README.md content found]'}
+{current_readme_content}
 End README.md Content Section
 
 Instructions:
@@ -146,5 +159,25 @@ Instructions:
 - Output only the complete new README.md content exclusively in Markdown syntax.
 """
 
+
+def get_prompt(
+    content: Union[str, TreeFiles], current_readme_content: str, api_model: str = ""
+) -> str:
+
+    logging.info("Constructing AI review prompt")
+
+    builder = PromptBuilder(api_model)
+    builder.add(
+        "current_readme_content",
+        (
+            current_readme_content
+            if current_readme_content.strip()
+            else "[No existing README.md content found]"
+        ),
+        priority=0,
+    )
+    builder.add("content", (chunk for _, chunk in iter_files(content)), priority=1)
+    prompt = builder.build(DOCUMENT_TEMPLATE)
+
     logging.debug(f"Generated prompt with {len(prompt.splitlines())} lines")
     return prompt
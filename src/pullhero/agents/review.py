@@ -21,12 +21,101 @@ from pullhero.utils.misc import (
     call_ai_api,
     setup_logging,
     clone_repo_with_token,
+    get_change_ref,
+    LLM_CONCURRENCY,
+    run_concurrently,
     ingest_repository,
 )
+from pullhero.utils.workspace import Workspace
+from pullhero.utils.ingest import (
+    INGEST_BACKEND,
+    TreeFiles,
+    get_tree_sha,
+    ingest_changes,
+    iter_files,
+    split_diff,
+    split_hunks,
+)
+from pullhero.utils.prompt import PromptBuilder, get_tokenizer
+from pullhero.utils.retrieval import LexicalIndex, get_lexical_index, rank_chunks
 import logging
+import os
+import re
+from typing import Dict, List, Optional, Union
 
 setup_logging()
 
+# 'diff' ingests only the changed and related files, 'full' the whole repository
+REVIEW_SCOPE = os.environ.get("PULLHERO_REVIEW_SCOPE", "diff")
+# Diffs bigger than this many tokens are reviewed in chunks, 0 uses half the
+# model context window
+REVIEW_CHUNK_TOKENS = int(os.environ.get("PULLHERO_REVIEW_CHUNK_TOKENS", "0"))
+# Review only the commits pushed since the last PullHero review of the PR/MR
+REVIEW_INCREMENTAL = os.environ.get("PULLHERO_REVIEW_INCREMENTAL", "").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Hidden marker recording the head commit a posted review covers
+REVIEW_MARKER = "<!-- pullhero-review head={sha} -->"
+_REVIEW_MARKER_RE = re.compile(r"<!-- pullhero-review head=([0-9a-f]{7,64}) -->")
+
+_VOTE_LINE_RE = re.compile(r"Vote\W*\s*[+-]?[01]\b[^\n]*\n")
+
+
+def vote_reached(review_text: str) -> bool:
+    """
+    Tell whether a streamed review already contains its complete vote line.
+
+    The vote concludes the review, so a streamed completion is closed
+    early once it is received.
+    """
+    return bool(_VOTE_LINE_RE.search(review_text))
+
+
+def find_previous_review(
+    provider: VCSOperations, vcs_repository: str, vcs_change_id: str
+) -> Optional[Dict[str, str]]:
+    """
+    Find the latest PullHero review posted on a PR/MR.
+
+    Reviews are recognized by the hidden REVIEW_MARKER appended to every
+    posted review, which also records the head commit they cover. Only
+    comments authored by the user the token authenticates as are trusted,
+    a marker posted by anyone else could skip or shrink the review.
+
+    Parameters:
+    -----------
+    provider : VCSOperations
+        Initialized VCS provider
+    vcs_repository : str
+        Repository identifier (format depends on provider)
+    vcs_change_id : str
+        Pull/Merge request ID (numeric string)
+
+    Returns:
+    --------
+    Optional[Dict[str, str]]
+        'sha' of the reviewed head and 'body' of the review without its
+        marker, or None when the PR/MR was never reviewed
+    """
+    user = provider.get_authenticated_user()
+    if not user:
+        logging.info("Cannot tell the authenticated user, ignoring previous reviews")
+        return None
+
+    for comment in reversed(provider.get_pr_comments(vcs_repository, vcs_change_id)):
+        if comment.get("author") != user:
+            continue
+        match = _REVIEW_MARKER_RE.search(comment.get("body") or "")
+        if match:
+            return {
+                "sha": match.group(1),
+                "body": _REVIEW_MARKER_RE.sub("", comment["body"]).strip(),
+            }
+    return None
+
 
 def action_review(
     vcs_provider: str,
@@ -121,6 +210,18 @@ def action_review(
         logging.info(f"Initializing {vcs_provider} provider")
         provider = VCSOperations.from_provider(vcs_provider, vcs_token)
 
+        head_sha = provider.get_pr_head_sha(vcs_repository, vcs_change_id)
+        previous_review = None
+        if REVIEW_INCREMENTAL:
+            previous_review = find_previous_review(
+                provider, vcs_repository, vcs_change_id
+            )
+            if previous_review and previous_review["sha"] == head_sha:
+                logging.info(
+                    f"Head {head_sha[:12]} was already reviewed, nothing to do"
+                )
+                return
+
         # Get AI review payload
         logging.info("Getting AI review payload")
         review_payload = get_review(
@@ -132,6 +233,8 @@ def action_review(
             llm_api_host=llm_api_host,
             llm_api_model=llm_api_model,
             llm_api_endpoint=llm_api_endpoint,
+            head_sha=head_sha,
+            previous_review=previous_review,
         )
 
         # Determine review vote
@@ -146,7 +249,8 @@ def action_review(
         comment_text = (
             f"### [PullHero](https://github.com/pullhero) Review\n\n"
             f"**{provider_data}**\n\n{review_payload}\n\n"
-            f"**Vote**: {vote}\n\n{sourcerepo}"
+            f"**Vote**: {vote}\n\n{sourcerepo}\n\n"
+            f"{REVIEW_MARKER.format(sha=head_sha)}"
         )
 
         # Execute the requested action
@@ -187,6 +291,7 @@ def action_review(
             logging.error(error_msg)
             raise ValueError(error_msg)
 
+        provider.log_handle_stats()
         logging.info("Review action completed successfully")
 
     except Exception as e:
@@ -203,17 +308,22 @@ def get_review(
     llm_api_host: str,
     llm_api_model: str,
     llm_api_endpoint: str,
+    head_sha: Optional[str] = None,
+    previous_review: Optional[Dict[str, str]] = None,
 ) -> str:
     """
     Retrieves an AI-generated code review for a given pull/merge request.
 
     This function:
     1. Initializes the VCS provider
-    2. Fetches the PR/MR diff
+    2. Fetches the PR/MR diff, or only the changes pushed since the
+       previous review when one is given
     3. Clones the repository
-    4. Ingests repository content
+    4. Ingests the changed files and their related files, or the whole
+       repository when PULLHERO_REVIEW_SCOPE is 'full'
     5. Generates a review prompt
-    6. Calls the AI API for review generation
+    6. Calls the AI API for review generation, or reviews the diff in
+       chunks and merges the partial reviews when it is too large
 
     Parameters:
     -----------
@@ -231,6 +341,12 @@ def get_review(
         Base URL for the LLM API
     llm_api_model : str
         Model name for the LLM service
+    head_sha : str, optional
+        Head commit of the PR/MR, the end of the incremental review
+    previous_review : Dict[str, str], optional
+        Previous review from find_previous_review, when given only the
+        interdiff since its 'sha' is reviewed, with its 'body' as context.
+        The whole PR/MR is reviewed when the branch was rewritten since.
 
     Returns:
     --------
@@ -266,13 +382,31 @@ def get_review(
         logging.error(error_msg)
         raise ValueError(error_msg)
 
+    workspace = Workspace("review")
     try:
         # Initialize provider and get diff
         logging.info(f"Initializing {vcs_provider} provider")
         provider = VCSOperations.from_provider(vcs_provider, vcs_token)
 
-        logging.info(f"Fetching diff for PR/MR {vcs_change_id}")
-        diff = provider.get_pr_diff(vcs_repository, vcs_change_id)
+        diff = None
+        if previous_review and head_sha:
+            diff = provider.get_interdiff(
+                vcs_repository, previous_review["sha"], head_sha
+            )
+            if diff and diff.strip():
+                logging.info(
+                    f"Incremental review of the changes since {previous_review['sha'][:12]}"
+                )
+            else:
+                logging.info(
+                    "No usable interdiff since the previous review, reviewing the whole PR/MR"
+                )
+                diff = None
+                previous_review = None
+
+        if diff is None:
+            logging.info(f"Fetching diff for PR/MR {vcs_change_id}")
+            diff = provider.get_pr_diff(vcs_repository, vcs_change_id)
         logging.debug(f"Retrieved diff with {len(diff.splitlines())} lines")
 
         # Clone and analyze repository
@@ -283,21 +417,76 @@ def get_review(
         )
 
         logging.info(f"Cloning repository from {repo_url}")
-        clone_repo_with_token(repo_url, vcs_token)
-
-        logging.info("Analyzing repository content")
-        summary, tree, content = ingest_repository("/tmp/clone")
-        logging.debug(
-            f"Repository analysis complete - {len(content.splitlines())} lines of content"
+        workspace.create()
+        clone_repo_with_token(
+            repo_url,
+            vcs_token,
+            clone_dir=workspace.checkout_dir,
+            refs=[get_change_ref(vcs_provider, vcs_change_id)],
+            # Scoped ingestion reads the working tree
+            checkout=not (REVIEW_SCOPE == "full" and INGEST_BACKEND == "pygit2"),
         )
 
-        # Generate and submit prompt
-        logging.info("Generating review prompt")
-        prompt = get_prompt(content, diff)
-        logging.debug(f"Prompt generated with {len(prompt.splitlines())} lines")
+        files = provider.get_pr_files(vcs_repository, vcs_change_id)
+        if previous_review:
+            interdiff_files = {path for path, _ in split_diff(diff)}
+            files = [f for f in files if f["filename"] in interdiff_files]
 
-        logging.info(f"Calling AI API ({llm_api_model}) for review generation")
-        review_text = call_ai_api(llm_api_host, llm_api_key, llm_api_model, llm_api_endpoint, prompt)
+        logging.info(f"Analyzing repository content (scope: {REVIEW_SCOPE})")
+        if REVIEW_SCOPE == "full":
+            # Files are read lazily, the clone is kept until the review is done
+            summary, tree, content = ingest_repository(
+                workspace.checkout_dir, lazy=True
+            )
+            index = get_lexical_index(content, get_tree_sha(workspace.checkout_dir))
+        else:
+            summary, tree, content = ingest_changes(workspace.checkout_dir, files, diff)
+            index = get_lexical_index(content)
+            workspace.cleanup()
+        logging.debug("Repository analysis complete:\n%s", summary)
+
+        changed_files = [f["filename"] for f in files]
+        tokenizer = get_tokenizer(llm_api_model)
+        chunk_tokens = REVIEW_CHUNK_TOKENS or PromptBuilder(llm_api_model).budget // 2
+        if tokenizer.count(diff) > chunk_tokens:
+            logging.info("Diff exceeds the review chunk size, reviewing it in chunks")
+            review_text = get_chunked_review(
+                content,
+                diff,
+                changed_files,
+                chunk_tokens,
+                llm_api_key,
+                llm_api_host,
+                llm_api_model,
+                llm_api_endpoint,
+                previous_review=previous_review["body"] if previous_review else "",
+            )
+        else:
+            # Generate and submit prompt
+            logging.info("Generating review prompt")
+            prompt = get_prompt(
+                content,
+                diff,
+                tree=tree,
+                changed_files=changed_files,
+                api_model=llm_api_model,
+                index=index,
+                previous_review=previous_review["body"] if previous_review else "",
+                template=(
+                    INCREMENTAL_REVIEW_TEMPLATE if previous_review else REVIEW_TEMPLATE
+                ),
+            )
+            logging.debug(f"Prompt generated with {len(prompt.splitlines())} lines")
+
+            logging.info(f"Calling AI API ({llm_api_model}) for review generation")
+            review_text = call_ai_api(
+                llm_api_host,
+                llm_api_key,
+                llm_api_model,
+                llm_api_endpoint,
+                prompt,
+                stop=vote_reached,
+            )
         logging.info("AI review generation completed successfully")
 
         return review_text
@@ -305,9 +494,66 @@ def get_review(
     except Exception as e:
         logging.error(f"Review generation failed: {str(e)}")
         raise
+    finally:
+        workspace.cleanup()
+
 
+REVIEW_TEMPLATE = """Code Review Task:
 
-def get_prompt(content: str, diff: str) -> str:
+Repository Context:
+------------------
+The following shows the relevant repository structure and content that provides
+context for the changes being reviewed.
+
+Begin Repository Content Section
+{tree}
+
+{changed}{related}
+End Repository Content Section
+
+Changes to Review:
+-----------------
+Below are the specific changes being proposed in this pull/merge request.
+Focus your analysis exclusively on these modifications.
+
+Begin PR Changes Diff Section
+{diff}
+End PR Changes Diff Section
+
+Review Instructions:
+-------------------
+1. Analyze the changes for:
+   - Code quality and maintainability
+   - Potential bugs or security issues
+   - Adherence to project conventions
+   - Documentation completeness
+
+2. Consider the repository context only when necessary to understand the changes.
+
+3. Provide specific, actionable feedback:
+   - Praise good practices with examples
+   - Flag concerns with clear explanations
+   - Suggest improvements where applicable
+
+4. Format your response in clear Markdown sections.
+
+5. Conclude with exactly one of these voting directives:
+   - "Vote: +1" (approve if changes are excellent)
+   - "Vote: -1" (request changes if significant issues exist)
+
+6. Keep the review professional and constructive."""
+
+
+def get_prompt(
+    content: Union[str, TreeFiles],
+    diff: str,
+    tree: str = "",
+    changed_files: Optional[List[str]] = None,
+    api_model: str = "",
+    template: str = REVIEW_TEMPLATE,
+    previous_review: str = "",
+    index: Optional[LexicalIndex] = None,
+) -> str:
     """
     Generates a standardized prompt for AI code review analysis.
 
@@ -316,12 +562,28 @@ def get_prompt(content: str, diff: str) -> str:
     - PR/MR diff changes
     - Clear instructions for the AI reviewer
 
+    The prompt is fitted to the model context window, filling the diff
+    first, then the changed files, the related files and the tree.
+
     Parameters:
     -----------
-    content : str
+    content : str or TreeFiles
         The analyzed repository content (from ingest_repository)
     diff : str
         The git diff output for the PR/MR changes
+    tree : str, optional
+        The repository tree structure
+    changed_files : List[str], optional
+        Paths of the files changed by the PR/MR
+    api_model : str, optional
+        Model identifier, used to size the prompt
+    template : str, optional
+        Prompt template, e.g. CHUNK_REVIEW_TEMPLATE (default: REVIEW_TEMPLATE)
+    previous_review : str, optional
+        Previous review text, fills {previous} in INCREMENTAL_REVIEW_TEMPLATE
+    index : LexicalIndex, optional
+        Index of the content, related files most relevant to the diff are
+        filled first, see rank_chunks
 
     Returns:
     --------
@@ -332,40 +594,75 @@ def get_prompt(content: str, diff: str) -> str:
     --------
     >>> prompt = get_prompt(
     ...     content="...repository analysis...",
-    ...     diff="...git diff output..."
+    ...     diff="...git diff output...",
+    ...     api_model="gpt-4o-mini"
     ... )
     """
     logging.info("Constructing AI review prompt")
 
-    prompt = f"""Code Review Task:
+    changed = set(changed_files or [])
 
-Repository Context:
-------------------
-The following shows the relevant repository structure and content that provides
-context for the changes being reviewed.
-
-Begin Repository Content Section
-{content}
-End Repository Content Section
+    builder = PromptBuilder(api_model)
+    builder.add("diff", diff, priority=0)
+    if previous_review:
+        builder.add("previous", previous_review, priority=1)
+    builder.add(
+        "changed", (chunk for _, chunk in iter_files(content, changed)), priority=1
+    )
+    builder.add(
+        "related", rank_chunks(content, index, diff, exclude=changed), priority=2
+    )
+    builder.add("tree", tree, priority=3)
+    prompt = builder.build(template)
 
-Changes to Review:
------------------
-Below are the specific changes being proposed in this pull/merge request.
-Focus your analysis exclusively on these modifications.
+    logging.debug(f"Generated prompt with {len(prompt.splitlines())} lines")
+    return prompt
 
-Begin PR Changes Diff Section
-{diff}
-End PR Changes Diff Section
 
-Review Instructions:
+CHUNK_REVIEW_TEMPLATE = (
+    REVIEW_TEMPLATE.split("Review Instructions:")[0]
+    + """Review Instructions:
 -------------------
+This diff is only one part of a larger pull/merge request, the parts are
+reviewed separately and merged afterwards.
+
 1. Analyze the changes for:
    - Code quality and maintainability
    - Potential bugs or security issues
    - Adherence to project conventions
    - Documentation completeness
 
-2. Consider the repository context only when necessary to understand the changes.
+2. List your findings as concise Markdown bullet points, naming the file
+   and the change each finding refers to.
+
+3. Do NOT conclude with a vote, the vote is decided on the merged review."""
+)
+
+
+INCREMENTAL_REVIEW_TEMPLATE = (
+    """Incremental Code Review Task:
+
+This pull/merge request was already reviewed. The previous review is shown
+below, followed by only the changes pushed since it was written.
+
+Begin Previous Review Section
+{previous}
+End Previous Review Section
+
+"""
+    + REVIEW_TEMPLATE.split("Code Review Task:\n\n", 1)[1].split(
+        "Review Instructions:"
+    )[0]
+    + """Review Instructions:
+-------------------
+1. Analyze the new changes for:
+   - Code quality and maintainability
+   - Potential bugs or security issues
+   - Adherence to project conventions
+   - Documentation completeness
+
+2. For every concern of the previous review, state whether the new changes
+   address it. Do not repeat findings about code that did not change.
 
 3. Provide specific, actionable feedback:
    - Praise good practices with examples
@@ -374,11 +671,241 @@ Review Instructions:
 
 4. Format your response in clear Markdown sections.
 
-5. Conclude with exactly one of these voting directives:
+5. Conclude with exactly one of these voting directives, for the
+   pull/merge request as a whole:
    - "Vote: +1" (approve if changes are excellent)
    - "Vote: -1" (request changes if significant issues exist)
 
 6. Keep the review professional and constructive."""
+)
 
-    logging.debug(f"Generated prompt with {len(prompt.splitlines())} lines")
-    return prompt
+
+REDUCE_REVIEW_TEMPLATE = """Code Review Merge Task:
+
+The changes of a large pull/merge request were split into parts and each
+part was reviewed separately. Merge the partial reviews below into one
+review of the whole pull/merge request.
+
+Changed files:
+{files}
+
+Begin Partial Reviews Section
+{reviews}
+End Partial Reviews Section
+
+Review Instructions:
+-------------------
+1. Remove duplicated findings and group the rest by topic.
+
+2. Keep every specific, actionable finding:
+   - Praise good practices with examples
+   - Flag concerns with clear explanations
+   - Suggest improvements where applicable
+
+3. Format your response in clear Markdown sections.
+
+4. Conclude with exactly one of these voting directives:
+   - "Vote: +1" (approve if changes are excellent)
+   - "Vote: -1" (request changes if significant issues exist)
+
+5. Keep the review professional and constructive."""
+
+
+INCREMENTAL_CHUNK_REVIEW_TEMPLATE = (
+    INCREMENTAL_REVIEW_TEMPLATE.split("Review Instructions:")[0]
+    + "Review Instructions:"
+    + CHUNK_REVIEW_TEMPLATE.split("Review Instructions:")[1]
+    + """
+
+4. When a change addresses a concern of the previous review, say so."""
+)
+
+
+INCREMENTAL_REDUCE_REVIEW_TEMPLATE = """Incremental Code Review Merge Task:
+
+This pull/merge request was already reviewed. The changes pushed since the
+previous review were split into parts and each part was reviewed
+separately. Merge the partial reviews below into one review of the new
+changes.
+
+Begin Previous Review Section
+{previous}
+End Previous Review Section
+
+Changed files:
+{files}
+
+Begin Partial Reviews Section
+{reviews}
+End Partial Reviews Section
+
+Review Instructions:
+-------------------
+1. Remove duplicated findings and group the rest by topic.
+
+2. For every concern of the previous review, state whether the new changes
+   address it. Do not repeat findings about code that did not change.
+
+3. Keep every specific, actionable finding:
+   - Praise good practices with examples
+   - Flag concerns with clear explanations
+   - Suggest improvements where applicable
+
+4. Format your response in clear Markdown sections.
+
+5. Conclude with exactly one of these voting directives, for the
+   pull/merge request as a whole:
+   - "Vote: +1" (approve if changes are excellent)
+   - "Vote: -1" (request changes if significant issues exist)
+
+6. Keep the review professional and constructive."""
+
+
+def chunk_diff(diff: str, max_tokens: int, api_model: str = "") -> List[str]:
+    """
+    Split a diff into chunks of at most max_tokens tokens.
+
+    Whole file diffs are packed together while they fit, files bigger than
+    a chunk are split by hunks. A single hunk bigger than a chunk is kept
+    as is and trimmed when its prompt is built.
+
+    Parameters:
+    -----------
+    diff : str
+        The git diff output for the PR/MR changes
+    max_tokens : int
+        Maximum size of a chunk in tokens
+    api_model : str, optional
+        Model identifier, used to pick the tokenizer
+
+    Returns:
+    --------
+    List[str]
+        The diff chunks, in diff order
+    """
+    tokenizer = get_tokenizer(api_model)
+    pieces = []
+    for _, file_diff in split_diff(diff):
+        if tokenizer.count(file_diff) <= max_tokens:
+            pieces.append(file_diff)
+        else:
+            pieces.extend(split_hunks(file_diff))
+
+    chunks: List[str] = []
+    size = 0
+    for piece in pieces:
+        tokens = tokenizer.count(piece)
+        if chunks and size + tokens <= max_tokens:
+            chunks[-1] += piece
+            size += tokens
+        else:
+            chunks.append(piece)
+            size = tokens
+    return chunks
+
+
+def get_chunked_review(
+    content: Union[str, TreeFiles],
+    diff: str,
+    changed_files: List[str],
+    chunk_tokens: int,
+    llm_api_key: str,
+    llm_api_host: str,
+    llm_api_model: str,
+    llm_api_endpoint: str,
+    previous_review: str = "",
+) -> str:
+    """
+    Review a diff too large for one request with a map-reduce pipeline.
+
+    The diff is split into chunks that are reviewed concurrently, each
+    with the content of the files it touches as context. The partial
+    reviews are then merged by a final call, which produces the single
+    review text and vote expected by action_review. With a previous
+    review, the diff is an interdiff and both the chunk and the merge
+    prompts are incremental, as in the single prompt path.
+
+    Parameters:
+    -----------
+    content : str or TreeFiles
+        The analyzed repository content
+    diff : str
+        The git diff output for the PR/MR changes
+    changed_files : List[str]
+        Paths of the files changed by the PR/MR
+    chunk_tokens : int
+        Maximum size of a diff chunk in tokens
+    llm_api_key : str
+        API key for the LLM service
+    llm_api_host : str
+        Base URL for the LLM API
+    llm_api_model : str
+        Model name for the LLM service
+    llm_api_endpoint : str
+        Endpoint of the LLM API
+    previous_review : str, optional
+        Previous review text, for incremental reviews
+
+    Returns:
+    --------
+    str
+        The merged review text containing analysis and vote
+    """
+    chunks = chunk_diff(diff, chunk_tokens, llm_api_model)
+    logging.info(
+        f"Reviewing {len(chunks)} diff chunks with up to {LLM_CONCURRENCY} concurrent calls"
+    )
+
+    def review_chunk(index: int, chunk: str) -> str:
+        chunk_files = {path for path, _ in split_diff(chunk)}
+        prompt = get_prompt(
+            "".join(chunk for _, chunk in iter_files(content, chunk_files)),
+            chunk,
+            changed_files=list(chunk_files),
+            api_model=llm_api_model,
+            previous_review=previous_review,
+            template=(
+                INCREMENTAL_CHUNK_REVIEW_TEMPLATE
+                if previous_review
+                else CHUNK_REVIEW_TEMPLATE
+            ),
+        )
+        logging.info(f"Reviewing diff chunk {index + 1}/{len(chunks)}")
+        return call_ai_api(
+            llm_api_host, llm_api_key, llm_api_model, llm_api_endpoint, prompt
+        )
+
+    results = run_concurrently(
+        lambda args: review_chunk(*args), list(enumerate(chunks))
+    )
+    for _, error in results:
+        if error is not None:
+            raise error
+    reviews = [review for review, _ in results]
+
+    logging.info("Merging partial reviews")
+    builder = PromptBuilder(llm_api_model)
+    builder.add("files", "\n".join(f"- {path}" for path in changed_files), priority=1)
+    builder.add(
+        "reviews",
+        [
+            f"### Part {index + 1}/{len(reviews)}\n\n{review}\n\n"
+            for index, review in enumerate(reviews)
+        ],
+        priority=0,
+    )
+    if previous_review:
+        builder.add("previous", previous_review, priority=1)
+    prompt = builder.build(
+        INCREMENTAL_REDUCE_REVIEW_TEMPLATE
+        if previous_review
+        else REDUCE_REVIEW_TEMPLATE
+    )
+    return call_ai_api(
+        llm_api_host,
+        llm_api_key,
+        llm_api_model,
+        llm_api_endpoint,
+        prompt,
+        stop=vote_reached,
+    )
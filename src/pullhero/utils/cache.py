@@ -0,0 +1,273 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+#
+# Copyright (C) 2025 authors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Iterable, Optional, Tuple
+
+# Directory holding every persistent PullHero cache
+CACHE_DIR = os.environ.get(
+    "PULLHERO_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "pullhero")
+)
+
+# Inserts between two expiry and size checks
+EVICT_INTERVAL = 256
+
+
+def _env_enabled(name: str, default: str = "true") -> bool:
+    """
+    Read a boolean switch from the environment.
+    """
+    return os.environ.get(name, default).lower() not in ("0", "false", "no", "off")
+
+
+class Cache:
+    """
+    Persistent key-value store backed by SQLite.
+
+    Values are stored as TEXT or BLOB next to their creation and last
+    access time. Entries older than max_age_days are expired and, once the
+    store grows over max_size_mb, the least recently used entries are
+    evicted. SQLite is used in WAL mode so concurrent runs on the same host
+    can share a cache. Each thread keeps its own connection open, and
+    expiry and eviction run on the first insert then every EVICT_INTERVAL
+    inserts, so the size limit may be exceeded by that many entries.
+
+    Cache failures are logged and never raised, a broken cache only costs
+    the work it was meant to save.
+
+    Example:
+    --------
+    >>> cache = Cache("llm", max_age_days=7, max_size_mb=256)
+    >>> key = Cache.make_key("gpt-4o-mini", prompt)
+    >>> cache.get(key) or cache.set(key, call_model(prompt))
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_age_days: float = 7,
+        max_size_mb: float = 256,
+        enabled: bool = True,
+        cache_dir: Optional[str] = None,
+    ) -> None:
+        """
+        Initialize the cache, the database is created on first use.
+
+        Args:
+            name: Cache name, used as database file name
+            max_age_days: Entries older than this are expired, 0 disables expiry
+            max_size_mb: Size over which the LRU entries are evicted, 0 disables it
+            enabled: When False every lookup misses and nothing is stored
+            cache_dir: Directory of the database (default: PULLHERO_CACHE_DIR)
+        """
+        self.name = name
+        self.path = Path(cache_dir or CACHE_DIR).expanduser() / f"{name}.sqlite3"
+        self.max_age = max_age_days * 86400
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self.enabled = enabled
+        self.logger = logging.getLogger(f"{self.__class__.__name__}")
+        self._initialized = False
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._inserts = 0
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """
+        Build a content address from JSON serializable parts.
+        """
+        serialized = json.dumps(parts, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Get the connection of the calling thread, creating the schema on
+        first use.
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            return connection
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(str(self.path), timeout=30)
+        # Entries can always be recomputed, skip the fsync on every commit
+        connection.execute("PRAGMA synchronous=NORMAL")
+        if not self._initialized:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " value BLOB NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created REAL NOT NULL,"
+                " accessed REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)"
+            )
+            connection.commit()
+            self._initialized = True
+        self._local.connection = connection
+        return connection
+
+    def _drop_connection(self) -> None:
+        """
+        Close the connection of the calling thread after a failure.
+        """
+        connection = getattr(self._local, "connection", None)
+        self._local.connection = None
+        if connection is not None:
+            try:
+                connection.close()
+            except sqlite3.Error:
+                pass
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Get a cached value, None on miss, expiry or when disabled.
+        """
+        if not self.enabled:
+            return None
+        try:
+            connection = self._connect()
+            now = time.time()
+            row = connection.execute(
+                "SELECT value, created FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self.max_age and row[1] < now - self.max_age:
+                connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+                connection.commit()
+                return None
+            connection.execute(
+                "UPDATE entries SET accessed = ? WHERE key = ?", (now, key)
+            )
+            connection.commit()
+            return row[0]
+        except sqlite3.Error as e:
+            self.logger.warning(f"{self.name} cache lookup failed: {str(e)}")
+            self._drop_connection()
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Store a str or bytes value and evict what no longer fits.
+        """
+        self.set_many([(key, value)])
+
+    def set_many(self, items: Iterable[Tuple[str, Any]]) -> None:
+        """
+        Store several str or bytes values in a single transaction.
+        """
+        if not self.enabled:
+            return
+        try:
+            connection = self._connect()
+            now = time.time()
+            rows = [
+                (
+                    key,
+                    value,
+                    len(value.encode("utf-8") if isinstance(value, str) else value),
+                    now,
+                    now,
+                )
+                for key, value in items
+            ]
+            if not rows:
+                return
+            connection.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, size, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            with self._lock:
+                evict = self._inserts == 0 or (
+                    self._inserts // EVICT_INTERVAL
+                    != (self._inserts + len(rows)) // EVICT_INTERVAL
+                )
+                self._inserts += len(rows)
+            if evict:
+                self._evict(connection, now)
+            connection.commit()
+        except sqlite3.Error as e:
+            self.logger.warning(f"{self.name} cache store failed: {str(e)}")
+            self._drop_connection()
+
+    def _evict(self, connection: sqlite3.Connection, now: float) -> None:
+        """
+        Expire old entries, then drop the least recently used over the size limit.
+        """
+        if self.max_age:
+            connection.execute(
+                "DELETE FROM entries WHERE created < ?", (now - self.max_age,)
+            )
+        if not self.max_size:
+            return
+        total = connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()[0]
+        if total <= self.max_size:
+            return
+        evicted = 0
+        for key, size in connection.execute(
+            "SELECT key, size FROM entries ORDER BY accessed"
+        ).fetchall():
+            if total <= self.max_size:
+                break
+            connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        self.logger.debug(f"Evicted {evicted} entries from the {self.name} cache")
+
+
+# LLM responses keyed by host, endpoint, API key hash, model, parameters and
+# prompt, opt-in since completions are sampled
+llm_cache = Cache(
+    "llm",
+    max_age_days=float(os.environ.get("PULLHERO_LLM_CACHE_MAX_AGE", "7")),
+    max_size_mb=float(os.environ.get("PULLHERO_LLM_CACHE_MAX_SIZE", "256")),
+    enabled=_env_enabled("PULLHERO_LLM_CACHE", "false"),
+)
+
+# Ingested snapshots keyed by tree SHA, and file contents keyed by blob SHA
+ingest_cache = Cache(
+    "ingest",
+    max_age_days=float(os.environ.get("PULLHERO_INGEST_CACHE_MAX_AGE", "7")),
+    max_size_mb=float(os.environ.get("PULLHERO_INGEST_CACHE_MAX_SIZE", "1024")),
+    enabled=_env_enabled("PULLHERO_INGEST_CACHE"),
+)
+
+# Whether VCS response bodies may be written to disk, validators alone otherwise
+VCS_CACHE_BODIES = _env_enabled("PULLHERO_VCS_CACHE_BODIES", "false")
+
+# VCS API payloads, e.g. issue comments keyed by their count
+vcs_cache = Cache(
+    "vcs",
+    max_age_days=float(os.environ.get("PULLHERO_VCS_CACHE_MAX_AGE", "7")),
+    max_size_mb=float(os.environ.get("PULLHERO_VCS_CACHE_MAX_SIZE", "64")),
+    enabled=_env_enabled("PULLHERO_VCS_CACHE"),
+)
@@ -0,0 +1,244 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+#
+# Copyright (C) 2025 authors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+import re
+import json
+import posixpath
+from pathlib import PurePosixPath
+from typing import Callable, Dict, List, Optional, Set
+
+# Source files whose imports are indexed
+GRAPH_EXTENSIONS = (".py", ".go")
+
+# Bump whenever import parsing changes, invalidating the cached imports
+GRAPH_VERSION = 1
+
+_PY_IMPORT_RE = re.compile(
+    r"^\s*(?:from\s+(\.*[\w.]*)\s+import\s+([\w, ()*]+)|import\s+([\w., ]+))",
+    re.MULTILINE,
+)
+_GO_IMPORT_RE = re.compile(r'^import\s+(?:[\w.]+\s+)?"([^"]+)"', re.MULTILINE)
+_GO_IMPORT_BLOCK_RE = re.compile(r"^import\s*\((.*?)\)", re.MULTILINE | re.DOTALL)
+_GO_IMPORT_SPEC_RE = re.compile(r'^\s*(?:[\w.]+\s+)?"([^"]+)"', re.MULTILINE)
+_GO_MODULE_RE = re.compile(r"^module\s+(\S+)", re.MULTILINE)
+
+
+def python_import_candidates(filename: str, text: str) -> List[str]:
+    """
+    List the dotted module names a Python file may import.
+
+    Relative imports are made absolute from the package of the file, and
+    "from pkg import name" yields both pkg and pkg.name since name may be
+    a submodule.
+    """
+    package = PurePosixPath(filename).parent
+    candidates = []
+    for match in _PY_IMPORT_RE.finditer(text):
+        from_module, names, modules = match.groups()
+        if modules:
+            candidates.extend(m.strip().split(" ")[0] for m in modules.split(","))
+            continue
+        # Relative imports are resolved from the importing package
+        level = len(from_module) - len(from_module.lstrip("."))
+        module = from_module.lstrip(".")
+        base = package
+        for _ in range(max(level - 1, 0)):
+            base = base.parent
+        prefix = ".".join(p for p in base.parts if p != ".") if level else ""
+        dotted = ".".join(p for p in (prefix, module) if p)
+        candidates.append(dotted)
+        # "from pkg import module" may import submodules
+        for name in names.replace("(", "").replace(")", "").split(","):
+            name = name.strip().split(" ")[0]
+            if name and name != "*":
+                candidates.append(f"{dotted}.{name}" if dotted else name)
+    return candidates
+
+
+def resolve_python_module(dotted: str, exists: Callable[[str], bool]) -> List[str]:
+    """
+    Resolve a dotted module name to the repository files defining it.
+
+    The module is looked up both from the repository root and from a src/
+    layout, as a module file or a package __init__.py.
+    """
+    parts = [p for p in dotted.split(".") if p]
+    if not parts:
+        return []
+    found = []
+    for base in ("", "src/"):
+        module_path = base + "/".join(parts)
+        for path in (f"{module_path}.py", f"{module_path}/__init__.py"):
+            if exists(path):
+                found.append(path)
+    return found
+
+
+def go_imports(text: str) -> List[str]:
+    """
+    List the package paths imported by a Go file, single and block imports.
+    """
+    imports = _GO_IMPORT_RE.findall(text)
+    for block in _GO_IMPORT_BLOCK_RE.findall(text):
+        imports.extend(_GO_IMPORT_SPEC_RE.findall(block))
+    return imports
+
+
+def parse_imports(path: str, text: str) -> List[str]:
+    """
+    List the unresolved imports of a source file.
+
+    Returns dotted module names for Python files, package paths for Go
+    files and nothing for other files. The result only depends on the path
+    and the text, so it can be cached by blob.
+    """
+    if path.endswith(".py"):
+        return python_import_candidates(path, text)
+    if path.endswith(".go"):
+        return go_imports(text)
+    return []
+
+
+class ImportGraph:
+    """
+    Dependency graph between the source files of a repository.
+
+    Edges go from a file to the repository files it imports: Python
+    modules, and every non-test file of an imported Go package of the
+    repository's own modules (declared by go.mod files). Callees of a
+    file are the files it imports, callers are the files importing it.
+
+    Example:
+    --------
+    >>> graph = ImportGraph.build(paths, {"app.py": ["pkg.util"]}, {})
+    >>> graph.callees("app.py")
+    ['pkg/util.py']
+    >>> graph.callers("pkg/util.py")
+    ['app.py']
+    """
+
+    def __init__(self, imports: Dict[str, List[str]]) -> None:
+        """
+        Initialize the graph from its resolved edges, see build.
+
+        Args:
+            imports: Mapping of file path to the repository files it imports
+        """
+        self.imports = imports
+        self.importers: Dict[str, List[str]] = {}
+        for path, imported in imports.items():
+            for target in imported:
+                self.importers.setdefault(target, []).append(path)
+
+    @classmethod
+    def build(
+        cls,
+        paths: List[str],
+        specs: Dict[str, List[str]],
+        go_mods: Dict[str, str],
+    ) -> "ImportGraph":
+        """
+        Resolve parsed imports against the files of a repository.
+
+        Args:
+            paths: Every file path of the repository
+            specs: Unresolved imports of every source file, see parse_imports
+            go_mods: Content of every go.mod file, by path
+
+        Returns:
+            The import graph
+        """
+        existing = set(paths)
+        modules = {}
+        for path, text in go_mods.items():
+            match = _GO_MODULE_RE.search(text or "")
+            if match:
+                modules[match.group(1)] = posixpath.dirname(path)
+        packages: Dict[str, List[str]] = {}
+        for path in paths:
+            if path.endswith(".go") and not path.endswith("_test.go"):
+                packages.setdefault(posixpath.dirname(path), []).append(path)
+
+        def resolve_go(import_path: str) -> List[str]:
+            # The longest module path owning the import wins, for nested modules
+            for module in sorted(modules, key=len, reverse=True):
+                if import_path == module or import_path.startswith(f"{module}/"):
+                    relative = import_path[len(module) :].lstrip("/")
+                    directory = posixpath.normpath(
+                        posixpath.join(modules[module], relative)
+                    )
+                    return packages.get("" if directory == "." else directory, [])
+            return []
+
+        imports: Dict[str, List[str]] = {}
+        for path, imported in specs.items():
+            resolved: List[str] = []
+            for spec in imported:
+                if path.endswith(".go"):
+                    targets = resolve_go(spec)
+                else:
+                    targets = resolve_python_module(spec, existing.__contains__)
+                resolved.extend(t for t in targets if t != path and t not in resolved)
+            if resolved:
+                imports[path] = resolved
+        return cls(imports)
+
+    def callees(self, path: str) -> List[str]:
+        """
+        Files imported by a file.
+        """
+        return list(self.imports.get(path, []))
+
+    def callers(self, path: str) -> List[str]:
+        """
+        Files importing a file.
+        """
+        return list(self.importers.get(path, []))
+
+    def related(self, filenames: List[str], limit: Optional[int] = None) -> List[str]:
+        """
+        Callees then callers of a set of files, the files themselves excluded.
+
+        Args:
+            filenames: Repository relative paths, e.g. the changed files
+            limit: Maximum number of files returned
+
+        Returns:
+            Related repository relative paths, without duplicates
+        """
+        seen: Set[str] = set(filenames)
+        related: List[str] = []
+        for filename in filenames:
+            for path in self.callees(filename) + self.callers(filename):
+                if path not in seen:
+                    seen.add(path)
+                    related.append(path)
+        return related[:limit] if limit else related
+
+    def to_json(self) -> str:
+        """
+        Serialize the graph.
+        """
+        return json.dumps(self.imports, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, data: str) -> "ImportGraph":
+        """
+        Load a graph serialized by to_json.
+        """
+        return cls(json.loads(data))
@@ -0,0 +1,1109 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+#
+# Copyright (C) 2025 authors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import re
+import json
+import logging
+import fnmatch
+import threading
+import pygit2
+from pygit2.enums import AttrCheck
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from pullhero.utils.cache import Cache, ingest_cache
+from pullhero.utils.graph import (
+    GRAPH_EXTENSIONS,
+    GRAPH_VERSION,
+    ImportGraph,
+    parse_imports,
+    python_import_candidates,
+    resolve_python_module,
+)
+
+# 'gitingest' walks the checkout, 'pygit2' reads blobs from the object database
+# of a bare clone, 'auto' reads them from the object database of the checkout
+# and only falls back to gitingest outside of a git repository
+INGEST_BACKEND = os.environ.get("PULLHERO_INGEST_BACKEND", "auto")
+# Threads reading and decoding blobs in ingest_tree, 0 picks one per core plus four
+INGEST_WORKERS = int(os.environ.get("PULLHERO_INGEST_WORKERS", "0")) or min(
+    32, (os.cpu_count() or 1) + 4
+)
+# Files bigger than this are never included in the prompt
+MAX_FILE_SIZE = int(os.environ.get("PULLHERO_INGEST_MAX_FILE_SIZE", str(512 * 1024)))
+# Changed files longer than this are reduced to the regions around their hunks
+MAX_FULL_FILE_LINES = 400
+HUNK_CONTEXT_LINES = 20
+# Maximum number of related files pulled in next to the changed files
+MAX_RELATED_FILES = 20
+
+FILE_SEPARATOR = "=" * 48
+
+# Bump whenever the layout of ingested content changes, invalidating the cache
+INGEST_CACHE_VERSION = 3
+
+# Directories and files ingest_tree leaves out, mirroring gitingest's default
+# ignore patterns: dependencies, build output, lockfiles, minified bundles,
+# media and editor files
+IGNORED_DIRECTORIES = (
+    ".git",
+    ".svn",
+    ".hg",
+    "__pycache__",
+    ".pytest_cache",
+    ".tox",
+    ".nox",
+    ".mypy_cache",
+    ".ruff_cache",
+    ".hypothesis",
+    "node_modules",
+    "bower_components",
+    ".npm",
+    ".yarn",
+    ".pnpm-store",
+    ".gradle",
+    ".settings",
+    ".build",
+    "*.xcodeproj",
+    "*.xcworkspace",
+    "xcuserdata",
+    ".swiftpm",
+    ".bundle",
+    "target",
+    "pkg",
+    "obj",
+    "bin",
+    "venv",
+    ".venv",
+    "env",
+    ".env",
+    "virtualenv",
+    ".idea",
+    ".vscode",
+    ".vs",
+    ".cache",
+    ".sass-cache",
+    "build",
+    "dist",
+    "out",
+    "*.egg-info",
+    "site-packages",
+    ".docusaurus",
+    ".next",
+    ".nuxt",
+    "vendor",
+)
+IGNORED_FILES = (
+    "*.pyc",
+    "*.pyo",
+    "*.pyd",
+    ".coverage",
+    "poetry.lock",
+    "Pipfile.lock",
+    "package-lock.json",
+    "yarn.lock",
+    "bun.lock",
+    "bun.lockb",
+    "Gemfile.lock",
+    "Cargo.lock",
+    "*.class",
+    "*.jar",
+    "*.war",
+    "*.ear",
+    "*.nar",
+    "*.gradle",
+    ".classpath",
+    "gradle-app.setting",
+    ".project",
+    "*.o",
+    "*.obj",
+    "*.dll",
+    "*.dylib",
+    "*.exe",
+    "*.lib",
+    "*.out",
+    "*.a",
+    "*.pdb",
+    "*.bin",
+    "*.pbxuser",
+    "*.xcuserstate",
+    "*.gem",
+    ".ruby-version",
+    ".ruby-gemset",
+    ".rvmrc",
+    "*.rs.bk",
+    "*.suo",
+    "*.user",
+    "*.userosscache",
+    "*.sln.docstates",
+    "*.nupkg",
+    ".gitignore",
+    ".gitattributes",
+    ".gitmodules",
+    "*.svg",
+    "*.png",
+    "*.jpg",
+    "*.jpeg",
+    "*.gif",
+    "*.ico",
+    "*.pdf",
+    "*.mov",
+    "*.mp4",
+    "*.mp3",
+    "*.wav",
+    "*.swo",
+    "*.swn",
+    "*.swp",
+    "*.sublime-*",
+    "*.log",
+    "*.bak",
+    "*.tmp",
+    "*.temp",
+    ".eslintcache",
+    ".DS_Store",
+    "Thumbs.db",
+    "desktop.ini",
+    "*.egg",
+    "*.whl",
+    "*.so",
+    "*.db",
+    "*.sqlite",
+    "*.sqlite3",
+    "*.min.js",
+    "*.min.css",
+    "*.map",
+    "*.tfstate*",
+    "digest.txt",
+)
+
+_HUNK_RE = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+
+def format_file(path: str, text: str) -> str:
+    """
+    Format a file the same way gitingest lays out its content section.
+    """
+    return f"{FILE_SEPARATOR}\nFILE: {path}\n{FILE_SEPARATOR}\n{text}\n\n"
+
+
+def format_file_parts(path: str, text: str) -> Tuple[str, str, str]:
+    """
+    Split a file formatted as format_file does into header, text and
+    trailer, so it can be joined without building a formatted copy.
+    """
+    return f"{FILE_SEPARATOR}\nFILE: {path}\n{FILE_SEPARATOR}\n", text, "\n\n"
+
+
+def iter_file_spans(content: str) -> Iterator[Tuple[str, int, int]]:
+    """
+    Locate the file chunks of gitingest formatted content without copying.
+
+    Parameters:
+    -----------
+    content : str
+        Content as returned by ingest_repository or ingest_changes
+
+    Yields:
+    -------
+    Tuple[str, int, int]
+        (path, start, stop) of every chunk in their original order, so
+        content[start:stop] is the formatted chunk. Text found before the
+        first file is yielded with an empty path
+    """
+    marker = f"{FILE_SEPARATOR}\nFILE: "
+    start = content.find(marker)
+    if start == -1:
+        if content:
+            yield "", 0, len(content)
+        return
+    if start > 0:
+        yield "", 0, start
+    while start != -1:
+        end = content.find(marker, start + len(marker))
+        stop = end if end != -1 else len(content)
+        newline = content.find("\n", start + len(marker), stop)
+        path = content[start + len(marker) : newline if newline != -1 else stop]
+        yield path, start, stop
+        start = end
+
+
+def iter_files(
+    content: Union[str, "TreeFiles"], paths: Optional[Iterable[str]] = None
+) -> Iterator[Tuple[str, str]]:
+    """
+    Lazily split ingested content into one chunk per file.
+
+    Only the chunk being yielded is copied out of a content string, so the
+    content is never duplicated as a whole. TreeFiles are read from the
+    object database one file at a time.
+
+    Parameters:
+    -----------
+    content : str or TreeFiles
+        Content as returned by ingest_repository or ingest_changes
+    paths : Iterable[str], optional
+        Only yield these files, TreeFiles then only read them
+
+    Yields:
+    -------
+    Tuple[str, str]
+        (path, formatted chunk) pairs in their original order, text found
+        before the first file of a string is yielded with an empty path
+    """
+    if isinstance(content, TreeFiles):
+        for path, text in content.read(paths):
+            yield path, format_file(path, text)
+        return
+    selected = set(paths) if paths is not None else None
+    for path, start, stop in iter_file_spans(content):
+        if selected is None or path in selected:
+            yield path, content[start:stop]
+
+
+def split_diff(diff: str) -> List[Tuple[str, str]]:
+    """
+    Split a unified diff into one diff per file.
+
+    Parameters:
+    -----------
+    diff : str
+        Unified diff of the PR/MR
+
+    Returns:
+    --------
+    List[Tuple[str, str]]
+        (path, file diff) pairs in their original order
+    """
+    files: List[Tuple[str, str]] = []
+    lines: List[str] = []
+    for line in diff.splitlines(keepends=True):
+        if line.startswith("diff --git ") and lines:
+            files.append("".join(lines))
+            lines = []
+        lines.append(line)
+    if lines:
+        files.append("".join(lines))
+
+    result = []
+    for file_diff in files:
+        path = ""
+        for line in file_diff.splitlines():
+            if line.startswith("+++ ") and line[4:].strip() != "/dev/null":
+                path = line[4:].strip().split("/", 1)[-1]
+                break
+            if line.startswith("--- ") and line[4:].strip() != "/dev/null":
+                path = line[4:].strip().split("/", 1)[-1]
+            elif line.startswith("diff --git ") and not path:
+                path = line.rsplit(" b/", 1)[-1]
+        result.append((path, file_diff))
+    return result
+
+
+def split_hunks(file_diff: str) -> List[str]:
+    """
+    Split the diff of one file into hunks, each prefixed with the file header.
+    """
+    header: List[str] = []
+    hunks: List[List[str]] = []
+    for line in file_diff.splitlines(keepends=True):
+        if line.startswith("@@"):
+            hunks.append([line])
+        elif hunks:
+            hunks[-1].append(line)
+        else:
+            header.append(line)
+    if not hunks:
+        return [file_diff]
+    return ["".join(header + hunk) for hunk in hunks]
+
+
+def parse_diff_hunks(diff: str) -> Dict[str, List[Tuple[int, int]]]:
+    """
+    Extract the changed line ranges of every file in a unified diff.
+
+    Parameters:
+    -----------
+    diff : str
+        Unified diff of the PR/MR
+
+    Returns:
+    --------
+    Dict[str, List[Tuple[int, int]]]
+        Mapping of new file path to (first line, last line) ranges, in the
+        post-change numbering
+
+    Example:
+    --------
+    >>> parse_diff_hunks("+++ b/app.py\\n@@ -1,2 +1,3 @@\\n")
+    {'app.py': [(1, 3)]}
+    """
+    hunks: Dict[str, List[Tuple[int, int]]] = {}
+    current: Optional[str] = None
+    for line in diff.splitlines():
+        if line.startswith("+++ "):
+            target = line[4:].strip()
+            current = None if target == "/dev/null" else target.split("/", 1)[-1]
+            if current is not None:
+                hunks.setdefault(current, [])
+        elif current is not None:
+            match = _HUNK_RE.match(line)
+            if match:
+                start = int(match.group(1))
+                length = int(match.group(2)) if match.group(2) is not None else 1
+                hunks[current].append((start, start + max(length, 1) - 1))
+    return hunks
+
+
+def _read_text(path: Path) -> Optional[str]:
+    """
+    Read a text file, returning None for missing, oversized or binary files.
+    """
+    try:
+        if not path.is_file() or path.stat().st_size > MAX_FILE_SIZE:
+            return None
+        data = path.read_bytes()
+    except OSError:
+        return None
+    return _decode_text(data)
+
+
+def _decode_text(data: bytes) -> Optional[str]:
+    """
+    Decode file data, returning None for binary data (NUL in the first 8KB,
+    as git does).
+    """
+    if b"\0" in data[:8000]:
+        return None
+    return data.decode("utf-8", errors="replace")
+
+
+def get_backend(tree_sha: Optional[str]) -> str:
+    """
+    Resolve the backend ingesting a path from the SHA of its HEAD tree.
+
+    Parameters:
+    -----------
+    tree_sha : str, optional
+        SHA returned by get_tree_sha, None outside of a git repository
+
+    Returns:
+    --------
+    str
+        'pygit2' or 'gitingest'
+    """
+    if INGEST_BACKEND == "auto":
+        return "pygit2" if tree_sha else "gitingest"
+    return INGEST_BACKEND
+
+
+def get_tree_sha(local_repo_path: str) -> Optional[str]:
+    """
+    Get the SHA of the tree at HEAD, None when the path is not a git checkout.
+
+    PullHero checkouts are never modified, so the HEAD tree identifies the
+    working tree content.
+    """
+    try:
+        repo = pygit2.Repository(local_repo_path)
+        return str(repo.head.peel(pygit2.Commit).tree_id)
+    except (pygit2.GitError, KeyError, ValueError):
+        return None
+
+
+def _blob_shas(local_repo_path: str, paths: List[str]) -> Dict[str, str]:
+    """
+    Map paths to the SHA of their blob at HEAD, skipping unknown paths.
+    """
+    try:
+        repo = pygit2.Repository(local_repo_path)
+        tree = repo.head.peel(pygit2.Commit).tree
+    except (pygit2.GitError, KeyError, ValueError):
+        return {}
+    shas = {}
+    for path in paths:
+        try:
+            entry = tree[path]
+        except KeyError:
+            continue
+        if entry.type_str == "blob":
+            shas[path] = str(entry.id)
+    return shas
+
+
+def snapshot_key(tree_sha: str, *params) -> str:
+    """
+    Build the ingestion cache key of a snapshot of the given tree.
+
+    Parameters:
+    -----------
+    tree_sha : str
+        SHA of the ingested tree, see get_tree_sha
+    *params
+        JSON serializable arguments the snapshot depends on
+
+    Returns:
+    --------
+    str
+        Content address of the snapshot
+    """
+    return Cache.make_key(
+        "snapshot", INGEST_CACHE_VERSION, MAX_FILE_SIZE, tree_sha, *params
+    )
+
+
+def load_snapshot(key: str) -> Optional[Tuple[str, str, str]]:
+    """
+    Get a cached (summary, tree, content) snapshot, None on miss.
+    """
+    cached = ingest_cache.get(key)
+    if cached is None:
+        return None
+    summary, tree, content = json.loads(cached)
+    logging.getLogger(__name__).info(f"Ingestion served from cache ({key[:12]})")
+    return summary, tree, content
+
+
+def store_snapshot(key: str, snapshot: Tuple[str, str, str]) -> None:
+    """
+    Cache a (summary, tree, content) snapshot.
+    """
+    ingest_cache.set(key, json.dumps(list(snapshot)))
+
+
+def _read_blob_text(root: Path, path: str, blob_sha: Optional[str]) -> Optional[str]:
+    """
+    Read a text file through the per-blob cache, see _read_text.
+
+    Blobs are content-addressed, so files unchanged since a previous run,
+    at any path, are served from the cache.
+    """
+    if blob_sha is None:
+        return _read_text(root / path)
+    key = Cache.make_key("blob", blob_sha, MAX_FILE_SIZE)
+    cached = ingest_cache.get(key)
+    if cached is not None:
+        return json.loads(cached)
+    text = _read_text(root / path)
+    ingest_cache.set(key, json.dumps(text))
+    return text
+
+
+def _matches(name: str, patterns: Tuple[str, ...]) -> bool:
+    """
+    Check whether a file or directory name matches any glob pattern.
+    """
+    return any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+
+
+def _walk_tree(
+    repo: pygit2.Repository,
+    tree: pygit2.Tree,
+    prefix: str = "",
+    ignore: bool = False,
+) -> Iterator[Tuple[str, pygit2.Object]]:
+    """
+    Yield (path, entry) for every regular file of a tree, recursively.
+
+    Symlinks and submodules are skipped, they have no content to ingest.
+    With ignore, directories matching IGNORED_DIRECTORIES are not entered
+    and files matching IGNORED_FILES are skipped, as gitingest does.
+    """
+    for entry in tree:
+        path = f"{prefix}{entry.name}"
+        if entry.type_str == "tree":
+            if not (ignore and _matches(entry.name, IGNORED_DIRECTORIES)):
+                yield from _walk_tree(repo, repo[entry.id], f"{path}/", ignore)
+        elif entry.type_str == "blob" and entry.filemode != pygit2.GIT_FILEMODE_LINK:
+            if not (ignore and _matches(entry.name, IGNORED_FILES)):
+                yield path, entry
+
+
+_worker_repos = threading.local()
+
+
+def _worker_repo(repo_path: str) -> pygit2.Repository:
+    """
+    Open a repository once per thread, libgit2 objects are not shared
+    between threads.
+    """
+    repos = getattr(_worker_repos, "repos", None)
+    if repos is None:
+        repos = _worker_repos.repos = {}
+    if repo_path not in repos:
+        repos[repo_path] = pygit2.Repository(repo_path)
+    return repos[repo_path]
+
+
+def _read_blob(
+    repo_path: str, path: str, blob_id: pygit2.Oid, commit_id: pygit2.Oid
+) -> Optional[str]:
+    """
+    Read a blob from the object database, returning None for oversized or
+    binary blobs.
+
+    Files marked binary or -diff in the committed .gitattributes are
+    skipped before their content is read. The repository is opened once
+    per worker thread. Blobs are not cached one by one: they are already
+    content-addressed, and reading them is cheaper than a cache lookup.
+    """
+    repo = _worker_repo(repo_path)
+    flags = AttrCheck.INDEX_ONLY | AttrCheck.INCLUDE_COMMIT | AttrCheck.NO_SYSTEM
+    if repo.get_attr(path, "diff", flags, commit_id) is False:
+        return None
+
+    blob = repo[blob_id]
+    return None if blob.size > MAX_FILE_SIZE else _decode_text(blob.data)
+
+
+def build_tree(name: str, paths: List[str]) -> str:
+    """
+    Build the full directory listing of a set of files, in gitingest layout.
+
+    Parameters:
+    -----------
+    name : str
+        Name of the root directory
+    paths : List[str]
+        Repository relative paths of the files
+
+    Returns:
+    --------
+    str
+        Directory structure with one line per directory and file
+    """
+    root: Dict[str, Dict] = {}
+    for path in paths:
+        node = root
+        for part in path.split("/"):
+            node = node.setdefault(part, {})
+
+    lines = ["Directory structure:", f"└── {name}/"]
+
+    def add(node: Dict[str, Dict], indent: str) -> None:
+        entries = sorted(node.items(), key=lambda item: (bool(item[1]), item[0]))
+        for index, (entry, children) in enumerate(entries):
+            last = index == len(entries) - 1
+            lines.append(
+                f"{indent}{'└── ' if last else '├── '}{entry}{'/' if children else ''}"
+            )
+            if children:
+                add(children, indent + ("    " if last else "│   "))
+
+    add(root, "    ")
+    return "\n".join(lines)
+
+
+def _open_head(local_repo_path: str) -> Tuple[pygit2.Repository, pygit2.Commit]:
+    """
+    Open a repository and its HEAD commit, raising ValueError when missing.
+    """
+    try:
+        repo = pygit2.Repository(local_repo_path)
+        return repo, repo.head.peel(pygit2.Commit)
+    except (pygit2.GitError, KeyError, ValueError) as e:
+        error_msg = f"Not a git repository with a HEAD commit: {local_repo_path}"
+        logging.getLogger(__name__).error(f"{error_msg} ({str(e)})")
+        raise ValueError(error_msg)
+
+
+def _iter_blobs(
+    repo_path: str,
+    commit_id: pygit2.Oid,
+    entries: List[Tuple[str, pygit2.Oid]],
+) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Read blobs on a thread pool, yielding (path, text or None) in tree order.
+
+    At most a few blobs per worker are read ahead of the consumer, so the
+    memory used does not grow with the size of the repository. Each worker
+    opens its own handle on the repository.
+    """
+    window = INGEST_WORKERS * 4
+    with ThreadPoolExecutor(max_workers=INGEST_WORKERS) as executor:
+        pending: deque = deque()
+        for path, blob_id in entries:
+            pending.append(
+                (path, executor.submit(_read_blob, repo_path, path, blob_id, commit_id))
+            )
+            if len(pending) >= window:
+                path, future = pending.popleft()
+                yield path, future.result()
+        while pending:
+            path, future = pending.popleft()
+            yield path, future.result()
+
+
+class TreeFiles:
+    """
+    Files of the tree at HEAD of a repository, read lazily from the git
+    object database.
+
+    Stands in for the content string of ingest_tree: iter_files,
+    get_lexical_index and rank_chunks accept either. Only the tree is
+    walked up front, blobs are read on the PULLHERO_INGEST_WORKERS pool
+    when iterated, so a prompt built from TreeFiles only ever holds the
+    files it keeps. The repository must outlive the TreeFiles.
+
+    The same files as ingest_tree are considered: files ignored by default
+    (see IGNORED_DIRECTORIES and IGNORED_FILES) are not listed, binaries
+    and files over PULLHERO_INGEST_MAX_FILE_SIZE are skipped when read.
+
+    Example:
+    --------
+    >>> files = TreeFiles("/tmp/pullhero/ws-consult-x/checkout")
+    >>> builder.add("content", (chunk for _, chunk in iter_files(files)), priority=1)
+    """
+
+    def __init__(self, local_repo_path: str) -> None:
+        """
+        Walk the tree at HEAD.
+
+        Args:
+            local_repo_path: Path to the repository, bare or not
+
+        Raises:
+            ValueError: If the path is not a git repository with a HEAD commit
+        """
+        repo, commit = _open_head(local_repo_path)
+        self.repo_path = repo.path
+        self.commit_id = commit.id
+        self.tree_sha = str(commit.tree_id)
+        self.entries: Dict[str, pygit2.Oid] = {
+            path: entry.id for path, entry in _walk_tree(repo, commit.tree, ignore=True)
+        }
+
+    @property
+    def paths(self) -> List[str]:
+        """
+        Paths of the listed files, in tree order.
+        """
+        return list(self.entries)
+
+    def read(self, paths: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, str]]:
+        """
+        Read files, skipping binaries and oversized files.
+
+        Args:
+            paths: Files to read, in the order given, unknown paths are
+                ignored (default: every file in tree order)
+
+        Yields:
+            (path, text) pairs
+        """
+        if paths is None:
+            entries = list(self.entries.items())
+        else:
+            entries = [
+                (path, self.entries[path]) for path in paths if path in self.entries
+            ]
+        for path, text in _iter_blobs(self.repo_path, self.commit_id, entries):
+            if text is not None:
+                yield path, text
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        return self.read()
+
+
+def open_tree(local_repo_path: str) -> Tuple[str, str, TreeFiles]:
+    """
+    List the tree at HEAD without reading any file, see TreeFiles.
+
+    Parameters:
+    -----------
+    local_repo_path : str
+        Path to the repository, bare or not
+
+    Returns:
+    --------
+    Tuple containing:
+        - summary (str): Repository metadata summary
+        - tree (str): Directory structure
+        - files (TreeFiles): Lazily read files
+
+    Raises:
+    -------
+    ValueError
+        If the path is not a git repository with a HEAD commit
+
+    Example:
+    --------
+    >>> summary, tree, files = open_tree("/tmp/pullhero/ws-consult-x/checkout")
+    """
+    files = TreeFiles(local_repo_path)
+    name = Path(local_repo_path).absolute().name
+    summary = (
+        f"Repository: {name}\n"
+        f"Commit: {files.commit_id}\n"
+        f"Files listed: {len(files.entries)}\n"
+    )
+    return summary, build_tree(name, files.paths), files
+
+
+def ingest_tree(local_repo_path: str) -> Tuple[str, str, str]:
+    """
+    Ingest the tree at HEAD straight from the git object database.
+
+    Unlike gitingest, which walks a checked out working tree, blobs are
+    read from the object database, so the repository can be a bare clone
+    (see clone_repo_with_token(checkout=False)). Only committed files are
+    ingested. Dependencies, build output, lockfiles and other files ignored
+    by gitingest by default (see IGNORED_DIRECTORIES and IGNORED_FILES) are
+    left out, binaries and files over PULLHERO_INGEST_MAX_FILE_SIZE are
+    skipped. The whole snapshot is cached by tree SHA by the callers, see
+    open_tree for a lazy alternative.
+
+    Blobs are read, decompressed and decoded by a pool of
+    PULLHERO_INGEST_WORKERS threads, collected in tree order and joined
+    once at the end.
+
+    Parameters:
+    -----------
+    local_repo_path : str
+        Path to the repository, bare or not
+
+    Returns:
+    --------
+    Tuple containing:
+        - summary (str): Ingestion metadata summary
+        - tree (str): Directory structure
+        - content (str): Content of every ingested file
+
+    Raises:
+    -------
+    ValueError
+        If the path is not a git repository with a HEAD commit
+
+    Example:
+    --------
+    >>> summary, tree, content = ingest_tree("/tmp/pullhero/ws-consult-x/checkout")
+    """
+    logger = logging.getLogger(__name__)
+    files = TreeFiles(local_repo_path)
+
+    parts: List[str] = []
+    ingested = 0
+    for path, text in files:
+        parts.extend(format_file_parts(path, text))
+        ingested += 1
+
+    name = Path(local_repo_path).absolute().name
+    content = "".join(parts)
+    del parts
+    tree = build_tree(name, files.paths)
+    summary = (
+        f"Repository: {name}\n"
+        f"Commit: {files.commit_id}\n"
+        f"Files analyzed: {ingested}\n"
+        f"Files skipped: {len(files.entries) - ingested}\n"
+        f"\nEstimated tokens: {len(content) // 4}"
+    )
+    logger.info(
+        f"Ingested {ingested}/{len(files.entries)} files from the object database "
+        f"with {INGEST_WORKERS} threads - {len(content)} characters"
+    )
+    return summary, tree, content
+
+
+def _excerpt(text: str, ranges: List[Tuple[int, int]]) -> str:
+    """
+    Reduce a long file to the regions surrounding the changed line ranges.
+    """
+    lines = text.splitlines()
+    if len(lines) <= MAX_FULL_FILE_LINES or not ranges:
+        return text
+
+    windows: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        start = max(1, start - HUNK_CONTEXT_LINES)
+        end = min(len(lines), end + HUNK_CONTEXT_LINES)
+        if windows and start <= windows[-1][1] + 1:
+            windows[-1] = (windows[-1][0], max(windows[-1][1], end))
+        else:
+            windows.append((start, end))
+
+    parts = []
+    for start, end in windows:
+        parts.append(f"... (lines {start}-{end} of {len(lines)})")
+        parts.extend(lines[start - 1 : end])
+    parts.append("...")
+    return "\n".join(parts)
+
+
+def _python_imports(root: Path, filename: str, text: str) -> List[str]:
+    """
+    Resolve the repository files imported by a Python module from a checkout.
+    """
+    found = []
+    for dotted in python_import_candidates(filename, text):
+        found.extend(
+            resolve_python_module(dotted, lambda path: (root / path).is_file())
+        )
+    return found
+
+
+def load_import_graph(local_repo_path: str) -> Optional[ImportGraph]:
+    """
+    Get the import graph of the HEAD tree of a repository.
+
+    The graph is cached by tree SHA, and the imports parsed out of every
+    source file by blob SHA, so a new commit only re-parses the files it
+    changed before resolving the graph again.
+
+    Parameters:
+    -----------
+    local_repo_path : str
+        Path to a clone, bare or not
+
+    Returns:
+    --------
+    ImportGraph or None
+        Import graph, None if the path is not a repository with a HEAD
+
+    Example:
+    --------
+    >>> graph = load_import_graph("/tmp/pullhero/ws-code-x/checkout")
+    >>> graph.related(["src/pullhero/vcs/github.py"])
+    ['src/pullhero/vcs/base.py', 'src/pullhero/vcs/__init__.py', ...]
+    """
+    logger = logging.getLogger(__name__)
+    tree_sha = get_tree_sha(local_repo_path)
+    if tree_sha is None:
+        return None
+    key = snapshot_key(tree_sha, "import-graph", GRAPH_VERSION)
+    cached = ingest_cache.get(key)
+    if cached is not None:
+        logger.info(f"Import graph served from cache ({key[:12]})")
+        return ImportGraph.from_json(cached)
+
+    repo, commit = _open_head(local_repo_path)
+    paths: List[str] = []
+    specs: Dict[str, List[str]] = {}
+    go_mods: Dict[str, str] = {}
+    parsed: List[Tuple[str, str]] = []
+    for path, entry in _walk_tree(repo, commit.tree):
+        paths.append(path)
+        if Path(path).name == "go.mod":
+            go_mods[path] = _read_blob(repo.path, path, entry.id, commit.id) or ""
+        elif path.endswith(GRAPH_EXTENSIONS):
+            blob_key = Cache.make_key("imports", GRAPH_VERSION, str(entry.id), path)
+            cached = ingest_cache.get(blob_key)
+            if cached is None:
+                text = _read_blob(repo.path, path, entry.id, commit.id)
+                specs[path] = parse_imports(path, text) if text else []
+                parsed.append((blob_key, json.dumps(specs[path])))
+            else:
+                specs[path] = json.loads(cached)
+
+    graph = ImportGraph.build(paths, specs, go_mods)
+    logger.info(
+        f"Built import graph of {len(specs)} source files "
+        f"({len(parsed)} parsed, {len(specs) - len(parsed)} from cache)"
+    )
+    ingest_cache.set_many(parsed + [(key, graph.to_json())])
+    return graph
+
+
+def find_related_files(root: str, filenames: List[str]) -> List[str]:
+    """
+    Find the files directly related to a set of changed files.
+
+    Related files are the callers and callees of the changed files in the
+    import graph of the repository (see load_import_graph) and the tests
+    living next to any changed file. Without a git repository only the
+    modules imported by changed Python files are found, from the checkout.
+
+    Parameters:
+    -----------
+    root : str
+        Path to the repository checkout
+    filenames : List[str]
+        Repository relative paths of the changed files
+
+    Returns:
+    --------
+    List[str]
+        Related repository relative paths, changed files excluded
+    """
+    root_path = Path(root)
+    changed = set(filenames)
+    related: List[str] = []
+    seen: Set[str] = set(changed)
+
+    def add(path: str) -> None:
+        if path not in seen:
+            seen.add(path)
+            related.append(path)
+
+    graph = load_import_graph(root)
+    if graph is not None:
+        for neighbour in graph.related(filenames):
+            add(neighbour)
+
+    for filename in filenames:
+        path = root_path / filename
+        if graph is None and filename.endswith(".py"):
+            text = _read_text(path)
+            if text is not None:
+                for imported in _python_imports(root_path, filename, text):
+                    add(imported)
+
+        # Neighbouring tests for the changed file
+        stem, suffix = path.stem, path.suffix
+        for test_name in (f"test_{stem}{suffix}", f"{stem}_test{suffix}"):
+            for test_path in (
+                path.parent / test_name,
+                path.parent / "tests" / test_name,
+            ):
+                if test_path.is_file():
+                    add(str(test_path.relative_to(root_path)))
+
+    return related[:MAX_RELATED_FILES]
+
+
+def build_tree_summary(root: str, filenames: List[str]) -> str:
+    """
+    Build a compact tree listing the top level and every directory on the
+    path to a changed file, instead of the whole repository.
+
+    Parameters:
+    -----------
+    root : str
+        Path to the repository checkout
+    filenames : List[str]
+        Repository relative paths of the files to highlight
+
+    Returns:
+    --------
+    str
+        Directory listing in a gitingest-like layout
+    """
+    root_path = Path(root)
+    directories = {Path(".")}
+    for filename in filenames:
+        directories.update(Path(filename).parents)
+
+    lines = ["Directory structure:"]
+    for directory in sorted(directories, key=lambda d: d.parts):
+        try:
+            entries = sorted(
+                e.name + ("/" if e.is_dir() else "")
+                for e in (root_path / directory).iterdir()
+                if e.name != ".git"
+            )
+        except OSError:
+            continue
+        header = "./" if directory == Path(".") else f"{directory.as_posix()}/"
+        lines.append(header)
+        lines.extend(f"    {entry}" for entry in entries)
+    return "\n".join(lines)
+
+
+def ingest_changes(
+    local_repo_path: str, changed_files: List[Dict[str, str]], diff: str = ""
+) -> Tuple[str, str, str]:
+    """
+    Ingest only the part of a repository touched by a change.
+
+    Unlike ingest_repository, which dumps the entire repository, this
+    includes the changed files, their direct callers and callees in the
+    import graph, their tests, and a compact tree. Long changed files are reduced to the
+    regions around their diff hunks, so the size of the result follows
+    the size of the change rather than the size of the repository.
+
+    Results are cached by tree SHA and diff, file contents by blob SHA.
+
+    Parameters:
+    -----------
+    local_repo_path : str
+        Path to the repository checkout at the head of the change
+    changed_files : List[Dict[str, str]]
+        Changed files as returned by VCSOperations.get_pr_files
+    diff : str, optional
+        Unified diff of the change, used to locate the hunks
+
+    Returns:
+    --------
+    Tuple containing:
+        - summary (str): Ingestion metadata summary
+        - tree (str): Compact directory structure
+        - content (str): Changed and related files content
+
+    Raises:
+    -------
+    ValueError
+        If the path is invalid
+
+    Example:
+    --------
+    >>> summary, tree, content = ingest_changes(
+    ...     "/tmp/pullhero/ws-review-x/checkout",
+    ...     provider.get_pr_files("owner/repo", "123"),
+    ...     diff,
+    ... )
+    """
+    logger = logging.getLogger(__name__)
+    root = Path(local_repo_path).absolute()
+    if not root.is_dir():
+        error_msg = f"Repository path is not a directory: {root}"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+
+    hunks = parse_diff_hunks(diff)
+    filenames = [
+        f["filename"]
+        for f in changed_files
+        if f.get("status") not in ("removed", "deleted")
+    ]
+
+    tree_sha = get_tree_sha(str(root))
+    key = snapshot_key(tree_sha, "changes", filenames, diff) if tree_sha else None
+    if key:
+        cached = load_snapshot(key)
+        if cached is not None:
+            return cached
+
+    related = find_related_files(str(root), filenames)
+    blob_shas = _blob_shas(str(root), filenames + related)
+    logger.info(
+        f"Scoped ingestion of {len(filenames)} changed and {len(related)} related files"
+    )
+
+    parts = []
+    for filename in filenames:
+        text = _read_blob_text(root, filename, blob_shas.get(filename))
+        if text is not None:
+            parts.append(format_file(filename, _excerpt(text, hunks.get(filename, []))))
+    for filename in related:
+        text = _read_blob_text(root, filename, blob_shas.get(filename))
+        if text is not None:
+            parts.append(format_file(filename, text))
+
+    content = "".join(parts)
+    tree = build_tree_summary(str(root), filenames + related)
+    summary = (
+        f"Repository: {root.name}\n"
+        f"Changed files: {len(filenames)}\n"
+        f"Related files: {len(related)}\n"
+        f"Estimated tokens: {len(content) // 4}"
+    )
+    logger.info(f"Scoped ingestion complete - {len(content)} characters")
+    if key:
+        store_snapshot(key, (summary, tree, content))
+    return summary, tree, content
@@ -19,13 +19,34 @@
 import sys
 import os
 import shutil
+import hashlib
+import threading
+import time
+import random
+import json
 import logging
+import resource
 import requests
+import requests.adapters
 from gitingest import ingest
 import pygit2
-from typing import Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, Tuple, Optional, List, Union
 from pathlib import Path
 from pullhero.__about__ import __version__
+from pullhero.utils.workspace import file_lock
+from pullhero.utils.cache import Cache, llm_cache
+from pullhero.utils.ingest import (
+    FILE_SEPARATOR,
+    TreeFiles,
+    get_backend,
+    get_tree_sha,
+    ingest_tree,
+    load_snapshot,
+    open_tree,
+    snapshot_key,
+    store_snapshot,
+)
 
 
 def setup_logging():
@@ -67,16 +88,110 @@ v{__version__}
 # THis is external because is not specific to a VCS we will just clone a Git repo (private or public)
 #
 
+# Clone tuning, a depth of 0 means full history and an empty cache
+# directory disables the persistent mirror cache.
+CLONE_DEPTH = int(os.environ.get("PULLHERO_CLONE_DEPTH", "1"))
+CLONE_CACHE_DIR = os.environ.get("PULLHERO_CLONE_CACHE_DIR", "")
 
-def clone_repo_with_token(repo_url: str, vcs_token: str) -> None:
+
+def get_change_ref(vcs_provider: str, change_id: str) -> str:
+    """
+    Get the server side reference that points to the head of a PR/MR.
+
+    Parameters:
+    -----------
+    vcs_provider : str
+        Version control system provider ('github' or 'gitlab')
+    change_id : str
+        Pull/Merge request number
+
+    Returns:
+    --------
+    str
+        The fully qualified reference (e.g., 'refs/pull/123/head')
+
+    Example:
+    --------
+    >>> get_change_ref("github", "123")
+    'refs/pull/123/head'
+    """
+    if vcs_provider == "gitlab":
+        return f"refs/merge-requests/{change_id}/head"
+    return f"refs/pull/{change_id}/head"
+
+
+def _qualify_ref(ref: str) -> str:
+    """
+    Expand a branch name into a fully qualified reference.
+    """
+    if ref == "HEAD" or ref.startswith("refs/"):
+        return ref
+    return f"refs/heads/{ref}"
+
+
+def _local_ref(ref: str) -> str:
+    """
+    Get the local reference where a fetched remote reference is stored.
+    """
+    return f"refs/pullhero/{ref}"
+
+
+def _mirror_path(cache_dir: str, repo_url: str) -> Path:
+    """
+    Get the bare mirror location for a repository inside the cache directory.
+
+    The directory name keeps the repository name readable and appends a hash
+    of the full URL so forks with the same name never share a mirror.
+    """
+    name = repo_url.rstrip("/").split("/")[-1]
+    if name.endswith(".git"):
+        name = name[:-4]
+    digest = hashlib.sha256(repo_url.encode("utf-8")).hexdigest()[:16]
+    return Path(cache_dir).expanduser().absolute() / f"{name}-{digest}.git"
+
+
+def _fetch_refs(
+    repo: pygit2.Repository,
+    repo_url: str,
+    refs: List[str],
+    depth: int,
+    callbacks: pygit2.RemoteCallbacks,
+) -> None:
+    """
+    Fetch the given references from origin into the local refs/pullhero namespace.
+    """
+    try:
+        remote = repo.remotes["origin"]
+    except KeyError:
+        remote = repo.remotes.create("origin", repo_url)
+    refspecs = [f"+{ref}:{_local_ref(ref)}" for ref in refs]
+    remote.fetch(refspecs, callbacks=callbacks, depth=depth)
+
+
+def clone_repo_with_token(
+    repo_url: str,
+    vcs_token: str,
+    clone_dir: str = "/tmp/clone",
+    refs: Optional[List[str]] = None,
+    depth: Optional[int] = None,
+    cache_dir: Optional[str] = None,
+    checkout: bool = True,
+) -> str:
     """
     Clone a repository using authentication token with pygit2.
 
     This function:
-    1. Ensures the target directory (/tmp/clone) is clean
+    1. Ensures the target directory is clean
     2. Sets up authentication callbacks
-    3. Performs the git clone operation
-    4. Handles errors and provides detailed logging
+    3. Fetches only the requested refs, truncated to the requested depth
+    4. Checks out the first requested ref, or only points HEAD at it in
+       a bare repository when no working tree is needed
+    5. Handles errors and provides detailed logging
+
+    When a cache directory is configured the objects are fetched into a
+    persistent bare mirror keyed by repository URL. Later runs update the
+    mirror with an incremental fetch and the checkout borrows its objects
+    through git alternates instead of downloading them again.
 
     Parameters:
     -----------
@@ -84,10 +199,25 @@ def clone_repo_with_token(repo_url: str, vcs_token: str) -> None:
         The URL of the repository to clone (e.g., 'https://github.com/owner/repo.git')
     vcs_token : str
         The authentication token for the VCS provider
+    clone_dir : str, optional
+        Directory where the working tree is checked out (default: /tmp/clone)
+    refs : List[str], optional
+        Branch names or fully qualified refs to fetch, the first one is
+        checked out (default: the remote HEAD)
+    depth : int, optional
+        History depth to fetch, 0 for full history
+        (default: PULLHERO_CLONE_DEPTH or 1)
+    cache_dir : str, optional
+        Directory holding the bare mirror cache
+        (default: PULLHERO_CLONE_CACHE_DIR, disabled when empty)
+    checkout : bool, optional
+        Write the working tree, False creates a bare repository readable
+        by ingest_tree (default: True)
 
     Returns:
     --------
-    None
+    str
+        The SHA of the checked out commit
 
     Raises:
     -------
@@ -102,12 +232,17 @@ def clone_repo_with_token(repo_url: str, vcs_token: str) -> None:
     --------
     >>> clone_repo_with_token(
     ...     repo_url="https://github.com/owner/repo.git",
-    ...     vcs_token="ghp_abc123..."
+    ...     vcs_token="ghp_abc123...",
+    ...     refs=["refs/pull/123/head", "main"],
     ... )
     """
     logger = logging.getLogger(__name__)
     logger.info(f"Starting repository clone from {repo_url}")
 
+    refs = [_qualify_ref(ref) for ref in (refs or ["HEAD"])]
+    depth = CLONE_DEPTH if depth is None else depth
+    cache_dir = CLONE_CACHE_DIR if cache_dir is None else cache_dir
+
     def credentials_callback(
         url: str, username_from_url: Optional[str], allowed_types: int
     ) -> pygit2.UserPass:
@@ -132,8 +267,6 @@ def clone_repo_with_token(repo_url: str, vcs_token: str) -> None:
         return pygit2.UserPass("x-access-token", vcs_token)
 
     try:
-        clone_dir = "/tmp/clone"
-
         # Clean up existing directory if present
         if os.path.exists(clone_dir):
             logger.info(f"Removing existing directory: {clone_dir}")
@@ -143,15 +276,52 @@ def clone_repo_with_token(repo_url: str, vcs_token: str) -> None:
         logger.info(f"Creating clean directory: {clone_dir}")
         os.makedirs(clone_dir, exist_ok=True)
 
-        # Configure clone options
+        # Configure fetch options
         logger.debug("Configuring clone options with authentication")
         callbacks = pygit2.RemoteCallbacks(credentials=credentials_callback)
 
-        # Perform clone
-        logger.info(f"Cloning repository to {clone_dir}")
-        pygit2.clone_repository(url=repo_url, path=clone_dir, callbacks=callbacks)
+        repo = pygit2.init_repository(clone_dir, bare=not checkout)
+
+        if cache_dir:
+            mirror_path = _mirror_path(cache_dir, repo_url)
+
+            # Concurrent runs on the same host share the mirror
+            with file_lock(f"{mirror_path}.lock"):
+                if mirror_path.exists():
+                    logger.info(f"Updating cached mirror {mirror_path}")
+                    mirror = pygit2.Repository(str(mirror_path))
+                else:
+                    logger.info(f"Creating cached mirror {mirror_path}")
+                    mirror = pygit2.init_repository(str(mirror_path), bare=True)
+
+                logger.info(f"Fetching {refs} into mirror (depth: {depth or 'full'})")
+                _fetch_refs(mirror, repo_url, refs, depth, callbacks)
+
+                # Borrow the mirror objects instead of copying them
+                alternates = Path(repo.path) / "objects" / "info" / "alternates"
+                alternates.write_text(f"{mirror_path / 'objects'}\n")
+                if (mirror_path / "shallow").exists():
+                    shutil.copyfile(
+                        mirror_path / "shallow", Path(repo.path) / "shallow"
+                    )
+                repo = pygit2.Repository(clone_dir)
+                for ref in refs:
+                    repo.references.create(
+                        _local_ref(ref), mirror.references[_local_ref(ref)].target
+                    )
+        else:
+            logger.info(f"Fetching {refs} (depth: {depth or 'full'})")
+            _fetch_refs(repo, repo_url, refs, depth, callbacks)
+
+        # Check out the first requested ref
+        commit = repo.references[_local_ref(refs[0])].peel(pygit2.Commit)
+        if checkout:
+            logger.info(f"Checking out {refs[0]} ({commit.id}) to {clone_dir}")
+            repo.checkout_tree(commit, strategy=pygit2.GIT_CHECKOUT_FORCE)
+        repo.set_head(commit.id)
 
         logger.info(f"Successfully cloned repository to {clone_dir}")
+        return str(commit.id)
 
     except pygit2.GitError as ge:
         logger.error(f"Git operation failed: {str(ge)}")
@@ -164,7 +334,28 @@ def clone_repo_with_token(repo_url: str, vcs_token: str) -> None:
         raise
 
 
-def ingest_repository(local_repo_path: str) -> Tuple[str, str, str]:
+def _utf8_size(text: str, block: int = 1 << 20) -> int:
+    """
+    Size of a text encoded as UTF-8, encoded one block at a time.
+    """
+    return sum(
+        len(text[start : start + block].encode("utf-8", errors="replace"))
+        for start in range(0, len(text), block)
+    )
+
+
+def _peak_memory_mb() -> float:
+    """
+    Peak resident memory of the process in MB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def ingest_repository(
+    local_repo_path: str, lazy: bool = False
+) -> Tuple[str, str, Union[str, TreeFiles]]:
     """
     Analyze and ingest repository content for review processing.
 
@@ -173,17 +364,32 @@ def ingest_repository(local_repo_path: str) -> Tuple[str, str, str]:
     - File tree structure
     - File content dictionary
 
+    Snapshots are cached by the SHA of the checked out tree, so a branch
+    that did not move since a previous run is not ingested again. Git
+    repositories are read from the object database (see ingest_tree) on a
+    pool of threads, and with PULLHERO_INGEST_BACKEND=pygit2 no checkout
+    is needed. Other directories, or PULLHERO_INGEST_BACKEND=gitingest,
+    go through gitingest.
+
+    With lazy, git repositories are not ingested at all: the content is
+    returned as TreeFiles (see open_tree), read file by file as prompts
+    are filled, so neither the content nor its cached snapshot is ever
+    held in memory. The repository must then outlive the content.
+
     Parameters:
     -----------
     local_repo_path : str
         Path to the local repository directory
+    lazy : bool, optional
+        Return TreeFiles instead of a content string when the repository
+        is read from the object database (default: False)
 
     Returns:
     --------
     Tuple containing:
         - summary (str): Repository metadata summary
-        - tree (dict): Hierarchical file structure
-        - content (dict): Key-value pairs of file paths and content
+        - tree (str): Directory structure
+        - content (str or TreeFiles): Content of every ingested file
 
     Raises:
     -------
@@ -215,11 +421,35 @@ def ingest_repository(local_repo_path: str) -> Tuple[str, str, str]:
             raise ValueError(error_msg)
 
         logger.info(f"Processing repository at {abs_path}")
-
-        # Perform ingestion (assuming ingest() is defined elsewhere)
-        summary, tree, content = ingest(str(abs_path))
-
-        logger.info(f"Ingestion complete - {len(content)} files processed")
+        started = time.monotonic()
+
+        tree_sha = get_tree_sha(str(abs_path))
+        backend = get_backend(tree_sha)
+        if lazy and backend == "pygit2":
+            summary, tree, files = open_tree(str(abs_path))
+            logger.info(f"Listed {len(files.entries)} files, read lazily")
+            return summary, tree, files
+        key = snapshot_key(tree_sha, "repository", backend) if tree_sha else None
+        if key:
+            cached = load_snapshot(key)
+            if cached is not None:
+                return cached
+
+        if backend == "pygit2":
+            summary, tree, content = ingest_tree(str(abs_path))
+        else:
+            # Perform ingestion (assuming ingest() is defined elsewhere)
+            summary, tree, content = ingest(str(abs_path))
+        if key:
+            store_snapshot(key, (summary, tree, content))
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        files = content.count(f"{FILE_SEPARATOR}\nFILE: ")
+        logger.info(
+            f"Ingestion complete - {files} files processed, "
+            f"{_utf8_size(content)} bytes in {elapsed:.2f}s "
+            f"({files / elapsed:.0f} files/s, peak memory {_peak_memory_mb():.0f} MB)"
+        )
         logger.debug(f"Summary: {summary[:100]}...")
         logger.debug(f"Tree structure: {str(tree)[:200]}...")
 
@@ -230,12 +460,400 @@ def ingest_repository(local_repo_path: str) -> Tuple[str, str, str]:
         raise
 
 
+# Maximum number of LLM requests an agent runs at the same time
+LLM_CONCURRENCY = int(os.environ.get("PULLHERO_LLM_CONCURRENCY", "4"))
+# Maximum number of LLM requests started per minute, 0 means unlimited
+LLM_RATE_LIMIT = int(os.environ.get("PULLHERO_LLM_RATE_LIMIT", "0"))
+
+
+class RateLimiter:
+    """
+    Thread-safe request pacing shared by every thread of a run.
+
+    Requests are spaced to stay under a requests-per-minute limit, and a
+    rate limited response pauses all callers, not only the thread that
+    received it, so concurrent workers back off together.
+    """
+
+    def __init__(self, requests_per_minute: int = 0) -> None:
+        """
+        Initialize the limiter.
+
+        Args:
+            requests_per_minute: Maximum request rate, 0 means unlimited
+        """
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self) -> None:
+        """
+        Block until the caller may start a request.
+        """
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hold back every caller for the given number of seconds.
+        """
+        with self.lock:
+            self.next_slot = max(self.next_slot, time.monotonic() + seconds)
+
+
+llm_rate_limiter = RateLimiter(LLM_RATE_LIMIT)
+
+
+def get_retry_after(
+    response: Optional[requests.Response], default: float = 1.0
+) -> float:
+    """
+    Get the delay requested by a Retry-After header, in seconds.
+    """
+    if response is None:
+        return default
+    value = response.headers.get("Retry-After", "")
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return default
+
+
+def run_concurrently(
+    func: Callable, items: Iterable, max_workers: int = LLM_CONCURRENCY
+) -> List[Tuple[Any, Optional[Exception]]]:
+    """
+    Run a function over items in a bounded thread pool.
+
+    Failures are isolated per item: the exception is returned next to the
+    item instead of cancelling the other items. Items are submitted as the
+    iterable yields them, so a lazily loaded listing is processed while its
+    later pages load.
+
+    Parameters:
+    -----------
+    func : Callable
+        Function called with one item
+    items : Iterable
+        Items to process
+    max_workers : int, optional
+        Maximum number of concurrent calls (default: PULLHERO_LLM_CONCURRENCY)
+
+    Returns:
+    --------
+    List[Tuple[Any, Optional[Exception]]]
+        (result, exception) pairs in the order of the items, the result is
+        None when the call failed
+
+    Example:
+    --------
+    >>> results = run_concurrently(generate, files, max_workers=4)
+    """
+    logger = logging.getLogger(__name__)
+
+    def call(item):
+        try:
+            return func(item), None
+        except Exception as e:
+            logger.error(f"Concurrent task failed: {str(e)}")
+            return None, e
+
+    with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+        return list(executor.map(call, items))
+
+
+# Receive completions as server-sent events instead of a single response
+LLM_STREAM = os.environ.get("PULLHERO_LLM_STREAM", "").lower() in ("1", "true", "yes")
+# Size of the LLM connection pool, and retry policy for 429/5xx responses
+LLM_POOL_SIZE = int(
+    os.environ.get("PULLHERO_LLM_POOL_SIZE", str(max(LLM_CONCURRENCY, 10)))
+)
+LLM_MAX_RETRIES = int(os.environ.get("PULLHERO_LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.environ.get("PULLHERO_LLM_BACKOFF_BASE", "1"))
+LLM_BACKOFF_MAX = 60.0
+LLM_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_llm_session: Optional[requests.Session] = None
+_llm_session_lock = threading.Lock()
+
+
+def get_llm_session() -> requests.Session:
+    """
+    Get the process wide HTTP session used for LLM API calls.
+
+    The session keeps connections alive in a pool of PULLHERO_LLM_POOL_SIZE
+    connections per host, so consecutive and concurrent calls reuse the
+    same TCP/TLS connections instead of paying the setup on every call.
+
+    Returns:
+    --------
+    requests.Session
+        The shared session, created on first use
+    """
+    global _llm_session
+    with _llm_session_lock:
+        if _llm_session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=LLM_POOL_SIZE, pool_maxsize=LLM_POOL_SIZE
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _llm_session = session
+        return _llm_session
+
+
+def send_llm_request(
+    url: str, payload: dict, headers: dict, timeout: int, stream: bool = False
+) -> requests.Response:
+    """
+    POST a request to the LLM API, retrying throttled and failed requests.
+
+    429 and 5xx responses and connection errors are retried up to
+    PULLHERO_LLM_MAX_RETRIES times with jittered exponential backoff. A
+    Retry-After header takes precedence over the computed delay, and a 429
+    pauses every concurrent caller through the shared rate limiter.
+
+    Parameters:
+    -----------
+    url : str
+        Full URL of the endpoint
+    payload : dict
+        JSON body of the request
+    headers : dict
+        Request headers
+    timeout : int
+        Request timeout in seconds
+    stream : bool, optional
+        Do not read the response body upfront (default: False)
+
+    Returns:
+    --------
+    requests.Response
+        The successful response
+
+    Raises:
+    -------
+    requests.HTTPError
+        If the request still fails after the last retry
+    """
+    logger = logging.getLogger(__name__)
+    session = get_llm_session()
+
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        last_attempt = attempt == LLM_MAX_RETRIES
+        delay = min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2**attempt)
+        delay = random.uniform(delay / 2, delay)
+
+        llm_rate_limiter.wait()
+        try:
+            response = session.post(
+                url, json=payload, headers=headers, timeout=timeout, stream=stream
+            )
+        except requests.ConnectionError as ce:
+            if last_attempt:
+                raise
+            logger.warning(
+                f"LLM connection failed ({str(ce)}), retrying in {delay:.1f}s"
+            )
+            time.sleep(delay)
+            continue
+
+        if response.status_code not in LLM_RETRY_STATUSES or last_attempt:
+            response.raise_for_status()
+            return response
+
+        if "Retry-After" in response.headers:
+            delay = get_retry_after(response, delay)
+        if response.status_code == 429:
+            # Make every concurrent caller back off, not only this one
+            llm_rate_limiter.pause(delay)
+        logger.warning(
+            f"LLM API returned {response.status_code}, retry "
+            f"{attempt + 1}/{LLM_MAX_RETRIES} in {delay:.1f}s"
+        )
+        response.close()
+        time.sleep(delay)
+
+
+def _build_llm_request(
+    api_host: str,
+    api_key: str,
+    api_model: str,
+    api_endpoint: str,
+    prompt: str,
+    timeout: int,
+    stream: bool,
+) -> Tuple[str, dict, dict]:
+    """
+    Build the URL, payload and headers of a chat completion request.
+    """
+    url = f"https://{api_host}{api_endpoint}"
+    payload = {
+        "model": api_model,
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": 1000,
+        "temperature": 0.7,
+    }
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+    }
+
+    if stream:
+        # Tokens keep the connection busy, no proxy idle timeout to extend
+        payload["stream"] = True
+        headers["Accept"] = "text/event-stream"
+    else:
+        # Convert timeout to milliseconds for APIcast
+        timeout_ms = timeout * 1000
+        headers.update(
+            {
+                "X-APIcast-Timeout": str(timeout_ms),
+                "X-APIcast-Upstream-Timeout": str(timeout_ms),
+                "X-APIcast-Request-Timeout": str(timeout_ms),
+                "X-Request-Timeout": str(timeout_ms),
+                "Connection": "keep-alive",
+                "Keep-Alive": f"timeout={timeout}",
+            }
+        )
+    return url, payload, headers
+
+
+def stream_ai_api(
+    api_host: str,
+    api_key: str,
+    api_model: str,
+    api_endpoint: str,
+    prompt: str,
+    timeout: int = 360,
+    stop: Optional[Callable[[str], bool]] = None,
+) -> Iterator[str]:
+    """
+    Stream a chat completion from an AI service, token by token.
+
+    The request is sent with "stream": true and the server-sent events are
+    yielded as they arrive, so callers can start processing before the
+    completion finishes. The timeout applies between received chunks
+    rather than to the whole completion.
+
+    Parameters:
+    -----------
+    api_host : str
+        Base hostname for the API (e.g., 'api.openai.com')
+    api_key : str
+        Authentication API key
+    api_model : str
+        Model identifier to use (e.g., 'gpt-4')
+    api_endpoint : str
+        Chat completions endpoint (e.g., '/v1/chat/completions')
+    prompt : str
+        The prompt to send to the AI
+    timeout : int, optional
+        Maximum wait for the next chunk in seconds (default: 360)
+    stop : Callable[[str], bool], optional
+        Called with the text received so far, the stream is closed as
+        soon as it returns True (e.g., once the vote line is complete)
+
+    Yields:
+    -------
+    str
+        Content deltas of the completion
+
+    Raises:
+    -------
+    requests.HTTPError
+        For API request failures
+    ValueError
+        For invalid inputs or missing parameters
+
+    Example:
+    --------
+    >>> for token in stream_ai_api(
+    ...     "api.openai.com", "sk-abc123...", "gpt-4", "/v1/chat/completions",
+    ...     "Review this code..."
+    ... ):
+    ...     print(token, end="")
+    """
+    logger = logging.getLogger(__name__)
+    logger.info(
+        f"Initiating streaming AI API call to {api_host} with model {api_model}"
+    )
+
+    if not all([api_host, api_key, api_model, prompt]):
+        error_msg = "Missing required API parameters"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+
+    url, payload, headers = _build_llm_request(
+        api_host, api_key, api_model, api_endpoint, prompt, timeout, stream=True
+    )
+    logger.debug(f"Sending streaming request to {url}")
+    logger.debug(f"Payload size: {len(prompt)} characters")
+
+    started = time.monotonic()
+    first_token = None
+    received = []
+    response = send_llm_request(url, payload, headers, timeout, stream=True)
+    try:
+        response.encoding = "utf-8"
+        for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[len("data:") :].strip()
+            if data == "[DONE]":
+                break
+
+            choices = json.loads(data).get("choices") or [{}]
+            delta = (choices[0].get("delta") or {}).get("content")
+            if not delta:
+                continue
+
+            if first_token is None:
+                first_token = time.monotonic() - started
+                logger.info(f"Time to first token: {first_token:.2f}s")
+            received.append(delta)
+            yield delta
+
+            if stop is not None and stop("".join(received)):
+                logger.info("Stop condition reached, closing the stream early")
+                break
+    finally:
+        response.close()
+
+    elapsed = time.monotonic() - started
+    logger.info(
+        f"AI API stream complete - {len(received)} chunks in {elapsed:.2f}s "
+        f"(time to first token: {first_token or 0:.2f}s)"
+    )
+
+
 def call_ai_api(
-    api_host: str, api_key: str, api_model: str, api_endpoint: str, prompt: str, timeout: int = 360
+    api_host: str,
+    api_key: str,
+    api_model: str,
+    api_endpoint: str,
+    prompt: str,
+    timeout: int = 360,
+    stream: Optional[bool] = None,
+    stop: Optional[Callable[[str], bool]] = None,
+    cache: bool = True,
 ) -> str:
     """
     Make an API call to an AI service for code review analysis.
 
+    With PULLHERO_LLM_CACHE=true, responses are cached on disk,
+    content-addressed by host, endpoint, a hash of the API key and request
+    payload (model, parameters and prompt), so re-running an agent on
+    unchanged inputs does not pay for the same completion twice. Since
+    completions are sampled, a cached response replays a single sample,
+    which is why the cache is off by default. Streamed completions closed
+    early by stop are not stored.
+
     Parameters:
     -----------
     api_host : str
@@ -248,6 +866,12 @@ def call_ai_api(
         The review prompt to send to the AI
     timeout : int, optional
         Request timeout in seconds (default: 360)
+    stream : bool, optional
+        Receive the completion as a stream (default: PULLHERO_LLM_STREAM)
+    stop : Callable[[str], bool], optional
+        Streaming only, end the completion early once it returns True
+    cache : bool, optional
+        Look up and store the response in the LLM cache (default: True)
 
     Returns:
     --------
@@ -282,36 +906,52 @@ def call_ai_api(
             logger.error(error_msg)
             raise ValueError(error_msg)
 
-        url = f"https://{api_host}{api_endpoint}"
-        payload = {
-            "model": api_model,
-            "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": 1000,
-            "temperature": 0.7,
-        }
-        
-        # Convert timeout to milliseconds for APIcast
-        timeout_ms = timeout * 1000
-        
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-            "X-APIcast-Timeout": str(timeout_ms),
-            "X-APIcast-Upstream-Timeout": str(timeout_ms),
-            "X-APIcast-Request-Timeout": str(timeout_ms),
-            "X-Request-Timeout": str(timeout_ms),
-            "Connection": "keep-alive",
-            "Keep-Alive": f"timeout={timeout}"
-        }
+        url, payload, headers = _build_llm_request(
+            api_host, api_key, api_model, api_endpoint, prompt, timeout, stream=False
+        )
+
+        # Responses are only shared between callers holding the same key
+        key_hash = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+        cache_key = Cache.make_key(api_host, api_endpoint, key_hash, payload)
+        if cache:
+            cached = llm_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"AI API response served from cache ({cache_key[:12]})")
+                return cached
+
+        if LLM_STREAM if stream is None else stream:
+            stopped = []
+
+            def stop_early(text: str) -> bool:
+                if stop is not None and stop(text):
+                    stopped.append(True)
+                    return True
+                return False
+
+            result = "".join(
+                stream_ai_api(
+                    api_host,
+                    api_key,
+                    api_model,
+                    api_endpoint,
+                    prompt,
+                    timeout,
+                    stop_early,
+                )
+            )
+            # A stream closed early is a truncated completion, storing it
+            # would replay it to callers expecting the full response
+            if cache and not stopped:
+                llm_cache.set(cache_key, result)
+            return result
 
         logger.debug(f"Sending request to {url}")
         logger.debug(f"Payload size: {len(prompt)} characters")
         prompt_preview = "\n".join(prompt.split("\n")[:20])
         logger.debug(f"Prompt preview (first 20 lines):\n{prompt_preview}")
-        logger.debug(f"Using timeout settings: {timeout} seconds ({timeout_ms} ms)")
+        logger.debug(f"Using timeout settings: {timeout} seconds")
 
-        response = requests.post(url, json=payload, headers=headers, timeout=timeout)
-        response.raise_for_status()
+        response = send_llm_request(url, payload, headers, timeout)
 
         data = response.json()
         logger.debug(f"Response: {data}")
@@ -320,6 +960,8 @@ def call_ai_api(
         logger.info("AI API call successful")
         logger.debug(f"Response length: {len(result)} characters")
 
+        if cache:
+            llm_cache.set(cache_key, result)
         return result
 
     except requests.HTTPError as he:
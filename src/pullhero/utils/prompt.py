@@ -0,0 +1,374 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+#
+# Copyright (C) 2025 authors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import logging
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Union
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optional dependency
+    tiktoken = None
+
+# Tokens kept free for the completion, matches max_tokens in call_ai_api
+RESPONSE_TOKENS = 1000
+
+# Context window used when the model is unknown and none is configured
+DEFAULT_CONTEXT_WINDOW = 32000
+
+# Known context windows, matched by model name prefix
+CONTEXT_WINDOWS = {
+    "gpt-4o": 128000,
+    "gpt-4.1": 1000000,
+    "gpt-4-turbo": 128000,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+    "o1": 200000,
+    "o3": 200000,
+    "o4": 200000,
+    "deepseek": 64000,
+    "mistral-large": 128000,
+    "mistral-small": 32000,
+    "codestral": 256000,
+    "claude": 200000,
+    "gemini": 1000000,
+    "llama": 128000,
+    "granite": 128000,
+}
+
+TRUNCATION_MARKER = "[... {count} tokens truncated by PullHero ...]"
+
+
+class Tokenizer:
+    """
+    Offline token counter used to fit prompts into a context window.
+
+    The default implementation approximates one token every four
+    characters, which is close enough for budgeting when no real
+    tokenizer is available and never requires a network round-trip.
+    """
+
+    name = "heuristic"
+    chars_per_token = 4
+
+    def count(self, text: str) -> int:
+        """
+        Count the tokens in a text.
+        """
+        return (len(text) + self.chars_per_token - 1) // self.chars_per_token
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        Keep the head of a text that fits in max_tokens, cut at a line break.
+        """
+        if max_tokens <= 0:
+            return ""
+        head = text[: max_tokens * self.chars_per_token]
+        return _cut_at_line(head, len(text))
+
+
+class TiktokenTokenizer(Tokenizer):
+    """
+    Tokenizer backed by tiktoken, used when the package and its encoding
+    files are available locally.
+    """
+
+    name = "tiktoken"
+
+    def __init__(self, model: str) -> None:
+        try:
+            self.encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            self.encoding = tiktoken.get_encoding("o200k_base")
+
+    def count(self, text: str) -> int:
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if max_tokens <= 0:
+            return ""
+        tokens = self.encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return _cut_at_line(self.encoding.decode(tokens[:max_tokens]), len(text))
+
+
+def _cut_at_line(head: str, full_length: int) -> str:
+    """
+    Drop the trailing partial line of a truncated text.
+    """
+    if len(head) >= full_length:
+        return head
+    newline = head.rfind("\n")
+    return head[: newline + 1] if newline > 0 else head
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(model: str = "", name: Optional[str] = None) -> Tokenizer:
+    """
+    Get the tokenizer used to budget prompts.
+
+    Parameters:
+    -----------
+    model : str, optional
+        Model identifier, used to pick the tiktoken encoding
+    name : str, optional
+        'heuristic' or 'tiktoken' (default: PULLHERO_TOKENIZER or 'heuristic')
+
+    Returns:
+    --------
+    Tokenizer
+        The requested tokenizer, or the heuristic one when tiktoken or its
+        encoding files are not available locally
+
+    Example:
+    --------
+    >>> get_tokenizer("gpt-4o-mini").count("Review this code")
+    4
+    """
+    logger = logging.getLogger(__name__)
+    name = name or os.environ.get("PULLHERO_TOKENIZER", "heuristic")
+
+    if name == "tiktoken":
+        if tiktoken is None:
+            logger.warning("tiktoken is not installed, using heuristic tokenizer")
+            return Tokenizer()
+        try:
+            return TiktokenTokenizer(model)
+        except Exception as e:
+            # tiktoken downloads missing encodings, never depend on the network
+            logger.warning(f"tiktoken unavailable, using heuristic tokenizer: {str(e)}")
+    elif name != "heuristic":
+        logger.warning(f"Unknown tokenizer '{name}', using heuristic tokenizer")
+
+    return Tokenizer()
+
+
+def get_context_window(model: str) -> int:
+    """
+    Get the context window of a model in tokens.
+
+    PULLHERO_LLM_CONTEXT_WINDOW overrides the built-in table, which is
+    matched by model name prefix.
+
+    Parameters:
+    -----------
+    model : str
+        Model identifier (e.g., 'gpt-4o-mini')
+
+    Returns:
+    --------
+    int
+        Context window size in tokens
+    """
+    configured = os.environ.get("PULLHERO_LLM_CONTEXT_WINDOW")
+    if configured:
+        return int(configured)
+    model = (model or "").lower().split("/")[-1]
+    for prefix in sorted(CONTEXT_WINDOWS, key=len, reverse=True):
+        if model.startswith(prefix):
+            return CONTEXT_WINDOWS[prefix]
+    return DEFAULT_CONTEXT_WINDOW
+
+
+class PromptBuilder:
+    """
+    Token budgeted prompt assembly.
+
+    A prompt is a str.format template whose placeholders are filled by
+    sections. Sections are filled by ascending priority until the model
+    context window, minus the tokens reserved for the completion, is used
+    up. A section is either a single text, truncated at a line boundary
+    when it does not fit, or an iterable of chunks (e.g., one per file),
+    from which whole trailing chunks are dropped. Trimming is
+    deterministic, so the same inputs always produce the same prompt.
+
+    Chunk iterables are consumed lazily by build: only the chunks that fit
+    are kept, so files streamed from a huge repository (see TreeFiles and
+    iter_files) never need to be held in memory at once.
+
+    Example:
+    --------
+    >>> builder = PromptBuilder("gpt-4o-mini")
+    >>> builder.add("diff", diff, priority=0, required=True)
+    >>> builder.add("files", file_chunks, priority=1)
+    >>> builder.add("tree", tree, priority=3)
+    >>> prompt = builder.build("{tree}\\n{files}\\n{diff}\\nReview it.")
+    >>> builder.dropped
+    [{'section': 'tree', 'tokens': 1200, 'kept': 0, 'chunks_dropped': 0}]
+    """
+
+    def __init__(
+        self,
+        model: str = "",
+        context_window: Optional[int] = None,
+        tokenizer: Optional[Tokenizer] = None,
+        reserved_tokens: int = RESPONSE_TOKENS,
+    ) -> None:
+        """
+        Initialize the builder.
+
+        Args:
+            model: Model identifier, used for the context window and tokenizer
+            context_window: Context window override in tokens
+            tokenizer: Tokenizer override (default: get_tokenizer(model))
+            reserved_tokens: Tokens kept free for the completion
+        """
+        self.context_window = context_window or get_context_window(model)
+        self.tokenizer = tokenizer or get_tokenizer(model)
+        self.reserved_tokens = reserved_tokens
+        self.sections: List[Dict] = []
+        self.dropped: List[Dict] = []
+        self.used_tokens = 0
+        self.logger = logging.getLogger(f"{self.__class__.__name__}")
+
+    @property
+    def budget(self) -> int:
+        """
+        Tokens available for the whole prompt.
+        """
+        return max(self.context_window - self.reserved_tokens, 0)
+
+    def add(
+        self,
+        name: str,
+        text: Union[str, Iterable[str]],
+        priority: int,
+        required: bool = False,
+    ) -> "PromptBuilder":
+        """
+        Add a section filling the {name} placeholder of the template.
+
+        Args:
+            name: Placeholder name in the template
+            text: Section text, or iterable of chunks joined without separator
+            priority: Fill order, lower values are filled first
+            required: Never trimmed, even when over budget
+
+        Returns:
+            The builder, to allow chaining
+        """
+        self.sections.append(
+            {"name": name, "text": text, "priority": priority, "required": required}
+        )
+        return self
+
+    def _fill(self, section: Dict, remaining: int) -> str:
+        """
+        Fill one section within the remaining budget, recording any trimming.
+
+        A trimmed section ends with a TRUNCATION_MARKER line, whose tokens
+        are taken from the section's budget: trailing chunks are dropped
+        until the marker fits, and a section with no room for the marker is
+        left empty.
+        """
+        text = section["text"]
+        kept: List[str] = []
+        counts: List[int] = []
+        kept_tokens = 0
+        total = 0
+        chunks_dropped = 0
+        overflow = None
+        for chunk in [text] if isinstance(text, str) else text:
+            count = self.tokenizer.count(chunk)
+            total += count
+            if not chunks_dropped and (
+                section["required"] or kept_tokens + count <= remaining
+            ):
+                kept.append(chunk)
+                counts.append(count)
+                kept_tokens += count
+                continue
+            if not chunks_dropped and not kept:
+                overflow = chunk
+            # Dropped chunks are only counted, never retained
+            chunks_dropped += 1
+
+        if not chunks_dropped:
+            self.used_tokens += kept_tokens
+            return "".join(kept)
+
+        # Room for the marker, sized for the largest count it may report
+        marker_tokens = self.tokenizer.count(
+            TRUNCATION_MARKER.format(count=total) + "\n"
+        )
+        while kept and kept_tokens + marker_tokens > remaining:
+            overflow = kept.pop()
+            kept_tokens -= counts.pop()
+            chunks_dropped += 1
+
+        if not kept and overflow is not None:
+            # Truncate the first chunk that does not fit, leaving room for the marker
+            head = self.tokenizer.truncate(overflow, remaining - marker_tokens)
+            if head:
+                kept.append(head)
+                kept_tokens += self.tokenizer.count(head)
+                chunks_dropped -= 1
+
+        self.dropped.append(
+            {
+                "section": section["name"],
+                "tokens": total,
+                "kept": kept_tokens,
+                "chunks_dropped": chunks_dropped if not isinstance(text, str) else 0,
+            }
+        )
+        if marker_tokens > remaining:
+            return ""
+        kept.append(TRUNCATION_MARKER.format(count=total - kept_tokens) + "\n")
+        self.used_tokens += kept_tokens + self.tokenizer.count(kept[-1])
+        return "".join(kept)
+
+    def build(self, template: str) -> str:
+        """
+        Render the template with every section trimmed to the budget.
+
+        Args:
+            template: str.format template with one placeholder per section
+
+        Returns:
+            The rendered prompt
+        """
+        self.dropped = []
+        self.used_tokens = self.tokenizer.count(
+            template.format(**{s["name"]: "" for s in self.sections})
+        )
+
+        values = {}
+        for section in sorted(self.sections, key=lambda s: s["priority"]):
+            values[section["name"]] = self._fill(
+                section, max(self.budget - self.used_tokens, 0)
+            )
+
+        self.logger.info(
+            f"Prompt uses {self.used_tokens}/{self.budget} tokens "
+            f"({self.tokenizer.name} tokenizer, {self.context_window} token window)"
+        )
+        for dropped in self.dropped:
+            self.logger.warning(
+                f"Trimmed prompt section '{dropped['section']}': kept "
+                f"{dropped['kept']}/{dropped['tokens']} tokens, "
+                f"{dropped['chunks_dropped']} chunks dropped"
+            )
+        if self.used_tokens > self.budget:
+            self.logger.warning(
+                f"Required prompt sections exceed the budget by "
+                f"{self.used_tokens - self.budget} tokens"
+            )
+        return template.format(**values)
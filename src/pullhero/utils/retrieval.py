@@ -0,0 +1,310 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+#
+# Copyright (C) 2025 authors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import re
+import json
+import math
+import logging
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from pullhero.utils.cache import ingest_cache
+from pullhero.utils.ingest import (
+    TreeFiles,
+    format_file,
+    get_backend,
+    iter_file_spans,
+    iter_files,
+    snapshot_key,
+)
+
+# Keep only the k most relevant files in the prompt, 0 keeps every file,
+# most relevant first
+RETRIEVAL_TOP_K = int(os.environ.get("PULLHERO_RETRIEVAL_TOP_K", "20"))
+
+# BM25 parameters, the usual defaults
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_IDENTIFIER_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_SUBWORD_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+# Keywords and filler words shared by most files, they carry no relevance
+STOPWORDS = frozenset(
+    """
+    a an and are as at be by class const def else elif err for from func if
+    import in is it nil none not of on or package pass return self the this
+    to true false type var with
+    """.split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split a text into lowercase search terms.
+
+    Identifiers are kept whole and also split into their snake_case and
+    camelCase parts, so 'get_pr_diff' matches 'getPrDiff' and 'diff'.
+
+    Parameters:
+    -----------
+    text : str
+        Source code, diff or prose
+
+    Returns:
+    --------
+    List[str]
+        Terms in text order, with repetitions
+
+    Example:
+    --------
+    >>> tokenize("def getPrDiff(self):")
+    ['getprdiff', 'get', 'pr', 'diff']
+    """
+    terms = []
+    for identifier in _IDENTIFIER_RE.findall(text):
+        lower = identifier.lower()
+        if len(lower) > 1 and lower not in STOPWORDS:
+            terms.append(lower)
+        parts = _SUBWORD_RE.findall(identifier)
+        if len(parts) > 1:
+            terms.extend(
+                part.lower()
+                for part in parts
+                if len(part) > 1 and part.lower() not in STOPWORDS
+            )
+    return terms
+
+
+class LexicalIndex:
+    """
+    BM25 index over the files of an ingested repository.
+
+    Every file is indexed with the terms of its path and content (see
+    tokenize). The index is serializable, so it is built once per tree
+    and cached next to the ingested snapshot (see get_lexical_index).
+
+    Example:
+    --------
+    >>> index = LexicalIndex.build(iter_files(content))
+    >>> index.search("Fix the pagination of get_issues_with_label", top_k=5)
+    [('src/pullhero/vcs/github.py', 12.4), ...]
+    """
+
+    def __init__(
+        self,
+        paths: List[str],
+        lengths: List[int],
+        postings: Dict[str, List[Tuple[int, int]]],
+    ) -> None:
+        """
+        Initialize the index from its postings, see build.
+
+        Args:
+            paths: Indexed file paths, the document ids are their positions
+            lengths: Number of terms of every document
+            postings: Mapping of term to (document id, term frequency) pairs
+        """
+        self.paths = paths
+        self.lengths = lengths
+        self.postings = postings
+        self.average_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+
+    @classmethod
+    def build(cls, files: Iterable[Tuple[str, str]]) -> "LexicalIndex":
+        """
+        Index (path, text) pairs, e.g. from iter_files.
+        """
+        paths: List[str] = []
+        lengths: List[int] = []
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for path, text in files:
+            if not path:
+                continue
+            terms = Counter(tokenize(path))
+            terms.update(tokenize(text))
+            for term, frequency in terms.items():
+                postings.setdefault(term, []).append((len(paths), frequency))
+            paths.append(path)
+            lengths.append(sum(terms.values()))
+        return cls(paths, lengths, postings)
+
+    def to_json(self) -> str:
+        """
+        Serialize the index.
+        """
+        return json.dumps(
+            {"paths": self.paths, "lengths": self.lengths, "postings": self.postings},
+            separators=(",", ":"),
+        )
+
+    @classmethod
+    def from_json(cls, data: str) -> "LexicalIndex":
+        """
+        Load an index serialized by to_json.
+        """
+        loaded = json.loads(data)
+        return cls(loaded["paths"], loaded["lengths"], loaded["postings"])
+
+    def search(self, query: str, top_k: int = 0) -> List[Tuple[str, float]]:
+        """
+        Rank the indexed files by BM25 relevance to a query.
+
+        Args:
+            query: Free text, e.g. a diff or an issue
+            top_k: Maximum number of results, 0 returns every match
+
+        Returns:
+            (path, score) pairs of the files matching at least one query
+            term, most relevant first
+        """
+        count = len(self.paths)
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for document, frequency in postings:
+                norm = (
+                    1 - BM25_B + BM25_B * self.lengths[document] / self.average_length
+                )
+                scores[document] = scores.get(document, 0.0) + idf * (
+                    frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * norm)
+                )
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        if top_k:
+            ranked = ranked[:top_k]
+        return [(self.paths[document], score) for document, score in ranked]
+
+
+def get_lexical_index(
+    content: Union[str, TreeFiles], tree_sha: Optional[str] = None
+) -> LexicalIndex:
+    """
+    Get the lexical index of ingested content, cached by tree SHA.
+
+    Parameters:
+    -----------
+    content : str or TreeFiles
+        Content as returned by ingest_repository, TreeFiles are streamed
+    tree_sha : str, optional
+        SHA of the ingested tree (see get_tree_sha), the index is only
+        cached when given
+
+    Returns:
+    --------
+    LexicalIndex
+        Index of every file of the content
+    """
+    logger = logging.getLogger(__name__)
+    key = (
+        snapshot_key(tree_sha, "lexical-index", get_backend(tree_sha))
+        if tree_sha
+        else None
+    )
+    if key:
+        cached = ingest_cache.get(key)
+        if cached is not None:
+            logger.info(f"Lexical index served from cache ({key[:12]})")
+            return LexicalIndex.from_json(cached)
+
+    index = LexicalIndex.build(iter_files(content))
+    logger.info(
+        f"Built lexical index of {len(index.paths)} files and {len(index.postings)} terms"
+    )
+    if key:
+        ingest_cache.set(key, index.to_json())
+    return index
+
+
+def rank_chunks(
+    content: Union[str, TreeFiles],
+    index: Optional[LexicalIndex],
+    query: str,
+    top_k: Optional[int] = None,
+    exclude: Optional[Set[str]] = None,
+) -> Iterator[str]:
+    """
+    Yield the file chunks of ingested content by relevance to a query.
+
+    Files matching the query come first, most relevant first, then the
+    other files in their original order. At most top_k files are yielded,
+    so only a bounded number of chunks is ever read from a huge
+    repository. Chunks are sliced, or read for TreeFiles, one at a time as
+    iter_files does.
+
+    Parameters:
+    -----------
+    content : str or TreeFiles
+        Content as returned by ingest_repository or ingest_changes
+    index : LexicalIndex, optional
+        Index of the content, chunks are yielded in their original order
+        when None
+    query : str
+        Free text the files are ranked against
+    top_k : int, optional
+        Maximum number of files, 0 keeps every file
+        (default: PULLHERO_RETRIEVAL_TOP_K)
+    exclude : Set[str], optional
+        Paths never yielded, e.g. the changed files already in the prompt
+
+    Yields:
+    -------
+    str
+        Formatted file chunks
+
+    Example:
+    --------
+    >>> builder.add(
+    ...     "repo_content",
+    ...     rank_chunks(content, index, f"{issue_title}\\n{issue_body}"),
+    ...     priority=2,
+    ... )
+    """
+    top_k = RETRIEVAL_TOP_K if top_k is None else top_k
+    exclude = exclude or set()
+    if isinstance(content, TreeFiles):
+        paths = [path for path in content.paths if path not in exclude]
+    else:
+        spans = {
+            path: (start, stop)
+            for path, start, stop in iter_file_spans(content)
+            if path not in exclude
+        }
+        paths = list(spans)
+
+    if index is None:
+        ranked = paths
+    else:
+        known = set(paths)
+        ranked = [path for path, _ in index.search(query) if path in known]
+        matched = set(ranked)
+        ranked.extend(path for path in paths if path not in matched)
+    if top_k:
+        ranked = ranked[:top_k]
+
+    logging.getLogger(__name__).debug(f"Most relevant files: {ranked[:10]}")
+    if isinstance(content, TreeFiles):
+        for path, text in content.read(ranked):
+            yield format_file(path, text)
+        return
+    for path in ranked:
+        start, stop = spans[path]
+        yield content[start:stop]
@@ -0,0 +1,169 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+#
+# Copyright (C) 2025 authors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import time
+import fcntl
+import shutil
+import logging
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+# Workspaces are created below this root, one directory per invocation
+WORKSPACE_ROOT = os.environ.get(
+    "PULLHERO_WORKSPACE_ROOT", os.path.join(tempfile.gettempdir(), "pullhero")
+)
+# Keep the workspace after the run, useful for debugging
+WORKSPACE_KEEP = os.environ.get("PULLHERO_WORKSPACE_KEEP", "").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# Workspaces left behind by crashed runs are removed after this many hours
+WORKSPACE_MAX_AGE = float(os.environ.get("PULLHERO_WORKSPACE_MAX_AGE", "24"))
+
+WORKSPACE_PREFIX = "ws-"
+
+
+@contextmanager
+def file_lock(lock_path: str) -> Iterator[None]:
+    """
+    Hold an exclusive advisory lock on a file for the duration of the block.
+
+    Used to serialize writers of resources shared between concurrent runs
+    on the same host, such as the bare mirror cache.
+
+    Parameters:
+    -----------
+    lock_path : str
+        Path of the lock file, created if missing
+
+    Example:
+    --------
+    >>> with file_lock("/var/cache/pullhero/repo.git.lock"):
+    ...     update_mirror()
+    """
+    Path(lock_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+class Workspace:
+    """
+    Isolated per-invocation working directory.
+
+    Every PullHero run gets its own directory below a configurable root so
+    several jobs can run on the same host without clobbering each other's
+    checkout. Objects are shared between workspaces through the clone mirror
+    cache (see clone_repo_with_token), only the working tree is per run.
+
+    The directory is removed when the context exits, unless
+    PULLHERO_WORKSPACE_KEEP is set. Workspaces left behind by killed runs
+    are pruned once they are older than PULLHERO_WORKSPACE_MAX_AGE hours.
+
+    Example:
+    --------
+    >>> with Workspace("review") as workspace:
+    ...     clone_repo_with_token(repo_url, token, clone_dir=workspace.checkout_dir)
+    ...     summary, tree, content = ingest_repository(workspace.checkout_dir)
+    """
+
+    def __init__(
+        self, name: str, root: Optional[str] = None, keep: Optional[bool] = None
+    ) -> None:
+        """
+        Initialize the workspace, the directory is created on enter.
+
+        Args:
+            name: Short name of the run, used as directory prefix (e.g., 'review')
+            root: Directory holding the workspaces (default: PULLHERO_WORKSPACE_ROOT)
+            keep: Keep the directory on exit (default: PULLHERO_WORKSPACE_KEEP)
+        """
+        self.name = name
+        self.root = Path(root or WORKSPACE_ROOT).expanduser().absolute()
+        self.keep = WORKSPACE_KEEP if keep is None else keep
+        self.path: Optional[str] = None
+        self.logger = logging.getLogger(f"{self.__class__.__name__}")
+
+    @property
+    def checkout_dir(self) -> str:
+        """
+        Directory where the repository working tree is checked out.
+        """
+        if self.path is None:
+            raise ValueError("Workspace has not been created")
+        return os.path.join(self.path, "checkout")
+
+    def create(self) -> str:
+        """
+        Create the workspace directory.
+
+        Returns:
+            Absolute path of the new workspace
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.prune_stale()
+        self.path = tempfile.mkdtemp(
+            prefix=f"{WORKSPACE_PREFIX}{self.name}-", dir=str(self.root)
+        )
+        self.logger.info(f"Created workspace {self.path}")
+        return self.path
+
+    def cleanup(self) -> None:
+        """
+        Remove the workspace directory unless it must be kept.
+        """
+        if self.path is None:
+            return
+        if self.keep:
+            self.logger.info(f"Keeping workspace {self.path}")
+            return
+        self.logger.info(f"Removing workspace {self.path}")
+        shutil.rmtree(self.path, ignore_errors=True)
+        self.path = None
+
+    def prune_stale(self) -> None:
+        """
+        Remove workspaces older than PULLHERO_WORKSPACE_MAX_AGE hours.
+
+        Only directories created by this class are considered, so the root
+        can safely be shared with other tools.
+        """
+        if WORKSPACE_MAX_AGE <= 0:
+            return
+        deadline = time.time() - WORKSPACE_MAX_AGE * 3600
+        for entry in self.root.glob(f"{WORKSPACE_PREFIX}*"):
+            try:
+                if entry.is_dir() and entry.stat().st_mtime < deadline:
+                    self.logger.info(f"Pruning stale workspace {entry}")
+                    shutil.rmtree(entry, ignore_errors=True)
+            except OSError as oe:
+                self.logger.debug(f"Could not prune {entry}: {str(oe)}")
+
+    def __enter__(self) -> "Workspace":
+        self.create()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.cleanup()
@@ -17,8 +17,10 @@
 # along with this program. If not, see <https://www.gnu.org/licenses/>.
 
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Tuple, Literal, List
+from typing import Any, Callable, Iterator, Optional, Dict, Tuple, Literal, List
 import logging
+import threading
+from pullhero.vcs.session import get_cache_stats, vcs_scheduler
 
 
 class VCSOperations(ABC):
@@ -51,6 +53,73 @@ class VCSOperations(ABC):
         self.token = token
         self.logger = logging.getLogger(f"{self.__class__.__name__}")
         self.logger.info("Initializing VCS provider")
+        # Memoized repository, pull/merge request and issue handles
+        self._handles: Dict[Tuple, Any] = {}
+        self._handles_lock = threading.Lock()
+        self.handle_hits = 0
+        self.handle_misses = 0
+
+    def _handle(self, key: Tuple, factory: Callable[[], Any]) -> Any:
+        """
+        Get a memoized API object handle, fetching it on first use.
+
+        Handles are kept for the lifetime of the provider, writes that
+        change an object drop its handle through invalidate_handles.
+
+        Args:
+            key: Handle key, its kind first, e.g. ("pull", "owner/repo", 12)
+            factory: Fetches the handle on a miss
+
+        Returns:
+            The memoized handle
+        """
+        with self._handles_lock:
+            if key in self._handles:
+                self.handle_hits += 1
+                return self._handles[key]
+        handle = factory()
+        with self._handles_lock:
+            self.handle_misses += 1
+            return self._handles.setdefault(key, handle)
+
+    def _cached_handle(self, key: Tuple) -> Optional[Any]:
+        """
+        Get a memoized handle without fetching it on a miss.
+        """
+        with self._handles_lock:
+            return self._handles.get(key)
+
+    def invalidate_handles(self, *prefix: Any) -> None:
+        """
+        Drop the memoized handles whose key starts with a prefix.
+
+        Args:
+            prefix: Key prefix, e.g. ("pull", "owner/repo") drops every pull
+                request handle of a repository, no prefix drops everything
+        """
+        with self._handles_lock:
+            for key in [k for k in self._handles if k[: len(prefix)] == prefix]:
+                del self._handles[key]
+
+    def log_handle_stats(self) -> None:
+        """
+        Log the hit and miss counts of the handle memoization and of the
+        conditional requests, and the rate limit metrics.
+        """
+        self.logger.info(
+            f"Handle cache: {self.handle_hits} hits, {self.handle_misses} misses"
+        )
+        stats = get_cache_stats()
+        self.logger.info(
+            f"Conditional requests: {stats['hits']} not modified, "
+            f"{stats['misses']} full responses"
+        )
+        stats = vcs_scheduler.stats()
+        self.logger.info(
+            f"API pacing: {stats['waits']} requests held back for "
+            f"{stats['wait_seconds']}s, {stats['throttled']} rate limited, "
+            f"budgets {stats['hosts']}"
+        )
 
     @abstractmethod
     def create_pr(self, title: str, body: str, base: str, head: str) -> Dict[str, str]:
@@ -226,16 +295,27 @@ class VCSOperations(ABC):
         pass
 
     @abstractmethod
-    def get_issues_with_label(self, repo_identifier: str, label: str) -> List[Dict]:
+    def get_issues_with_label(
+        self,
+        repo_identifier: str,
+        label: str,
+        state: Literal["open", "closed", "all"] = "open",
+        since: Optional[str] = None,
+        kind: Literal["issue", "pr", "all"] = "issue",
+    ) -> Iterator[Dict]:
         """
-        Retrieve all issues with a specific label.
+        Retrieve all issues with a specific label, page by page.
 
         Args:
             repo_identifier: Repository identifier (format varies by provider)
             label: Label to filter issues by
+            state: Only issues in this state
+            since: Only issues updated at or after this ISO 8601 timestamp
+            kind: Issues, pull/merge requests or both
 
         Returns:
-            List of issue dictionaries with their details
+            Iterator of issue dictionaries with their details, yielded as
+            the pages are loaded
 
         Raises:
             ValueError: If repository is invalid or label is empty
@@ -348,6 +428,67 @@ class VCSOperations(ABC):
         """
         pass
 
+    @abstractmethod
+    def get_pr_head_sha(self, repo_identifier: str, pr_number: str) -> str:
+        """
+        Get the SHA of the head commit of a PR/MR.
+
+        Args:
+            repo_identifier: Repository identifier
+            pr_number: PR/MR number
+
+        Returns:
+            SHA of the latest commit of the source branch
+        """
+        pass
+
+    @abstractmethod
+    def get_pr_comments(self, repo_identifier: str, pr_number: str) -> List[Dict]:
+        """
+        Get the comments and review bodies posted on a PR/MR.
+
+        Args:
+            repo_identifier: Repository identifier
+            pr_number: PR/MR number
+
+        Returns:
+            List of dictionaries, oldest first, containing:
+            - 'id': Comment or review identifier
+            - 'body': Comment text
+            - 'created_at': Creation time
+            - 'author': Login of the comment author
+        """
+        pass
+
+    @abstractmethod
+    def get_authenticated_user(self) -> Optional[str]:
+        """
+        Get the login of the user the token authenticates as.
+
+        Returns:
+            The login, as reported in the 'author' of get_pr_comments, or
+            None when the provider cannot tell
+        """
+        pass
+
+    @abstractmethod
+    def get_interdiff(
+        self, repo_identifier: str, base_sha: str, head_sha: str
+    ) -> Optional[str]:
+        """
+        Get the unified diff of the commits pushed between two SHAs.
+
+        Args:
+            repo_identifier: Repository identifier
+            base_sha: Previously reviewed commit
+            head_sha: Current head commit
+
+        Returns:
+            The unified diff, or None when head_sha does not descend from
+            base_sha (e.g., after a force-push) or base_sha no longer exists
+        """
+        pass
+
     @abstractmethod
     def get_current_file(
         self, repo_identifier: str, branch: str, filename: str
@@ -383,6 +524,33 @@ class VCSOperations(ABC):
         """
         pass
 
+    @abstractmethod
+    def commit_files(
+        self,
+        repo_identifier: str,
+        branch: str,
+        files: Dict[str, str],
+        commit_message: str,
+    ) -> Dict[str, str]:
+        """
+        Create or update several files on the given branch in a single commit.
+
+        Unlike calling update_file once per file, this costs a constant
+        number of API calls and produces one commit.
+
+        Args:
+            repo_identifier: Repository identifier
+            branch: Branch name
+            files: Mapping of file path to new file content
+            commit_message: Message of the commit
+
+        Returns:
+            Dictionary containing:
+            - 'status': 'created' or 'unchanged'
+            - 'sha': SHA of the new commit (or of the branch head if unchanged)
+        """
+        pass
+
     @abstractmethod
     def update_pr(self, repo_identifier: str, branch: str) -> Dict[str, str]:
         """
@@ -415,10 +583,18 @@ class VCSOperations(ABC):
             ValueError: If provider is unsupported or token is missing
             ImportError: If required provider module cannot be imported
 
+        Providers are shared per provider name and token, so handles memoized
+        by one agent step are reused by the next.
+
         Example:
             >>> vcs = VCSOperations.from_provider("github", "ghp_abc123")
         """
         logger = logging.getLogger("VCSFactory")
+        with _instances_lock:
+            instance = _instances.get((provider, token))
+        if instance is not None:
+            logger.debug(f"Reusing {provider} provider")
+            return instance
         logger.info(f"Initializing {provider} provider")
 
         providers = {"github": "GitHubProvider", "gitlab": "GitLabProvider"}
@@ -433,15 +609,22 @@ class VCSOperations(ABC):
                 from pullhero.vcs.github import GitHubProvider
 
                 logger.debug("Successfully imported GitHub provider")
-                return GitHubProvider(token)
+                instance = GitHubProvider(token)
             elif provider == "gitlab":
                 from pullhero.vcs.gitlab import GitLabProvider
 
                 logger.debug("Successfully imported GitLab provider")
-                return GitLabProvider(token)
+                instance = GitLabProvider(token)
         except ImportError as ie:
             logger.error(f"Failed to import {provider} provider: {str(ie)}")
             raise
         except Exception as e:
             logger.error(f"Unexpected error initializing {provider}: {str(e)}")
             raise
+        with _instances_lock:
+            return _instances.setdefault((provider, token), instance)
+
+
+# Providers built by VCSOperations.from_provider, by provider name and token
+_instances: Dict[Tuple[str, Optional[str]], VCSOperations] = {}
+_instances_lock = threading.Lock()
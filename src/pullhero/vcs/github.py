@@ -16,11 +16,22 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <https://www.gnu.org/licenses/>.
 
-from github import Github
+from github import Github, GithubException, InputGitTreeElement
+from github.Issue import Issue
+from github.PullRequest import PullRequest
+from github.Repository import Repository
+from github.Requester import Requester
 from pullhero.vcs.base import VCSOperations
+from pullhero.vcs.session import (
+    SharedSessionHTTPConnection,
+    SharedSessionHTTPSConnection,
+    get_vcs_session,
+)
+import os
 import requests
 import logging
-from typing import Dict, Literal, Tuple, Optional, List
+from datetime import datetime
+from typing import Any, Dict, Iterator, Literal, Tuple, Optional, List, Union
 from typing_extensions import TypedDict
 
 
@@ -38,6 +49,77 @@ class ReviewResult(TypedDict):
     id: int
 
 
+# Pull request head/base refs, changed files and recent comments in one query
+PR_SNAPSHOT_QUERY = """
+query($owner: String!, $name: String!, $number: Int!, $files: String) {
+  repository(owner: $owner, name: $name) {
+    pullRequest(number: $number) {
+      title
+      url
+      state
+      headRefName
+      headRefOid
+      baseRefName
+      baseRefOid
+      files(first: 100, after: $files) {
+        pageInfo { hasNextPage endCursor }
+        nodes { path additions deletions changeType }
+      }
+      comments(last: 100) {
+        nodes { databaseId body createdAt url author { login __typename } }
+      }
+      reviews(last: 100) {
+        nodes { databaseId body submittedAt author { login __typename } }
+      }
+    }
+  }
+}
+"""
+
+# Further pages of changed files, for pull requests touching over 100 files
+PR_FILES_QUERY = """
+query($owner: String!, $name: String!, $number: Int!, $files: String) {
+  repository(owner: $owner, name: $name) {
+    pullRequest(number: $number) {
+      files(first: 100, after: $files) {
+        pageInfo { hasNextPage endCursor }
+        nodes { path additions deletions changeType }
+      }
+    }
+  }
+}
+"""
+
+# GraphQL PatchStatus to REST file status
+_FILE_STATUS = {
+    "ADDED": "added",
+    "DELETED": "removed",
+    "MODIFIED": "modified",
+    "RENAMED": "renamed",
+    "COPIED": "copied",
+    "CHANGED": "changed",
+}
+
+
+def _login(author: Optional[Dict[str, str]]) -> str:
+    """
+    Get the REST login of a GraphQL actor: bots are suffixed with [bot] in
+    REST only, and deleted users are reported as ghost.
+    """
+    if not author:
+        return "ghost"
+    if author.get("__typename") == "Bot":
+        return f"{author['login']}[bot]"
+    return author["login"]
+
+
+def _parse_time(value: str) -> datetime:
+    """
+    Parse a GraphQL DateTime into the aware datetime PyGithub returns.
+    """
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
 class GitHubProvider(VCSOperations):
     """
     GitHub implementation of VCSOperations interface.
@@ -69,12 +151,45 @@ class GitHubProvider(VCSOperations):
             raise ValueError("GitHub token cannot be empty")
 
         try:
+            # PyGithub and the direct API calls share one session, which
+            # turns repeated GETs into conditional requests
+            self.session = get_vcs_session()
+            Requester.injectConnectionClasses(
+                SharedSessionHTTPConnection, SharedSessionHTTPSConnection
+            )
             self.client = Github(self.token)
             self.logger.info("Successfully initialized GitHub client")
         except Exception as e:
             self.logger.error(f"Failed to initialize GitHub client: {str(e)}")
             raise
 
+    def _get_repo(self, repo_name: str) -> Repository:
+        """
+        Get the memoized PyGithub handle of a repository.
+        """
+        return self._handle(
+            ("repo", repo_name), lambda: self.client.get_repo(repo_name)
+        )
+
+    def _get_pull(self, repo_name: str, pr_number: Union[int, str]) -> PullRequest:
+        """
+        Get the memoized PyGithub handle of a pull request.
+        """
+        return self._handle(
+            ("pull", repo_name, int(pr_number)),
+            lambda: self._get_repo(repo_name).get_pull(int(pr_number)),
+        )
+
+    def _get_issue(self, repo_name: str, issue_number: Union[int, str]) -> Issue:
+        """
+        Get the memoized PyGithub handle of an issue, or of the issue side of
+        a pull request.
+        """
+        return self._handle(
+            ("issue", repo_name, int(issue_number)),
+            lambda: self._get_repo(repo_name).get_issue(int(issue_number)),
+        )
+
     def create_pr(
         self, repo_name: str, title: str, body: str, base: str, head: str
     ) -> PRCreationResult:
@@ -100,8 +215,9 @@ class GitHubProvider(VCSOperations):
         self.logger.info(f"Creating PR in {repo_name} from {head} to {base}")
 
         try:
-            repo = self.client.get_repo(repo_name)
+            repo = self._get_repo(repo_name)
             pr = repo.create_pull(title=title, body=body, base=base, head=head)
+            self.invalidate_handles("pull", repo_name)
 
             self.logger.info(f"Successfully created PR #{pr.number}")
             self.logger.debug(f"PR URL: {pr.html_url}")
@@ -127,19 +243,19 @@ class GitHubProvider(VCSOperations):
         self.logger.debug(f"Comment preview: {body[:50]}...")
 
         try:
-            repo = self.client.get_repo(repo_identifier)
-
             if target_type == "pr":
                 # For PRs, use create_issue_comment() instead of create_comment()
-                target = repo.get_issue(
-                    int(target_id)
+                target = self._get_issue(
+                    repo_identifier, target_id
                 )  # Note: Using get_issue for PR comments
                 comment = target.create_comment(body)
+                self.invalidate_handles("pull", repo_identifier, int(target_id))
             elif target_type == "issue":
-                target = repo.get_issue(int(target_id))
+                target = self._get_issue(repo_identifier, target_id)
                 comment = target.create_comment(body)
             else:
                 raise ValueError(f"Invalid target_type: {target_type}")
+            self.invalidate_handles("issue", repo_identifier, int(target_id))
 
             self.logger.info(f"Successfully posted comment with ID {comment.id}")
             return {"id": comment.id, "url": comment.html_url}
@@ -176,9 +292,9 @@ class GitHubProvider(VCSOperations):
         )
 
         try:
-            repo = self.client.get_repo(repo_name)
-            pr = repo.get_pull(pr_id)
+            pr = self._get_pull(repo_name, pr_id)
             review = pr.create_review(body=comment, event=review_type)
+            self.invalidate_handles("pull", repo_name, int(pr_id))
 
             self.logger.info(
                 f"Successfully submitted {review_type} review with ID {review.id}"
@@ -223,7 +339,7 @@ class GitHubProvider(VCSOperations):
                 "Accept": "application/vnd.github.v3.diff",
             }
 
-            response = requests.get(url, headers=headers)
+            response = self.session.get(url, headers=headers)
             response.raise_for_status()
 
             diff = response.text
@@ -248,7 +364,7 @@ class GitHubProvider(VCSOperations):
         """
         self.logger.info(f"Fetching README.md from {repo_name} on branch {branch}")
         try:
-            repo = self.client.get_repo(repo_name)
+            repo = self._get_repo(repo_name)
             readme_file = repo.get_contents("README.md", ref=branch)
             return readme_file.decoded_content.decode("utf-8"), readme_file.sha
         except Exception:
@@ -262,7 +378,7 @@ class GitHubProvider(VCSOperations):
         Create the branch if it doesn't exist, otherwise return the branch reference.
         """
         self.logger.info(f"Checking/Creating branch {branch_name} from {base_branch}")
-        repo = self.client.get_repo(repo_name)
+        repo = self._get_repo(repo_name)
 
         try:
             branch_ref = repo.get_git_ref(f"heads/{branch_name}")
@@ -273,6 +389,7 @@ class GitHubProvider(VCSOperations):
             repo.create_git_ref(
                 ref=f"refs/heads/{branch_name}", sha=main_ref.object.sha
             )
+            self.invalidate_handles("pull", repo_name)
             self.logger.info(f"Branch '{branch_name}' created from '{base_branch}'.")
             self.logger.info(f"Exception '{e}'")
             return {"ref": branch_name, "status": "created"}
@@ -285,7 +402,7 @@ class GitHubProvider(VCSOperations):
         """
         self.logger.info(f"Updating README.md on branch {branch}")
         commit_message = "Update README documentation via PullHero"
-        repo = self.client.get_repo(repo_name)
+        repo = self._get_repo(repo_name)
 
         try:
             readme_content, sha = self.get_current_readme(repo_name, branch)
@@ -297,6 +414,7 @@ class GitHubProvider(VCSOperations):
                     sha=sha,
                     branch=branch,
                 )
+                self.invalidate_handles("pull", repo_name)
                 self.logger.info("README.md updated on branch '%s'.", branch)
                 return {"status": "updated", "sha": result["commit"].sha}
             else:
@@ -306,6 +424,7 @@ class GitHubProvider(VCSOperations):
                     content=new_content,
                     branch=branch,
                 )
+                self.invalidate_handles("pull", repo_name)
                 self.logger.info("README.md created on branch '%s'.", branch)
                 return {"status": "created", "sha": result["commit"].sha}
         except GithubException as e:
@@ -319,13 +438,14 @@ class GitHubProvider(VCSOperations):
         Create a new pull request or update an existing one from the branch.
         """
         self.logger.info(f"Creating/Updating PR from {branch} to {base_branch}")
-        repo = self.client.get_repo(repo_name)
+        repo = self._get_repo(repo_name)
 
         pulls = repo.get_pulls(state="open", head=f"{repo.owner.login}:{branch}")
         if pulls.totalCount == 0:
             pr = repo.create_pull(
                 title=pr_title, body=pr_body, head=branch, base=base_branch
             )
+            self.invalidate_handles("pull", repo_name)
             self.logger.info("Created PR #%s for README update.", pr.number)
             return {"url": pr.html_url, "id": pr.number, "status": "created"}
         else:
@@ -333,36 +453,67 @@ class GitHubProvider(VCSOperations):
             self.logger.info("Existing PR #%s found for README update.", pr.number)
             return {"url": pr.html_url, "id": pr.number, "status": "exists"}
 
-    def get_issues_with_label(self, repo_identifier: str, label: str) -> List[Dict]:
+    def get_issues_with_label(
+        self,
+        repo_identifier: str,
+        label: str,
+        state: Literal["open", "closed", "all"] = "open",
+        since: Optional[str] = None,
+        kind: Literal["issue", "pr", "all"] = "issue",
+    ) -> Iterator[Dict]:
         """
         GitHub implementation for getting issues with a specific label.
+
+        Pages of 100 issues are requested by following the Link headers, and
+        the issues of a page are yielded before the next page is requested.
+        The issues endpoint also lists pull requests, they are told apart by
+        their 'pull_request' member.
         """
         self.logger.info(f"Getting issues with label '{label}' from {repo_identifier}")
-        try:
-            url = (
-                f"https://api.github.com/repos/{repo_identifier}/issues?labels={label}"
-            )
-            headers = {"Authorization": f"Bearer {self.token}"}
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"Failed to get issues with label: {str(e)}")
-            raise
+        url = f"https://api.github.com/repos/{repo_identifier}/issues"
+        params = {"labels": label, "state": state, "per_page": 100}
+        if since:
+            params["since"] = since
+        headers = {"Authorization": f"Bearer {self.token}"}
+        pages = 0
+        while url:
+            try:
+                response = self.session.get(url, headers=headers, params=params)
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                self.logger.error(f"Failed to get issues with label: {str(e)}")
+                raise
+            pages += 1
+            for issue in response.json():
+                is_pr = "pull_request" in issue
+                if kind == "all" or is_pr == (kind == "pr"):
+                    yield issue
+            # The next link already carries the query parameters
+            url = response.links.get("next", {}).get("url")
+            params = None
+        self.logger.info(f"Listed issues with label '{label}' in {pages} pages")
 
     def get_issue_comments(self, repo_identifier: str, issue_id: str) -> List[Dict]:
         """
         GitHub implementation for getting issue comments.
         """
         self.logger.info(f"Getting comments for issue #{issue_id} in {repo_identifier}")
+        # A PR already fetched by get_pr_snapshot holds its comments, when it
+        # has fewer than the 100 the snapshot keeps
+        snapshot = (
+            self._cached_handle(("pull", repo_identifier, int(issue_id), "snapshot"))
+            if issue_id.isdigit()
+            else None
+        )
+        if snapshot is not None and len(snapshot["comments"]) < 100:
+            return [dict(comment) for comment in snapshot["comments"]]
         try:
             # Validate issue_id is numeric
             if not issue_id.isdigit():
                 raise ValueError(f"Invalid issue ID: {issue_id}")
 
             # Get repository and issue
-            repo = self.client.get_repo(repo_identifier)
-            issue = repo.get_issue(int(issue_id))
+            issue = self._get_issue(repo_identifier, issue_id)
 
             # Get and return comments
             comments = issue.get_comments()
@@ -394,9 +545,10 @@ class GitHubProvider(VCSOperations):
         try:
             url = f"https://api.github.com/repos/{repo_identifier}/issues/{issue_number}/labels/{label}"
             headers = {"Authorization": f"Bearer {self.token}"}
-            response = requests.delete(url, headers=headers)
+            response = self.session.delete(url, headers=headers)
 
             if response.status_code in (200, 204):
+                self.invalidate_handles("issue", repo_identifier, int(issue_number))
                 self.logger.info(f"Successfully removed label '{label}'")
                 return True
             else:
@@ -412,8 +564,7 @@ class GitHubProvider(VCSOperations):
         """
         self.logger.info(f"Fetching details for issue #{issue_id} in {repo_identifier}")
         try:
-            repo = self.client.get_repo(repo_identifier)
-            issue = repo.get_issue(int(issue_id))
+            issue = self._get_issue(repo_identifier, issue_id)
 
             return {
                 "title": issue.title,
@@ -432,13 +583,24 @@ class GitHubProvider(VCSOperations):
         GitHub implementation to get PR info from repository and PR number.
         """
         self.logger.info(f"Getting PR info for #{pr_number} in {repo_identifier}")
+        snapshot = self.get_pr_snapshot(repo_identifier, pr_number)
+        if snapshot is not None:
+            return {
+                "pr_number": str(pr_number),
+                "pr_branch": snapshot["head_ref"],
+                "base_branch": snapshot["base_ref"],
+                "repo_identifier": repo_identifier,
+                "pr_url": snapshot["url"],
+                "title": snapshot["title"],
+                "state": snapshot["state"],
+            }
         try:
             headers = {
                 "Authorization": f"token {self.token}",
                 "Accept": "application/vnd.github.v3+json",
             }
             url = f"https://api.github.com/repos/{repo_identifier}/pulls/{pr_number}"
-            response = requests.get(url, headers=headers)
+            response = self.session.get(url, headers=headers)
 
             if response.status_code != 200:
                 self.logger.error(f"API call failed: {response.status_code}")
@@ -458,6 +620,136 @@ class GitHubProvider(VCSOperations):
             self.logger.error(f"Failed to get PR info: {str(e)}")
             raise
 
+    def _graphql(self, query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run a GraphQL query against the GitHub API.
+
+        Args:
+            query: GraphQL query
+            variables: Query variables
+
+        Returns:
+            The 'data' member of the response
+
+        Raises:
+            requests.HTTPError: For API request failures
+            ValueError: If the response carries GraphQL errors
+        """
+        response = self.session.post(
+            "https://api.github.com/graphql",
+            json={"query": query, "variables": variables},
+            headers={"Authorization": f"Bearer {self.token}"},
+        )
+        response.raise_for_status()
+        result = response.json()
+        if result.get("errors"):
+            raise ValueError(f"GraphQL errors: {result['errors']}")
+        return result["data"]
+
+    def get_pr_snapshot(
+        self, repo_identifier: str, pr_number: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Fetch the metadata, changed files and recent comments of a PR at once.
+
+        A single GraphQL query replaces the PR, paginated files, issue
+        comments and reviews REST calls (pull requests with over 100 files
+        need one more query per 100 files). The snapshot is memoized with
+        the PR handle and dropped by the same writes, get_pr_info_from_comment,
+        get_pr_files, get_pr_head_sha and get_pr_comments are served from it.
+        The diff has no GraphQL equivalent and is still fetched by get_pr_diff.
+
+        Args:
+            repo_identifier: Repository name in 'owner/repo' format
+            pr_number: Pull Request number
+
+        Returns:
+            Dictionary containing:
+            - 'title', 'url', 'state': PR metadata, in the REST format
+            - 'head_ref', 'head_sha', 'base_ref', 'base_sha': PR refs
+            - 'files': changed files, in the get_pr_files format
+            - 'comments': the last 100 conversation comments, in the
+              get_issue_comments format
+            - 'reviews': the last 100 review bodies, oldest first
+            None when the query fails, the callers then use the REST API
+        """
+        return self._handle(
+            ("pull", repo_identifier, int(pr_number), "snapshot"),
+            lambda: self._fetch_pr_snapshot(repo_identifier, pr_number),
+        )
+
+    def _fetch_pr_snapshot(
+        self, repo_identifier: str, pr_number: str
+    ) -> Optional[Dict[str, Any]]:
+        self.logger.info(f"Fetching snapshot of PR #{pr_number} in {repo_identifier}")
+        owner, name = repo_identifier.split("/", 1)
+        variables = {
+            "owner": owner,
+            "name": name,
+            "number": int(pr_number),
+            "files": None,
+        }
+        try:
+            pr = self._graphql(PR_SNAPSHOT_QUERY, variables)["repository"][
+                "pullRequest"
+            ]
+            file_nodes = list(pr["files"]["nodes"])
+            page = pr["files"]["pageInfo"]
+            while page["hasNextPage"]:
+                variables["files"] = page["endCursor"]
+                files = self._graphql(PR_FILES_QUERY, variables)["repository"][
+                    "pullRequest"
+                ]["files"]
+                file_nodes.extend(files["nodes"])
+                page = files["pageInfo"]
+        except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+            self.logger.warning(f"GraphQL snapshot unavailable, using REST: {str(e)}")
+            return None
+
+        return {
+            "title": pr["title"],
+            "url": pr["url"],
+            "state": "open" if pr["state"] == "OPEN" else "closed",
+            "head_ref": pr["headRefName"],
+            "head_sha": pr["headRefOid"],
+            "base_ref": pr["baseRefName"],
+            "base_sha": pr["baseRefOid"],
+            "files": [
+                {
+                    "filename": node["path"],
+                    "status": _FILE_STATUS.get(node["changeType"], "modified"),
+                    "changes": node["additions"] + node["deletions"],
+                    "additions": node["additions"],
+                    "deletions": node["deletions"],
+                    "raw_url": (
+                        f"https://github.com/{repo_identifier}/raw/"
+                        f"{pr['headRefOid']}/{node['path']}"
+                    ),
+                }
+                for node in file_nodes
+            ],
+            "comments": [
+                {
+                    "id": node["databaseId"],
+                    "body": node["body"],
+                    "created_at": _parse_time(node["createdAt"]),
+                    "user": _login(node["author"]),
+                    "html_url": node["url"],
+                }
+                for node in pr["comments"]["nodes"]
+            ],
+            "reviews": [
+                {
+                    "id": node["databaseId"],
+                    "body": node["body"],
+                    "created_at": _parse_time(node["submittedAt"]),
+                    "author": _login(node["author"]),
+                }
+                for node in pr["reviews"]["nodes"]
+                if node["body"] and node["submittedAt"]
+            ],
+        }
+
     def get_pr_files(
         self, repo_identifier: str, pr_number: str
     ) -> List[Dict[str, str]]:
@@ -465,9 +757,11 @@ class GitHubProvider(VCSOperations):
         GitHub implementation to get list of files in a PR.
         """
         self.logger.info(f"Getting files for PR #{pr_number} in {repo_identifier}")
+        snapshot = self.get_pr_snapshot(repo_identifier, pr_number)
+        if snapshot is not None:
+            return [dict(file) for file in snapshot["files"]]
         try:
-            repo = self.client.get_repo(repo_identifier)
-            pr = repo.get_pull(int(pr_number))
+            pr = self._get_pull(repo_identifier, pr_number)
 
             files = []
             for file in pr.get_files():
@@ -486,6 +780,122 @@ class GitHubProvider(VCSOperations):
             self.logger.error(f"Failed to get PR files: {str(e)}")
             raise
 
+    def get_pr_head_sha(self, repo_identifier: str, pr_number: str) -> str:
+        """
+        GitHub implementation to get the head commit SHA of a PR.
+        """
+        self.logger.info(f"Getting head SHA of PR #{pr_number} in {repo_identifier}")
+        snapshot = self.get_pr_snapshot(repo_identifier, pr_number)
+        if snapshot is not None:
+            return snapshot["head_sha"]
+        try:
+            return self._get_pull(repo_identifier, pr_number).head.sha
+        except Exception as e:
+            self.logger.error(f"Failed to get PR head SHA: {str(e)}")
+            raise
+
+    def get_pr_comments(self, repo_identifier: str, pr_number: str) -> List[Dict]:
+        """
+        GitHub implementation to get PR conversation comments and review bodies.
+        """
+        self.logger.info(f"Getting comments for PR #{pr_number} in {repo_identifier}")
+        snapshot = self.get_pr_snapshot(repo_identifier, pr_number)
+        if snapshot is not None:
+            comments = [
+                {
+                    "id": comment["id"],
+                    "body": comment["body"],
+                    "created_at": comment["created_at"],
+                    "author": comment["user"],
+                }
+                for comment in snapshot["comments"]
+            ]
+            comments.extend(dict(review) for review in snapshot["reviews"])
+            return sorted(comments, key=lambda comment: comment["created_at"])
+        try:
+            pr = self._get_pull(repo_identifier, pr_number)
+
+            comments = [
+                {
+                    "id": comment.id,
+                    "body": comment.body,
+                    "created_at": comment.created_at,
+                    "author": comment.user.login if comment.user else "ghost",
+                }
+                for comment in pr.get_issue_comments()
+            ]
+            comments.extend(
+                {
+                    "id": review.id,
+                    "body": review.body,
+                    "created_at": review.submitted_at,
+                    "author": review.user.login if review.user else "ghost",
+                }
+                for review in pr.get_reviews()
+                if review.body and review.submitted_at
+            )
+            return sorted(comments, key=lambda comment: comment["created_at"])
+        except Exception as e:
+            self.logger.error(f"Failed to get PR comments: {str(e)}")
+            raise
+
+    def get_authenticated_user(self) -> Optional[str]:
+        """
+        GitHub implementation to get the login of the token owner.
+
+        The GITHUB_TOKEN of a workflow cannot read /user, its comments are
+        authored by github-actions[bot].
+        """
+        try:
+            return self._handle(("user",), lambda: self.client.get_user().login)
+        except GithubException as ge:
+            if os.environ.get("GITHUB_ACTIONS") == "true" and ge.status == 403:
+                return "github-actions[bot]"
+            self.logger.warning(f"Cannot tell the authenticated user: {str(ge)}")
+            return None
+
+    def get_interdiff(
+        self, repo_identifier: str, base_sha: str, head_sha: str
+    ) -> Optional[str]:
+        """
+        GitHub implementation to get the diff between two commits of a PR.
+        """
+        self.logger.info(
+            f"Fetching interdiff {base_sha[:12]}...{head_sha[:12]} in {repo_identifier}"
+        )
+        try:
+            repo = self._get_repo(repo_identifier)
+            comparison = repo.compare(base_sha, head_sha)
+        except GithubException as ge:
+            self.logger.info(f"Cannot compare with {base_sha[:12]}: {str(ge)}")
+            return None
+
+        # 'diverged' or 'behind' means the branch was rewritten since base_sha
+        if comparison.status not in ("ahead", "identical"):
+            self.logger.info(f"Head does not descend from {base_sha[:12]}")
+            return None
+
+        try:
+            url = (
+                f"https://api.github.com/repos/{repo_identifier}"
+                f"/compare/{base_sha}...{head_sha}"
+            )
+            headers = {
+                "Authorization": f"Bearer {self.token}",
+                "Accept": "application/vnd.github.v3.diff",
+            }
+            response = self.session.get(url, headers=headers)
+            response.raise_for_status()
+
+            diff = response.text
+            self.logger.info(f"Successfully retrieved interdiff ({len(diff)} chars)")
+            return diff
+        except requests.HTTPError as he:
+            self.logger.error(
+                f"API request failed: {he.response.status_code} - {he.response.text}"
+            )
+            raise
+
     def get_current_file(
         self, repo_identifier: str, branch: str, filename: str
     ) -> Tuple[str, Optional[str]]:
@@ -494,7 +904,7 @@ class GitHubProvider(VCSOperations):
         """
         self.logger.info(f"Fetching {filename} from {repo_identifier}@{branch}")
         try:
-            repo = self.client.get_repo(repo_identifier)
+            repo = self._get_repo(repo_identifier)
             file_content = repo.get_contents(filename, ref=branch)
             return file_content.decoded_content.decode("utf-8"), file_content.sha
         except GithubException:
@@ -512,7 +922,7 @@ class GitHubProvider(VCSOperations):
         """
         self.logger.info(f"Updating {filename} on {repo_identifier}@{branch}")
         try:
-            repo = self.client.get_repo(repo_identifier)
+            repo = self._get_repo(repo_identifier)
             commit_message = f"Update {filename} via PullHero"
 
             current_content, sha = self.get_current_file(
@@ -526,6 +936,7 @@ class GitHubProvider(VCSOperations):
                     sha=sha,
                     branch=branch,
                 )
+                self.invalidate_handles("pull", repo_identifier)
                 self.logger.info(f"File {filename} updated")
                 return {"status": "updated", "sha": result["commit"].sha}
             else:
@@ -535,19 +946,108 @@ class GitHubProvider(VCSOperations):
                     content=new_content,
                     branch=branch,
                 )
+                self.invalidate_handles("pull", repo_identifier)
                 self.logger.info(f"File {filename} created")
                 return {"status": "created", "sha": result["commit"].sha}
         except Exception as e:
             self.logger.error(f"Failed to update file: {str(e)}")
             raise
 
+    def _file_modes(self, repo: Any, tree_sha: str, paths: List[str]) -> Dict[str, str]:
+        """
+        Get the mode of the existing files among a set of paths.
+
+        Only the trees of the directories leading to the paths are fetched,
+        one level at a time, instead of the whole recursive tree, which
+        GitHub truncates on large repositories.
+
+        Args:
+            repo: PyGithub repository
+            tree_sha: SHA of the root tree
+            paths: Repository relative file paths
+
+        Returns:
+            Mode by path, for the paths that exist
+
+        Raises:
+            RuntimeError: If GitHub truncated the listing of a directory
+        """
+        trees: Dict[str, Dict[str, Any]] = {}
+
+        def entries(directory: str, sha: str) -> Dict[str, Any]:
+            if directory not in trees:
+                tree = repo.get_git_tree(sha)
+                if tree.raw_data.get("truncated"):
+                    raise RuntimeError(
+                        f"Tree listing of '{directory or '/'}' was truncated by GitHub"
+                    )
+                trees[directory] = {element.path: element for element in tree.tree}
+            return trees[directory]
+
+        modes = {}
+        for path in paths:
+            *directories, name = path.split("/")
+            directory, sha = "", tree_sha
+            for part in directories:
+                element = entries(directory, sha).get(part)
+                if element is None or element.type != "tree":
+                    break
+                directory, sha = f"{directory}{part}/", element.sha
+            else:
+                element = entries(directory, sha).get(name)
+                if element is not None and element.type == "blob":
+                    modes[path] = element.mode
+        return modes
+
+    def commit_files(
+        self,
+        repo_identifier: str,
+        branch: str,
+        files: Dict[str, str],
+        commit_message: str,
+    ) -> Dict[str, str]:
+        """
+        GitHub implementation to commit several files at once with the Git Data API.
+        """
+        self.logger.info(f"Committing {len(files)} files on {repo_identifier}@{branch}")
+        try:
+            repo = self._get_repo(repo_identifier)
+            ref = repo.get_git_ref(f"heads/{branch}")
+            base_commit = repo.get_git_commit(ref.object.sha)
+
+            # Keep the mode of existing files, e.g. executable scripts
+            modes = self._file_modes(repo, base_commit.tree.sha, list(files))
+
+            elements = [
+                InputGitTreeElement(
+                    path=path,
+                    mode=modes.get(path, "100644"),
+                    type="blob",
+                    content=content,
+                )
+                for path, content in files.items()
+            ]
+            tree = repo.create_git_tree(elements, base_commit.tree)
+            if tree.sha == base_commit.tree.sha:
+                self.logger.info("Files are unchanged, nothing to commit")
+                return {"status": "unchanged", "sha": base_commit.sha}
+
+            commit = repo.create_git_commit(commit_message, tree, [base_commit])
+            ref.edit(commit.sha)
+            self.invalidate_handles("pull", repo_identifier)
+            self.logger.info(f"Committed {len(files)} files as {commit.sha}")
+            return {"status": "created", "sha": commit.sha}
+        except Exception as e:
+            self.logger.error(f"Failed to commit files: {str(e)}")
+            raise
+
     def update_pr(self, repo_identifier: str, branch: str) -> Optional[Dict[str, str]]:
         """
         GitHub implementation to get PR info from branch.
         """
         self.logger.info(f"Checking for PR from {branch} in {repo_identifier}")
         try:
-            repo = self.client.get_repo(repo_identifier)
+            repo = self._get_repo(repo_identifier)
             pulls = repo.get_pulls(state="open", head=f"{repo.owner.login}:{branch}")
 
             if pulls.totalCount == 0:
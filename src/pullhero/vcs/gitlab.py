@@ -16,15 +16,26 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <https://www.gnu.org/licenses/>.
 
+import hashlib
+import posixpath
 import gitlab
-from typing import Optional, List, Dict, Literal, Tuple
+from typing import Iterator, Optional, List, Dict, Literal, Tuple
 from pullhero.vcs.base import VCSOperations
+from pullhero.vcs.session import get_vcs_session
 
 
 class GitLabProvider(VCSOperations):
     def __init__(self, token: str):
         super().__init__(token)
-        self.client = gitlab.Gitlab(private_token=self.token)
+        self.client = gitlab.Gitlab(private_token=self.token, session=get_vcs_session())
+
+    def _get_project(self, project_id: str) -> "gitlab.v4.objects.Project":
+        """
+        Get the memoized python-gitlab handle of a project.
+        """
+        return self._handle(
+            ("repo", project_id), lambda: self.client.projects.get(project_id)
+        )
 
     def create_pr(
         self, repo_identifier: str, title: str, body: str, base: str, head: str
@@ -32,7 +43,7 @@ class GitLabProvider(VCSOperations):
         """
         Create a new GitLab Merge Request.
         """
-        project = self.client.projects.get(repo_identifier)
+        project = self._get_project(repo_identifier)
         mr = project.mergerequests.create(
             {
                 "title": title,
@@ -59,7 +70,7 @@ class GitLabProvider(VCSOperations):
         self.logger.debug(f"Comment preview: {body[:50]}...")
 
         try:
-            project = self.client.projects.get(project_id)
+            project = self._get_project(project_id)
 
             if target_type == "pr":
                 target = project.mergerequests.get(target_id)
@@ -88,7 +99,7 @@ class GitLabProvider(VCSOperations):
 
         project_id, mr_iid = pr_id.split(":", 1)
 
-        project = self.client.projects.get(project_id)
+        project = self._get_project(project_id)
         mr = project.mergerequests.get(int(mr_iid))
 
         if approve:
@@ -101,11 +112,27 @@ class GitLabProvider(VCSOperations):
         """
         Get the diff for a merge request using GitLab API.
         """
-        project = self.client.projects.get(repo_identifier)
+        project = self._get_project(repo_identifier)
         mr = project.mergerequests.get(int(pr_id))
         # GitLab returns diff directly in the MR object
         changes = mr.changes()
-        return "".join([change.get("diff", "") for change in changes["changes"]])
+        return self._format_changes(changes["changes"])
+
+    @staticmethod
+    def _format_changes(changes: List[Dict]) -> str:
+        """
+        Join GitLab change entries into a unified diff.
+        """
+        # Rebuild the per-file headers GitLab leaves out of the change diffs
+        return "".join(
+            [
+                f"diff --git a/{change['old_path']} b/{change['new_path']}\n"
+                f"--- {'/dev/null' if change.get('new_file') else 'a/' + change['old_path']}\n"
+                f"+++ {'/dev/null' if change.get('deleted_file') else 'b/' + change['new_path']}\n"
+                f"{change.get('diff', '')}"
+                for change in changes
+            ]
+        )
 
     def get_current_readme(
         self, project_id: str, branch: str
@@ -114,7 +141,7 @@ class GitLabProvider(VCSOperations):
         Fetch the current README.md content from the given branch, if it exists.
         """
         self.logger.info(f"Fetching README.md from {project_id} on branch {branch}")
-        project = self.client.projects.get(project_id)
+        project = self._get_project(project_id)
         try:
             readme_file = project.files.get(file_path="README.md", ref=branch)
             # Return readme content and the file path as ID (gitlab doesn't use file_id for updates)
@@ -130,7 +157,7 @@ class GitLabProvider(VCSOperations):
         Create the branch if it doesn't exist, otherwise return the branch reference.
         """
         self.logger.info(f"Checking/Creating branch {branch_name} from {base_branch}")
-        project = self.client.projects.get(project_id)
+        project = self._get_project(project_id)
 
         try:
             branch = project.branches.get(branch_name)
@@ -150,7 +177,7 @@ class GitLabProvider(VCSOperations):
         Update or create the README.md file on the given branch.
         """
         self.logger.info(f"Updating README.md on branch {branch}")
-        project = self.client.projects.get(project_id)
+        project = self._get_project(project_id)
 
         try:
             readme_content, file_id = self.get_current_readme(project_id, branch)
@@ -208,7 +235,7 @@ class GitLabProvider(VCSOperations):
         Create a new merge request or update an existing one from the branch.
         """
         self.logger.info(f"Creating/Updating MR from {branch} to {base_branch}")
-        project = self.client.projects.get(project_id)
+        project = self._get_project(project_id)
 
         mrs = project.mergerequests.list(
             state="opened", source_branch=branch, target_branch=base_branch
@@ -230,15 +257,36 @@ class GitLabProvider(VCSOperations):
             self.logger.info("Existing MR !%s found for README update.", mr.iid)
             return {"url": mr.web_url, "id": mr.iid, "status": "exists"}
 
-    def get_issues_with_label(self, project_id: str, label: str) -> List[Dict]:
+    def get_issues_with_label(
+        self,
+        project_id: str,
+        label: str,
+        state: Literal["open", "closed", "all"] = "open",
+        since: Optional[str] = None,
+        kind: Literal["issue", "pr", "all"] = "issue",
+    ) -> Iterator[Dict]:
         """
         GitLab implementation for getting issues with a specific label.
+
+        Issues, then merge requests for the 'pr' and 'all' kinds, are listed
+        lazily in pages of 100.
         """
         self.logger.info(f"Getting issues with label '{label}' from {project_id}")
+        filters = {"labels": [label], "per_page": 100, "iterator": True}
+        if state != "all":
+            filters["state"] = "opened" if state == "open" else "closed"
+        if since:
+            filters["updated_after"] = since
         try:
-            project = self.client.projects.get(project_id)
-            issues = project.issues.list(labels=[label])
-            return [issue.attributes for issue in issues]
+            project = self._get_project(project_id)
+            managers = {
+                "issue": [project.issues],
+                "pr": [project.mergerequests],
+                "all": [project.issues, project.mergerequests],
+            }[kind]
+            for manager in managers:
+                for item in manager.list(**filters):
+                    yield item.attributes
         except gitlab.exceptions.GitlabError as e:
             self.logger.error(f"Failed to get issues with label: {str(e)}")
             raise
@@ -250,7 +298,7 @@ class GitLabProvider(VCSOperations):
         self.logger.info(f"Getting comments for issue !{issue_iid} in {project_id}")
         try:
             # Get project and issue
-            project = self.client.projects.get(project_id)
+            project = self._get_project(project_id)
             issue = project.issues.get(issue_iid)
 
             # Get and return notes (comments)
@@ -281,7 +329,7 @@ class GitLabProvider(VCSOperations):
         """
         self.logger.info(f"Removing label '{label}' from issue #{issue_number}")
         try:
-            project = self.client.projects.get(project_id)
+            project = self._get_project(project_id)
             issue = project.issues.get(issue_number)
 
             current_labels = issue.labels
@@ -308,7 +356,7 @@ class GitLabProvider(VCSOperations):
         """
         self.logger.info(f"Fetching details for issue !{issue_iid} in {project_id}")
         try:
-            project = self.client.projects.get(project_id)
+            project = self._get_project(project_id)
             issue = project.issues.get(issue_iid)
 
             return {
@@ -329,7 +377,7 @@ class GitLabProvider(VCSOperations):
         """
         self.logger.info(f"Getting MR info for !{mr_iid} in {project_id}")
         try:
-            project = self.client.projects.get(project_id)
+            project = self._get_project(project_id)
             mr = project.mergerequests.get(mr_iid)
 
             return {
@@ -354,7 +402,7 @@ class GitLabProvider(VCSOperations):
         """
         self.logger.info(f"Getting files for MR !{mr_iid} in {project_id}")
         try:
-            project = self.client.projects.get(project_id)
+            project = self._get_project(project_id)
             mr = project.mergerequests.get(mr_iid)
 
             files = []
@@ -380,6 +428,86 @@ class GitLabProvider(VCSOperations):
             self.logger.error(f"Failed to get MR files: {str(e)}")
             raise
 
+    def get_pr_head_sha(self, project_id: str, mr_iid: str) -> str:
+        """
+        GitLab implementation to get the head commit SHA of an MR.
+        """
+        self.logger.info(f"Getting head SHA of MR !{mr_iid} in {project_id}")
+        try:
+            project = self._get_project(project_id)
+            return project.mergerequests.get(mr_iid).sha
+        except gitlab.exceptions.GitlabError as e:
+            self.logger.error(f"Failed to get MR head SHA: {str(e)}")
+            raise
+
+    def get_pr_comments(self, project_id: str, mr_iid: str) -> List[Dict]:
+        """
+        GitLab implementation to get MR comments (notes), reviews included.
+        """
+        self.logger.info(f"Getting comments for MR !{mr_iid} in {project_id}")
+        try:
+            project = self._get_project(project_id)
+            mr = project.mergerequests.get(mr_iid)
+
+            notes = mr.notes.list(all=True, sort="asc", order_by="created_at")
+            return [
+                {
+                    "id": note.id,
+                    "body": note.body,
+                    "created_at": note.created_at,
+                    "author": note.author["username"],
+                }
+                for note in notes
+                if not note.system
+            ]
+        except gitlab.exceptions.GitlabError as e:
+            self.logger.error(f"Failed to get MR comments: {str(e)}")
+            raise
+
+    def get_authenticated_user(self) -> Optional[str]:
+        """
+        GitLab implementation to get the username of the token owner.
+        """
+        try:
+            return self._handle(("user",), self._fetch_authenticated_user)
+        except gitlab.exceptions.GitlabError as e:
+            self.logger.warning(f"Cannot tell the authenticated user: {str(e)}")
+            return None
+
+    def _fetch_authenticated_user(self) -> str:
+        self.client.auth()
+        return self.client.user.username
+
+    def get_interdiff(
+        self, project_id: str, base_sha: str, head_sha: str
+    ) -> Optional[str]:
+        """
+        GitLab implementation to get the diff between two commits of an MR.
+        """
+        self.logger.info(
+            f"Fetching interdiff {base_sha[:12]}...{head_sha[:12]} in {project_id}"
+        )
+        project = self._get_project(project_id)
+        try:
+            merge_base = project.repository_merge_base([base_sha, head_sha])
+        except gitlab.exceptions.GitlabError as e:
+            self.logger.info(f"Cannot compare with {base_sha[:12]}: {str(e)}")
+            return None
+
+        # Another merge base means the branch was rewritten since base_sha
+        if merge_base["id"] != base_sha:
+            self.logger.info(f"Head does not descend from {base_sha[:12]}")
+            return None
+
+        try:
+            comparison = project.repository_compare(base_sha, head_sha)
+            diff = self._format_changes(comparison["diffs"])
+            self.logger.info(f"Successfully retrieved interdiff ({len(diff)} chars)")
+            return diff
+        except gitlab.exceptions.GitlabError as e:
+            self.logger.error(f"Failed to get interdiff: {str(e)}")
+            raise
+
     def get_current_file(
         self, project_id: str, branch: str, filename: str
     ) -> Tuple[str, Optional[str]]:
@@ -388,7 +516,7 @@ class GitLabProvider(VCSOperations):
         """
         self.logger.info(f"Fetching {filename} from {project_id}@{branch}")
         try:
-            project = self.client.projects.get(project_id)
+            project = self._get_project(project_id)
             file_content = project.files.get(file_path=filename, ref=branch)
             return file_content.decode().decode("utf-8"), file_content.id
         except gitlab.exceptions.GitlabGetError:
@@ -406,7 +534,7 @@ class GitLabProvider(VCSOperations):
         """
         self.logger.info(f"Updating {filename} on {project_id}@{branch}")
         try:
-            project = self.client.projects.get(project_id)
+            project = self._get_project(project_id)
             commit_message = f"Update {filename} via PullHero"
 
             current_content, file_id = self.get_current_file(
@@ -436,13 +564,81 @@ class GitLabProvider(VCSOperations):
             self.logger.error(f"Failed to update file: {str(e)}")
             raise
 
+    def commit_files(
+        self,
+        project_id: str,
+        branch: str,
+        files: Dict[str, str],
+        commit_message: str,
+    ) -> Dict[str, str]:
+        """
+        GitLab implementation to commit several files at once with the Commits API.
+
+        Files whose content matches the branch are left out of the commit,
+        and no commit is made when none of them changed.
+        """
+        self.logger.info(f"Committing {len(files)} files on {project_id}@{branch}")
+        try:
+            project = self._get_project(project_id)
+
+            # One tree listing per directory tells create and update actions
+            # apart, and its blob ids tell which files actually change
+            existing = {}
+            for directory in {posixpath.dirname(path) for path in files}:
+                try:
+                    entries = project.repository_tree(
+                        path=directory, ref=branch, get_all=True
+                    )
+                except gitlab.exceptions.GitlabGetError:
+                    continue
+                existing.update(
+                    (e["path"], e["id"]) for e in entries if e["type"] == "blob"
+                )
+
+            actions = [
+                {
+                    "action": "update" if path in existing else "create",
+                    "file_path": path,
+                    "content": content,
+                }
+                for path, content in files.items()
+                if existing.get(path) != self._blob_sha(content)
+            ]
+            if not actions:
+                head = project.branches.get(branch).commit["id"]
+                self.logger.info("Files are unchanged, nothing to commit")
+                return {"status": "unchanged", "sha": head}
+
+            commit = project.commits.create(
+                {"branch": branch, "commit_message": commit_message, "actions": actions}
+            )
+            self.logger.info(f"Committed {len(actions)} files as {commit.id}")
+            return {"status": "created", "sha": commit.id}
+        except Exception as e:
+            self.logger.error(f"Failed to commit files: {str(e)}")
+            raise
+
+    @staticmethod
+    def _blob_sha(content: str) -> str:
+        """
+        Compute the git blob id GitLab reports for a file with this content.
+
+        Args:
+            content: File content, committed as UTF-8
+
+        Returns:
+            Hex SHA-1 of the git blob object
+        """
+        data = content.encode("utf-8")
+        return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
     def update_pr(self, project_id: str, branch: str) -> Optional[Dict[str, str]]:
         """
         GitLab implementation to get MR info from branch.
         """
         self.logger.info(f"Checking for MR from {branch} in {project_id}")
         try:
-            project = self.client.projects.get(project_id)
+            project = self._get_project(project_id)
             mrs = project.mergerequests.list(state="opened", source_branch=branch)
 
             if not mrs:
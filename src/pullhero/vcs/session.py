@@ -0,0 +1,609 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+#
+# Copyright (C) 2025 authors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import time
+import base64
+import json
+import random
+import logging
+import threading
+import requests
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+from urllib3.util.retry import Retry
+from github.Requester import HTTPRequestsConnectionClass, HTTPSRequestsConnectionClass
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from pullhero.utils.cache import VCS_CACHE_BODIES, Cache, vcs_cache
+
+# Headers describing the transfer of a body, not the body itself
+_TRANSFER_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+# Headers carrying the credentials of a request, GitHub and GitLab
+_CREDENTIAL_HEADERS = ("Authorization", "PRIVATE-TOKEN", "JOB-TOKEN")
+# Responses kept in memory by each adapter for conditional requests
+VCS_MEMORY_CACHE_ENTRIES = 512
+
+# Requests per minute per API host, 0 only paces from the rate limit headers
+VCS_RATE_LIMIT = int(os.environ.get("PULLHERO_VCS_RATE_LIMIT", "0"))
+# Requests that may start back to back before the rate applies
+VCS_BURST = int(os.environ.get("PULLHERO_VCS_BURST", "10"))
+# Retries of rate limited requests, and of requests failing to connect
+VCS_MAX_RETRIES = int(os.environ.get("PULLHERO_VCS_MAX_RETRIES", "3"))
+VCS_BACKOFF_MAX = 900.0
+# Pace requests from the headers once less than this share of the budget is left
+VCS_LOW_BUDGET = 0.1
+
+
+class RateScheduler:
+    """
+    Token bucket pacing the VCS API calls of every thread, per rate limit.
+
+    Buckets are named by the caller, see rate_limit_bucket: one per API
+    host and rate limit resource, since GitHub budgets core, search and
+    GraphQL calls separately. Each bucket has VCS_BURST tokens refilled at
+    a rate that starts at PULLHERO_VCS_RATE_LIMIT and adapts to the rate
+    limit headers of the responses (GitHub X-RateLimit-*, GitLab
+    RateLimit-*): once less than VCS_LOW_BUDGET of the budget is left, the
+    remaining requests are spread until the reset, and an exhausted budget
+    holds every caller until the reset. Responses without rate limit headers leave the pace
+    unchanged. Rate limited responses (429, or 403 with a rate limit
+    signal) pause the bucket for their Retry-After, the reset or a jittered
+    exponential backoff.
+
+    Example:
+    --------
+    >>> vcs_scheduler.acquire("api.github.com/core")
+    >>> response = session.get(url)
+    >>> delay = vcs_scheduler.update("api.github.com/core", response, attempt=0)
+    """
+
+    def __init__(self, requests_per_minute: int = 0, burst: int = 10) -> None:
+        """
+        Initialize the scheduler.
+
+        Args:
+            requests_per_minute: Base rate per host, 0 means unlimited until
+                the headers say otherwise
+            burst: Bucket capacity
+        """
+        self.base_rate = requests_per_minute / 60.0 if requests_per_minute > 0 else 0.0
+        self.burst = max(burst, 1)
+        self.hosts: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.throttled = 0
+
+    def _host(self, host: str) -> Dict[str, Any]:
+        # Must be called with the lock held
+        if host not in self.hosts:
+            self.hosts[host] = {
+                "rate": self.base_rate,
+                "tokens": float(self.burst),
+                "updated": time.monotonic(),
+                "paused_until": 0.0,
+                "limit": None,
+                "remaining": None,
+                "reset": None,
+            }
+        return self.hosts[host]
+
+    def acquire(self, host: str) -> float:
+        """
+        Block until a request to a host may start.
+
+        Args:
+            host: API host name
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self.lock:
+                state = self._host(host)
+                now = time.monotonic()
+                if state["rate"]:
+                    state["tokens"] = min(
+                        self.burst,
+                        state["tokens"] + (now - state["updated"]) * state["rate"],
+                    )
+                state["updated"] = now
+                if now < state["paused_until"]:
+                    delay = state["paused_until"] - now
+                elif not state["rate"]:
+                    break
+                elif state["tokens"] >= 1:
+                    state["tokens"] -= 1
+                    break
+                else:
+                    delay = (1 - state["tokens"]) / state["rate"]
+            time.sleep(delay)
+            waited += delay
+
+        if waited:
+            with self.lock:
+                self.waits += 1
+                self.wait_seconds += waited
+        return waited
+
+    def update(
+        self, host: str, response: requests.Response, attempt: int = 0
+    ) -> Optional[float]:
+        """
+        Adapt the pace of a host to the rate limit headers of a response.
+
+        Args:
+            host: API host name
+            response: Response of a request to the host
+            attempt: Number of times the request was already retried
+
+        Returns:
+            Seconds to wait before retrying when the response was rate
+            limited, None otherwise
+        """
+        headers = response.headers
+        limit = _int_header(headers, "X-RateLimit-Limit", "RateLimit-Limit")
+        remaining = _int_header(headers, "X-RateLimit-Remaining", "RateLimit-Remaining")
+        reset = _int_header(headers, "X-RateLimit-Reset", "RateLimit-Reset")
+        until_reset = max(reset - time.time(), 1.0) if reset is not None else None
+
+        throttled = response.status_code == 429 or (
+            response.status_code == 403
+            and (
+                remaining == 0
+                or "Retry-After" in headers
+                or b"rate limit" in response.content.lower()
+            )
+        )
+
+        with self.lock:
+            state = self._host(host)
+            if remaining is not None:
+                state.update(limit=limit, remaining=remaining, reset=reset)
+            # Without rate limit headers the current pace is kept
+            if remaining is not None and until_reset is not None:
+                rate = self.base_rate
+                if remaining == 0:
+                    state["paused_until"] = max(
+                        state["paused_until"], time.monotonic() + until_reset
+                    )
+                elif limit and remaining < limit * VCS_LOW_BUDGET:
+                    budget_rate = remaining / until_reset
+                    rate = min(rate, budget_rate) if rate else budget_rate
+                    # No bursts on a low budget
+                    state["tokens"] = min(state["tokens"], 1.0)
+                state["rate"] = rate
+            if not throttled:
+                return None
+            self.throttled += 1
+
+        retry_after = headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            delay = float(retry_after)
+        elif remaining == 0 and until_reset is not None:
+            delay = until_reset
+        else:
+            # GitHub asks to wait at least a minute on secondary rate limits
+            base = 60.0 if response.status_code == 403 else 1.0
+            delay = base * 2**attempt
+            delay = random.uniform(delay / 2, delay)
+        delay = min(delay, VCS_BACKOFF_MAX)
+        self.pause(host, delay)
+        return delay
+
+    def pause(self, host: str, seconds: float) -> None:
+        """
+        Hold back every request to a host for the given number of seconds.
+        """
+        with self.lock:
+            state = self._host(host)
+            state["paused_until"] = max(
+                state["paused_until"], time.monotonic() + seconds
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the current budgets and the wait metrics.
+
+        Returns:
+            Dictionary with 'waits' (requests held back), 'wait_seconds'
+            (total time held back), 'throttled' (rate limited responses)
+            and 'hosts', the limit, remaining budget, seconds to the reset
+            and current pace (requests per minute, 0 when unpaced) by bucket
+        """
+        with self.lock:
+            now = time.time()
+            return {
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 3),
+                "throttled": self.throttled,
+                "hosts": {
+                    host: {
+                        "limit": state["limit"],
+                        "remaining": state["remaining"],
+                        "reset_in": (
+                            max(int(state["reset"] - now), 0)
+                            if state["reset"] is not None
+                            else None
+                        ),
+                        "rate_per_minute": round(state["rate"] * 60, 2),
+                    }
+                    for host, state in self.hosts.items()
+                },
+            }
+
+
+def _int_header(headers: Any, *names: str) -> Optional[int]:
+    """
+    Get the first of several integer headers present in a response.
+    """
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
+
+
+vcs_scheduler = RateScheduler(VCS_RATE_LIMIT, VCS_BURST)
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def api_host(url: str) -> str:
+    """
+    Get the host of a URL, with its port only when it is not the default.
+
+    PyGithub requests https://api.github.com:443/... while direct calls
+    request https://api.github.com/..., both share one budget.
+    """
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(parts.scheme):
+        host = f"{host}:{parts.port}"
+    return host
+
+
+def rate_limit_bucket(url: str, resource: Optional[str] = None) -> str:
+    """
+    Name the scheduler bucket of a request, by API host and rate limit resource.
+
+    Args:
+        url: Request URL
+        resource: X-RateLimit-Resource of the response, when known; before
+            the response it is inferred from the path
+
+    Returns:
+        Bucket name, e.g. 'api.github.com/core' or 'api.github.com/graphql'
+    """
+    if not resource:
+        path = urlsplit(url).path
+        if path.endswith("/graphql"):
+            resource = "graphql"
+        elif "/search/code" in path:
+            resource = "code_search"
+        elif "/search/" in path:
+            resource = "search"
+        else:
+            resource = "core"
+    return f"{api_host(url)}/{resource}"
+
+
+class RateLimitedAdapter(requests.adapters.HTTPAdapter):
+    """
+    Transport adapter sending every request through the shared scheduler.
+
+    Requests wait for the bucket of their host and rate limit resource, see
+    rate_limit_bucket, and rate limited responses are
+    retried up to PULLHERO_VCS_MAX_RETRIES times once the pause requested
+    by the server is over. Connection failures are retried the same number
+    of times.
+    """
+
+    def __init__(self, scheduler: RateScheduler = vcs_scheduler, **kwargs: Any) -> None:
+        """
+        Initialize the adapter.
+
+        Args:
+            scheduler: Scheduler pacing the requests
+            kwargs: Passed to requests.adapters.HTTPAdapter
+        """
+        # Rate limited responses are retried by send, through the scheduler
+        kwargs.setdefault(
+            "max_retries",
+            Retry(total=VCS_MAX_RETRIES, read=False, respect_retry_after_header=False),
+        )
+        super().__init__(**kwargs)
+        self.scheduler = scheduler
+
+    def send(
+        self, request: requests.PreparedRequest, **kwargs: Any
+    ) -> requests.Response:
+        logger = logging.getLogger(__name__)
+        bucket = rate_limit_bucket(request.url)
+        for attempt in range(VCS_MAX_RETRIES + 1):
+            self.scheduler.acquire(bucket)
+            response = super().send(request, **kwargs)
+            # GitHub names the budget the request was counted against
+            bucket = rate_limit_bucket(
+                request.url, response.headers.get("X-RateLimit-Resource")
+            )
+            delay = self.scheduler.update(bucket, response, attempt)
+            if delay is None or attempt == VCS_MAX_RETRIES:
+                return response
+            logger.warning(
+                f"Rate limited on {bucket} ({response.status_code}), "
+                f"retrying in {delay:.1f}s"
+            )
+            response.close()
+        return response
+
+
+class ConditionalCacheAdapter(RateLimitedAdapter):
+    """
+    Transport adapter turning repeated GET requests into conditional ones.
+
+    The ETag and Last-Modified of every cacheable response are kept with
+    its body, by URL, Accept and credential headers (Authorization,
+    PRIVATE-TOKEN, JOB-TOKEN), so a response is never served to another
+    token. The next GET of the same URL sends If-None-Match and
+    If-Modified-Since, and a 304 Not Modified answer, which GitHub does not
+    count against the rate limit, is served as the cached response.
+
+    Entries live in a bounded in-memory LRU of VCS_MEMORY_CACHE_ENTRIES
+    responses. They are only written to the VCS cache on disk, and thus
+    reused across runs, when PULLHERO_VCS_CACHE_BODIES is enabled.
+
+    Requests already carrying conditional headers, e.g. from PyGithub's
+    update(), are passed through untouched.
+    """
+
+    def __init__(
+        self,
+        cache: Cache = vcs_cache,
+        persist: bool = VCS_CACHE_BODIES,
+        max_entries: int = VCS_MEMORY_CACHE_ENTRIES,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Initialize the adapter.
+
+        Args:
+            cache: Persistent cache, also switching the adapter on and off
+            persist: Whether entries are written to the persistent cache
+            max_entries: Size of the in-memory LRU
+            kwargs: Passed to RateLimitedAdapter
+        """
+        super().__init__(**kwargs)
+        self.cache = cache
+        self.persist = persist
+        self.max_entries = max_entries
+        self.memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _key(request: requests.PreparedRequest) -> str:
+        return Cache.make_key(
+            "http",
+            request.url,
+            request.headers.get("Accept", ""),
+            *(request.headers.get(name, "") for name in _CREDENTIAL_HEADERS),
+        )
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look an entry up in memory, then on disk when persisting.
+        """
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.memory.move_to_end(key)
+                return entry
+        if not self.persist:
+            return None
+        cached = self.cache.get(key)
+        if cached is None:
+            return None
+        entry = json.loads(cached)
+        self._remember(key, entry)
+        return entry
+
+    def _remember(self, key: str, entry: Dict[str, Any]) -> None:
+        with self.lock:
+            self.memory[key] = entry
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.max_entries:
+                self.memory.popitem(last=False)
+
+    def send(
+        self, request: requests.PreparedRequest, stream: bool = False, **kwargs: Any
+    ) -> requests.Response:
+        conditional = "If-None-Match" in request.headers or (
+            "If-Modified-Since" in request.headers
+        )
+        if request.method != "GET" or stream or conditional or not self.cache.enabled:
+            return super().send(request, stream=stream, **kwargs)
+
+        key = self._key(request)
+        entry = self._load(key)
+        if entry:
+            if entry.get("etag"):
+                request.headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                request.headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = super().send(request, stream=stream, **kwargs)
+
+        if entry and response.status_code == 304:
+            with self.lock:
+                self.hits += 1
+            logging.getLogger(__name__).debug(
+                f"Not modified, served from cache: {request.url}"
+            )
+            return self._cached_response(response, entry)
+
+        with self.lock:
+            self.misses += 1
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code == 200 and (etag or last_modified):
+            headers = {
+                name: value
+                for name, value in response.headers.items()
+                if name.lower() not in _TRANSFER_HEADERS
+            }
+            entry = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "headers": headers,
+                "body": base64.b64encode(response.content).decode("ascii"),
+            }
+            self._remember(key, entry)
+            if self.persist:
+                self.cache.set(key, json.dumps(entry))
+        return response
+
+    @staticmethod
+    def _cached_response(
+        not_modified: requests.Response, entry: Dict[str, Any]
+    ) -> requests.Response:
+        """
+        Build the 200 response a 304 stands for, from the cached entry.
+
+        Headers of the 304 (e.g. the rate limit counters) override the
+        cached ones.
+        """
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.headers.update(
+            (name, value)
+            for name, value in not_modified.headers.items()
+            if name.lower() not in _TRANSFER_HEADERS
+        )
+        response._content = base64.b64decode(entry["body"])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = not_modified.url
+        response.request = not_modified.request
+        response.connection = not_modified.connection
+        response.elapsed = not_modified.elapsed
+        response.raw = not_modified.raw
+        return response
+
+
+_vcs_session: Optional[requests.Session] = None
+_vcs_session_lock = threading.Lock()
+
+
+def _no_auth(request: requests.PreparedRequest) -> requests.PreparedRequest:
+    """
+    Leave requests untouched, the clients set their own credentials.
+    """
+    return request
+
+
+def get_vcs_session() -> requests.Session:
+    """
+    Get the process wide HTTP session used for VCS API calls.
+
+    Every request goes through a ConditionalCacheAdapter, paced by the
+    shared RateScheduler. Like PyGithub's own session, it has a no-op
+    auth so that credentials from ~/.netrc never replace the token
+    headers set by the clients, while proxy settings from the environment
+    are still honoured.
+
+    Returns:
+        The shared session, created on first use
+    """
+    global _vcs_session
+    with _vcs_session_lock:
+        if _vcs_session is None:
+            session = requests.Session()
+            session.auth = _no_auth
+            adapter = ConditionalCacheAdapter()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _vcs_session = session
+        return _vcs_session
+
+
+def get_cache_stats() -> Dict[str, int]:
+    """
+    Get the conditional request counters of the shared session.
+
+    Returns:
+        Dictionary with 'hits' (304 answers served from cache) and
+        'misses' (full responses) summed over the mounted adapters
+    """
+    adapters = {
+        id(adapter): adapter
+        for adapter in get_vcs_session().adapters.values()
+        if isinstance(adapter, ConditionalCacheAdapter)
+    }.values()
+    return {
+        "hits": sum(adapter.hits for adapter in adapters),
+        "misses": sum(adapter.misses for adapter in adapters),
+    }
+
+
+class _SharedSessionConnection:
+    """
+    PyGithub connection sending its requests through the shared session.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: Optional[int] = None,
+        strict: bool = False,
+        timeout: Optional[int] = None,
+        retry: Any = None,
+        pool_size: Optional[int] = None,
+        **kwargs: Any,
+    ) -> None:
+        self.host = host
+        self.port = port if port else self.default_port
+        self.timeout = timeout
+        self.verify = kwargs.get("verify", True)
+        self.session = get_vcs_session()
+
+    def close(self) -> None:
+        # The session outlives the connection, it is shared by every client
+        pass
+
+
+class SharedSessionHTTPConnection(
+    _SharedSessionConnection, HTTPRequestsConnectionClass
+):
+    protocol = "http"
+    default_port = 80
+
+
+class SharedSessionHTTPSConnection(
+    _SharedSessionConnection, HTTPSRequestsConnectionClass
+):
+    protocol = "https"
+    default_port = 443
@@ -0,0 +1,80 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+#
+# Copyright (C) 2025 authors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+from types import SimpleNamespace
+
+import pytest
+
+from pullhero.vcs.gitlab import GitLabProvider
+
+
+class FakeProject:
+    def __init__(self, tree):
+        self.tree = tree
+        self.commits = SimpleNamespace(create=self.create_commit)
+        self.branches = SimpleNamespace(
+            get=lambda branch: SimpleNamespace(commit={"id": "head"})
+        )
+        self.created = []
+
+    def repository_tree(self, path, ref, get_all):
+        return [
+            {"path": p, "id": blob_id, "type": "blob"}
+            for p, blob_id in self.tree.items()
+            if p.rpartition("/")[0] == path
+        ]
+
+    def create_commit(self, data):
+        self.created.append(data)
+        return SimpleNamespace(id="new")
+
+
+@pytest.fixture
+def provider():
+    return GitLabProvider("token")
+
+
+def test_commit_files_skips_unchanged_files(provider, monkeypatch):
+    project = FakeProject({"docs/a.md": GitLabProvider._blob_sha("same\n")})
+    monkeypatch.setattr(provider, "_get_project", lambda project_id: project)
+
+    result = provider.commit_files(
+        "group/repo", "docs", {"docs/a.md": "same\n"}, "Update docs"
+    )
+
+    assert result == {"status": "unchanged", "sha": "head"}
+    assert project.created == []
+
+
+def test_commit_files_commits_changed_files_only(provider, monkeypatch):
+    project = FakeProject({"docs/a.md": GitLabProvider._blob_sha("same\n")})
+    monkeypatch.setattr(provider, "_get_project", lambda project_id: project)
+
+    result = provider.commit_files(
+        "group/repo",
+        "docs",
+        {"docs/a.md": "same\n", "docs/b.md": "new\n"},
+        "Update docs",
+    )
+
+    assert result == {"status": "created", "sha": "new"}
+    [commit] = project.created
+    assert commit["actions"] == [
+        {"action": "create", "file_path": "docs/b.md", "content": "new\n"}
+    ]
@@ -0,0 +1,114 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+#
+# Copyright (C) 2025 authors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+import pygit2
+import pytest
+
+from pullhero.utils.cache import ingest_cache
+from pullhero.utils.ingest import (
+    TreeFiles,
+    ingest_tree,
+    iter_files,
+    load_import_graph,
+)
+from pullhero.utils.retrieval import get_lexical_index, rank_chunks
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    monkeypatch.setattr(ingest_cache, "enabled", False)
+
+
+def make_repo(root, files):
+    repo = pygit2.init_repository(str(root))
+    for path, text in files.items():
+        target = root / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(text)
+    repo.index.add_all()
+    repo.index.write()
+    signature = pygit2.Signature("Test", "test@example.com")
+    tree = repo.index.write_tree()
+    repo.create_commit("HEAD", signature, signature, "Initial", tree, [])
+    return repo
+
+
+def test_import_graph_from_repository(tmp_path):
+    make_repo(
+        tmp_path,
+        {
+            "pkg/__init__.py": "",
+            "pkg/util.py": "def helper():\n    return 1\n",
+            "pkg/app.py": "from pkg import util\n",
+            "main.py": "import pkg.app\n",
+            "go.mod": "module example.com/svc\n",
+            "cmd/main.go": 'package main\n\nimport "example.com/svc/lib"\n',
+            "lib/lib.go": "package lib\n",
+        },
+    )
+
+    graph = load_import_graph(str(tmp_path))
+
+    assert "pkg/util.py" in graph.callees("pkg/app.py")
+    assert graph.callers("pkg/app.py") == ["main.py"]
+    assert graph.callees("cmd/main.go") == ["lib/lib.go"]
+
+
+def test_import_graph_outside_repository(tmp_path):
+    assert load_import_graph(str(tmp_path)) is None
+
+
+def test_ingest_tree_skips_ignored_files(tmp_path):
+    make_repo(
+        tmp_path,
+        {
+            "src/app.js": "console.log(1)\n",
+            "src/app.min.js": "console.log(1)\n",
+            "package-lock.json": "{}\n",
+            "dist/bundle.js": "x\n",
+            "web/node_modules/left-pad/index.js": "x\n",
+        },
+    )
+
+    _, tree, content = ingest_tree(str(tmp_path))
+
+    assert [path for path, _ in iter_files(content)] == ["src/app.js"]
+    assert "dist" not in tree
+
+
+def test_tree_files_match_ingested_content(tmp_path):
+    make_repo(
+        tmp_path,
+        {
+            "README.md": "Pagination helpers\n",
+            "src/pages.py": "def paginate(items):\n    return items\n",
+            "src/other.py": "VALUE = 1\n",
+            "logo.png": "\x00binary",
+        },
+    )
+    _, _, content = ingest_tree(str(tmp_path))
+    files = TreeFiles(str(tmp_path))
+
+    assert list(iter_files(files)) == list(iter_files(content))
+    assert list(iter_files(files, {"src/other.py"})) == list(
+        iter_files(content, {"src/other.py"})
+    )
+    index = get_lexical_index(files)
+    assert list(rank_chunks(files, index, "paginate")) == list(
+        rank_chunks(content, get_lexical_index(content), "paginate")
+    )
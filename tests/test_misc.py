@@ -0,0 +1,66 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+#
+# Copyright (C) 2025 authors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+import pytest
+
+from pullhero.utils import misc
+from pullhero.utils.cache import Cache
+
+
+@pytest.fixture
+def llm_cache(monkeypatch, tmp_path):
+    cache = Cache("llm", cache_dir=str(tmp_path))
+    monkeypatch.setattr(misc, "llm_cache", cache)
+    return cache
+
+
+def fake_stream(tokens):
+    def stream_ai_api(host, key, model, endpoint, prompt, timeout, stop=None):
+        received = []
+        for token in tokens:
+            received.append(token)
+            yield token
+            if stop is not None and stop("".join(received)):
+                return
+
+    return stream_ai_api
+
+
+def call(**kwargs):
+    return misc.call_ai_api("host", "key", "model", "/chat", "prompt", **kwargs)
+
+
+def test_stream_stopped_early_is_not_cached(monkeypatch, llm_cache):
+    monkeypatch.setattr(
+        misc, "stream_ai_api", fake_stream(["Looks good\n", "Vote: +1\n", "Extra"])
+    )
+
+    stopped = call(stream=True, stop=lambda text: "Vote:" in text)
+    full = call(stream=True)
+
+    assert stopped == "Looks good\nVote: +1\n"
+    assert full == "Looks good\nVote: +1\nExtra"
+
+
+def test_stream_completed_is_cached(monkeypatch, llm_cache):
+    monkeypatch.setattr(misc, "stream_ai_api", fake_stream(["Looks good"]))
+    assert call(stream=True, stop=lambda text: "Vote:" in text) == "Looks good"
+
+    monkeypatch.setattr(misc, "stream_ai_api", fake_stream(["Different"]))
+    assert call(stream=True) == "Looks good"
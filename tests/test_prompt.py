@@ -0,0 +1,55 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+#
+# Copyright (C) 2025 authors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+import pytest
+
+from pullhero.utils.prompt import TRUNCATION_MARKER, PromptBuilder, Tokenizer
+
+TEMPLATE = "Review:\n{diff}\nFiles:\n{files}\nTree:\n{tree}\n"
+
+
+def build(budget):
+    builder = PromptBuilder(context_window=budget, reserved_tokens=0)
+    builder.add("diff", "+ changed line\n" * 20, priority=0)
+    builder.add(
+        "files", (f"FILE: f{i}.py\n" + "x = 1\n" * 10 for i in range(20)), priority=1
+    )
+    builder.add("tree", "├── f.py\n" * 40, priority=2)
+    return builder, builder.build(TEMPLATE)
+
+
+@pytest.mark.parametrize("budget", [10, 30, 80, 200, 333, 450, 540])
+def test_truncated_prompt_fits_the_budget(budget):
+    builder, prompt = build(budget)
+
+    assert builder.dropped
+    assert Tokenizer().count(prompt) <= budget
+    assert builder.used_tokens <= budget
+
+
+def test_prompt_within_budget_is_not_trimmed():
+    builder, prompt = build(100000)
+
+    assert builder.dropped == []
+    assert "truncated by PullHero" not in prompt
+
+
+def test_dropped_chunks_are_reported():
+    _, prompt = build(200)
+
+    assert prompt.count(TRUNCATION_MARKER.split("{")[0]) >= 1
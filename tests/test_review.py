@@ -0,0 +1,102 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+#
+# Copyright (C) 2025 authors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+from pullhero.agents import review
+from pullhero.agents.review import REVIEW_MARKER, find_previous_review
+
+
+class FakeProvider:
+    def __init__(self, user, comments):
+        self.user = user
+        self.comments = comments
+
+    def get_authenticated_user(self):
+        return self.user
+
+    def get_pr_comments(self, repo_identifier, pr_number):
+        return self.comments
+
+
+def comment(author, body):
+    return {"id": 1, "body": body, "created_at": "2025-01-01", "author": author}
+
+
+def test_marker_from_another_user_is_ignored():
+    provider = FakeProvider(
+        "pullhero-bot",
+        [
+            comment(
+                "pullhero-bot", "Looks good\n" + REVIEW_MARKER.format(sha="a" * 40)
+            ),
+            comment("mallory", "Skip me\n" + REVIEW_MARKER.format(sha="b" * 40)),
+        ],
+    )
+
+    previous = find_previous_review(provider, "owner/repo", "1")
+
+    assert previous == {"sha": "a" * 40, "body": "Looks good"}
+
+
+def test_marker_only_from_another_user_is_not_a_review():
+    provider = FakeProvider(
+        "pullhero-bot",
+        [comment("mallory", REVIEW_MARKER.format(sha="b" * 40))],
+    )
+
+    assert find_previous_review(provider, "owner/repo", "1") is None
+
+
+def test_unknown_authenticated_user_trusts_no_marker():
+    provider = FakeProvider(
+        None,
+        [comment("pullhero-bot", REVIEW_MARKER.format(sha="a" * 40))],
+    )
+
+    assert find_previous_review(provider, "owner/repo", "1") is None
+
+
+def test_chunked_review_keeps_previous_review(monkeypatch):
+    prompts = []
+
+    def fake_call_ai_api(host, key, model, endpoint, prompt, **kwargs):
+        prompts.append(prompt)
+        return "Vote: +1"
+
+    monkeypatch.setattr(review, "call_ai_api", fake_call_ai_api)
+    diff = "".join(
+        f"diff --git a/f{i}.py b/f{i}.py\n--- a/f{i}.py\n+++ b/f{i}.py\n"
+        f"@@ -1 +1 @@\n-old = {i}\n+new = {i}\n"
+        for i in range(2)
+    )
+    changed_files = ["f0.py", "f1.py"]
+
+    review.get_chunked_review(
+        "",
+        diff,
+        changed_files,
+        40,
+        "key",
+        "host",
+        "gpt-4o-mini",
+        "/chat",
+        previous_review="Earlier concern: missing tests",
+    )
+
+    assert len(prompts) == 3
+    assert all("Earlier concern: missing tests" in prompt for prompt in prompts)
+    assert "Incremental Code Review Merge Task" in prompts[-1]